@@ -12,5 +12,11 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "app.settings")
+os.environ.setdefault("DJANGO_ASGI", "1")
 
 application = get_asgi_application()
+
+from theater.backends.postgresql.base import warm_pools  # noqa: E402
+
+# Workers start with a full pool instead of connecting on first requests
+warm_pools()
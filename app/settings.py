@@ -43,6 +43,7 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",
     "theater",
     "user",
     "rest_framework",
@@ -51,17 +52,30 @@ INSTALLED_APPS = [
     "drf_spectacular",
 ]
 
+# Set by app/asgi.py, read-only catalog and performance actions are
+# served by async views there
+ASYNC_READ_VIEWS = os.getenv("DJANGO_ASGI") == "1"
+
 MIDDLEWARE = [
+    "theater.middleware.ServerTimingMiddleware",
+    "theater.middleware.MetricsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "debug_toolbar.middleware.DebugToolbarMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "theater.middleware.ReplicaRoutingMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
 
+if ASYNC_READ_VIEWS or not DEBUG:
+    # The toolbar is for development, and its middleware is sync only,
+    # it would run every async view in the single sync thread
+    INSTALLED_APPS.remove("debug_toolbar")
+    MIDDLEWARE.remove("debug_toolbar.middleware.DebugToolbarMiddleware")
+
 ROOT_URLCONF = "app.urls"
 
 TEMPLATES = [
@@ -86,17 +100,72 @@ WSGI_APPLICATION = "app.wsgi.application"
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
 
+# Connections kept per process and database, see psycopg_pool
+DATABASE_POOL = {
+    "min_size": int(os.getenv("POSTGRES_POOL_MIN_SIZE", 2)),
+    "max_size": int(os.getenv("POSTGRES_POOL_MAX_SIZE", 10)),
+    "max_lifetime": float(os.getenv("POSTGRES_POOL_MAX_LIFETIME", 1800)),
+    "timeout": float(os.getenv("POSTGRES_POOL_TIMEOUT", 10)),
+}
+
 DATABASES = {
     "default": {
-        "ENGINE": "django.db.backends.postgresql",
+        "ENGINE": "theater.backends.postgresql",
         "NAME": os.environ["POSTGRES_DB"],
         "USER": os.environ["POSTGRES_USER"],
         "PASSWORD": os.environ["POSTGRES_PASSWORD"],
         "HOST": os.environ["POSTGRES_HOST"],
         "PORT": os.environ["POSTGRES_PORT"],
+        "CONN_MAX_AGE": 0,
+        "CONN_HEALTH_CHECKS": True,
+        "OPTIONS": {
+            # POSTGRES_POOL=0 opens a new connection for every request
+            "pool": os.getenv("POSTGRES_POOL", "1") == "1" and DATABASE_POOL,
+        },
     }
 }
 
+# An optional read replica, test runs use the primary in its place
+if os.getenv("POSTGRES_REPLICA_HOST"):
+    DATABASES["replica"] = {
+        **DATABASES["default"],
+        "HOST": os.environ["POSTGRES_REPLICA_HOST"],
+        "PORT": os.getenv("POSTGRES_REPLICA_PORT", os.environ["POSTGRES_PORT"]),
+        "TEST": {"MIRROR": "default"},
+    }
+
+REPLICA_DATABASES = [alias for alias in DATABASES if alias != "default"]
+
+DATABASE_ROUTERS = ["theater.routers.ReplicaRouter"]
+
+# Reads stay on the primary in tests which do not opt in to replicas
+TEST_RUNNER = "app.test_runner.PrimaryTestRunner"
+
+# Seconds reads stay on the primary after a user writes, ex. their new
+# reservation, and after cached data changes. Should exceed the lag.
+REPLICA_PIN_SECONDS = int(os.getenv("REPLICA_PIN_SECONDS", 10))
+
+
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+
+if os.getenv("REDIS_URL"):
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": os.environ["REDIS_URL"],
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    }
+
+# Seconds to keep catalog responses (genres, actors, plays, halls)
+CATALOG_CACHE_TIMEOUT = int(os.getenv("CATALOG_CACHE_TIMEOUT", 300))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -164,6 +233,15 @@ REST_FRAMEWORK = {
         "anon": "50/day",
         "user": "1000/day"
     },
+    "DEFAULT_RENDERER_CLASSES": (
+        "theater.renderers.ORJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ),
+    "DEFAULT_PARSER_CLASSES": (
+        "theater.parsers.ORJSONParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ),
     "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.LimitOffsetPagination",
     "PAGE_SIZE": 10,
     "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
@@ -187,3 +265,48 @@ SIMPLE_JWT = {
 	"REFRESH_TOKEN_LIFETIME": timedelta(days=7),
 	"ROTATE_REFRESH_TOKENS": True
 }
+
+# Share of requests timed by ServerTimingMiddleware, from 0 to 1
+REQUEST_TIMING_SAMPLE_RATE = float(
+    os.getenv("REQUEST_TIMING_SAMPLE_RATE", 0.01)
+)
+
+# Send Server-Timing to every client, not only to staff users and
+# INTERNAL_IPS, timed requests are logged either way
+REQUEST_TIMING_PUBLIC_HEADER = (
+    os.getenv("REQUEST_TIMING_PUBLIC_HEADER") == "1"
+)
+
+# Bearer token required by /metrics, the endpoint is open when empty
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {
+        "console": {
+            "class": "logging.StreamHandler",
+        },
+    },
+    "loggers": {
+        "theater.middleware": {
+            "handlers": ["console"],
+            "level": os.getenv("REQUEST_TIMING_LOG_LEVEL", "INFO"),
+            "propagate": False,
+        },
+    },
+}
+
+# Seat events of performances: "postgres" sends them with NOTIFY to
+# every process, "memory" within the process only (single process, tests)
+SEAT_EVENTS_BACKEND = os.getenv("SEAT_EVENTS_BACKEND", "postgres")
+# Seconds between keep-alive comments and before a stream is closed,
+# clients reconnect after SEAT_EVENTS_RETRY_MS milliseconds
+SEAT_EVENTS_HEARTBEAT_SECONDS = int(
+    os.getenv("SEAT_EVENTS_HEARTBEAT_SECONDS", 15)
+)
+SEAT_EVENTS_STREAM_SECONDS = int(os.getenv("SEAT_EVENTS_STREAM_SECONDS", 300))
+SEAT_EVENTS_RETRY_MS = int(os.getenv("SEAT_EVENTS_RETRY_MS", 3000))
+
+# How long seats stay reserved for a user before checkout
+SEAT_HOLD_TTL = timedelta(minutes=int(os.getenv("SEAT_HOLD_TTL_MINUTES", 10)))
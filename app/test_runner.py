@@ -0,0 +1,19 @@
+from django.test import override_settings
+from django.test.runner import DiscoverRunner
+
+
+class PrimaryTestRunner(DiscoverRunner):
+    """
+    Runs the tests with reads on the primary. Tests of replicas opt in
+    with `override_settings(REPLICA_DATABASES=...)` and declare them in
+    `databases`, other tests may only use `default`.
+    """
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.primary_reads = override_settings(REPLICA_DATABASES=[])
+        self.primary_reads.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self.primary_reads.disable()
+        super().teardown_test_environment(**kwargs)
@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "app.settings")
 
 application = get_wsgi_application()
+
+from theater.backends.postgresql.base import warm_pools  # noqa: E402
+
+# Workers start with a full pool instead of connecting on first requests
+warm_pools()
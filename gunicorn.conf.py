@@ -0,0 +1,11 @@
+"""
+Gunicorn settings, loaded from the working directory, ex.
+`gunicorn app.wsgi` or `gunicorn app.asgi -k uvicorn.workers.UvicornWorker`.
+"""
+
+from theater.metrics import mark_process_dead
+
+
+def child_exit(server, worker):
+    # Gauges of exited workers must not count in multiprocess metrics
+    mark_process_dead(worker.pid)
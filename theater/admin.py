@@ -1,6 +1,7 @@
 from django.contrib import admin
 from django.contrib.admin import TabularInline, ModelAdmin
 
+from theater.cache import seat_holds_changed
 from theater.models import (
     Genre,
     Actor,
@@ -8,7 +9,8 @@ from theater.models import (
     TheatreHall,
     Performance,
     Ticket,
-    Reservation
+    Reservation,
+    SeatHold,
 )
 
 
@@ -22,6 +24,26 @@ class ReservationAdmin(ModelAdmin):
     inlines = (TicketInline,)
 
 
+@admin.register(SeatHold)
+class SeatHoldAdmin(ModelAdmin):
+    list_display = ("performance", "row", "seat", "user", "expires_at")
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        seat_holds_changed([obj.performance_id])
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        seat_holds_changed([obj.performance_id])
+
+    def delete_queryset(self, request, queryset):
+        performance_ids = set(
+            queryset.values_list("performance_id", flat=True)
+        )
+        super().delete_queryset(request, queryset)
+        seat_holds_changed(performance_ids)
+
+
 admin.site.register(Genre)
 admin.site.register(Actor)
 admin.site.register(Play)
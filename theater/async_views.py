@@ -0,0 +1,84 @@
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+
+
+def iterate_in_thread(iterator):
+    """
+    Async iterator over a sync one, pulling one item at a time in the
+    sync thread of the request. Django would read a sync iterator to
+    its end before streaming it under ASGI.
+    """
+    return _iterate_in_thread(iter(iterator))
+
+
+async def _iterate_in_thread(iterator):
+    end = object()
+    next_item = sync_to_async(next)
+    try:
+        while True:
+            item = await next_item(iterator, end)
+            if item is end:
+                return
+            yield item
+    finally:
+        # Server-side cursors are closed in the thread that opened them
+        if hasattr(iterator, "close"):
+            await sync_to_async(iterator.close)()
+
+
+def _closing_connections(view):
+    def view_closing_connections(request, *args, **kwargs):
+        try:
+            return view(request, *args, **kwargs)
+        finally:
+            # Connections of pool threads outlive the request otherwise,
+            # close them like request_finished does in the request thread.
+            close_old_connections()
+
+    return view_closing_connections
+
+
+def async_read_view(view, read_actions):
+    """
+    Async version of a viewset view: `read_actions` run in a pool of
+    threads, so concurrent reads wait on the database side by side.
+    Other actions run in the single sync thread like any sync view.
+    """
+    read_methods = {
+        method for method, action in view.actions.items()
+        if action in read_actions
+    }
+    if "get" in read_methods and "head" not in view.actions:
+        read_methods.add("head")
+
+    read = sync_to_async(_closing_connections(view), thread_sensitive=False)
+    other = sync_to_async(view)
+
+    async def async_view(request, *args, **kwargs):
+        if request.method.lower() in read_methods:
+            return await read(request, *args, **kwargs)
+        return await other(request, *args, **kwargs)
+
+    # Used by the router, metrics and CSRF middleware
+    async_view.cls = view.cls
+    async_view.initkwargs = view.initkwargs
+    async_view.actions = view.actions
+    async_view.csrf_exempt = True
+    return async_view
+
+
+class AsyncReadMixin:
+    """
+    Serves `async_actions` from async views when `ASYNC_READ_VIEWS`
+    is on (ASGI deployments), writes stay sync.
+    """
+
+    async_actions = ("list", "retrieve")
+
+    @classmethod
+    def as_view(cls, actions=None, **initkwargs):
+        view = super().as_view(actions, **initkwargs)
+        if not settings.ASYNC_READ_VIEWS:
+            return view
+        return async_read_view(view, cls.async_actions)
@@ -0,0 +1,158 @@
+import logging
+import threading
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connections
+from django.db.backends.base.base import NO_DB_ALIAS
+from django.db.backends.postgresql import base
+from psycopg import IsolationLevel
+from psycopg_pool import ConnectionPool, PoolTimeout
+
+from theater import metrics
+from theater.backends.postgresql.creation import DatabaseCreation
+
+
+logger = logging.getLogger(__name__)
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """
+    PostgreSQL backend taking connections from a psycopg_pool pool per
+    database alias when `OPTIONS["pool"]` is set, like Django 5.1:
+    `True` or a dict of `ConnectionPool` arguments (ex. `min_size`,
+    `max_size`, `max_lifetime`, `timeout`). Closing a connection
+    returns it to the pool, which checks it before reuse when
+    `CONN_HEALTH_CHECKS` is on. Requires `CONN_MAX_AGE = 0`.
+    """
+
+    creation_class = DatabaseCreation
+
+    # {alias: (connection params, pool options, pool)}
+    _connection_pools = {}
+    _pools_lock = threading.Lock()
+
+    @property
+    def pool_options(self):
+        options = self.settings_dict["OPTIONS"].get("pool")
+        if self.alias == NO_DB_ALIAS or not options:
+            return None
+        return {} if options is True else options
+
+    def get_connection_params(self):
+        conn_params = super(DatabaseWrapper, self).get_connection_params()
+        conn_params.pop("pool", None)
+        return conn_params
+
+    @property
+    def pool(self):
+        """The current pool of this alias, None before it is used."""
+        _, _, pool = self._connection_pools.get(self.alias, (None,) * 3)
+        return pool
+
+    def get_pool(self, conn_params: dict) -> ConnectionPool:
+        """
+        The pool of this alias, replaced when the database or the pool
+        options change (ex. the test database is set up).
+        """
+        with self._pools_lock:
+            params, options, pool = self._connection_pools.get(
+                self.alias, (None,) * 3
+            )
+
+            if pool is not None and (params, options) != (
+                conn_params, self.pool_options
+            ):
+                pool.close()
+                pool = None
+
+            if pool is None:
+                if self.settings_dict["CONN_MAX_AGE"] != 0:
+                    raise ImproperlyConfigured(
+                        "Pooled connections require CONN_MAX_AGE = 0."
+                    )
+                pool = ConnectionPool(
+                    kwargs=conn_params,
+                    name=self.alias,
+                    open=False,
+                    check=(
+                        ConnectionPool.check_connection
+                        if self.settings_dict["CONN_HEALTH_CHECKS"]
+                        else None
+                    ),
+                    **self.pool_options,
+                )
+                pool.open()
+                self._connection_pools[self.alias] = (
+                    conn_params, self.pool_options, pool
+                )
+
+            return pool
+
+    def warm_pool(self, timeout: float = 30.0) -> None:
+        """Opens the pool and waits until it holds `min_size` connections."""
+        if self.pool_options is not None:
+            self.get_pool(self.get_connection_params()).wait(timeout)
+
+    def close_pool(self) -> None:
+        with self._pools_lock:
+            _, _, pool = self._connection_pools.pop(self.alias, (None,) * 3)
+        if pool is not None:
+            pool.close()
+
+    @classmethod
+    def close_pools(cls, dbname=None) -> None:
+        """Closes the pools of all aliases or of `dbname` only."""
+        with cls._pools_lock:
+            for alias, (params, _, pool) in list(
+                cls._connection_pools.items()
+            ):
+                if dbname is None or params["dbname"] == dbname:
+                    pool.close()
+                    del cls._connection_pools[alias]
+
+    def get_new_connection(self, conn_params):
+        if self.pool_options is None:
+            return super(DatabaseWrapper, self).get_new_connection(conn_params)
+
+        options = self.settings_dict["OPTIONS"]
+        try:
+            self.isolation_level = IsolationLevel(
+                options.get("isolation_level", IsolationLevel.READ_COMMITTED)
+            )
+        except ValueError:
+            raise ImproperlyConfigured(
+                f"Invalid transaction isolation level "
+                f"{options['isolation_level']} specified. Use one of "
+                f"the psycopg.IsolationLevel values."
+            )
+
+        pool = self.get_pool(conn_params)
+        connection = pool.getconn()
+        if "isolation_level" in options:
+            connection.isolation_level = self.isolation_level
+        metrics.observe_pool(self.alias, pool.pop_stats())
+        return connection
+
+    def _close(self):
+        if self.connection is None or self.pool_options is None:
+            return super(DatabaseWrapper, self)._close()
+
+        pool = self.connection._pool
+        with self.wrap_database_errors:
+            pool.putconn(self.connection)
+        metrics.observe_pool(self.alias, pool.pop_stats())
+
+
+def warm_pools(timeout: float = 30.0) -> None:
+    """
+    Fills the pools of every pooled alias in this process. Pools are
+    not shared between processes, so this runs where server processes
+    start (app/wsgi.py, app/asgi.py), after any fork.
+    """
+    for alias in connections:
+        if isinstance(connections[alias], DatabaseWrapper):
+            try:
+                connections[alias].warm_pool(timeout)
+            except PoolTimeout:
+                # Connections are opened on demand meanwhile
+                logger.warning("Connection pool of %s is not full", alias)
@@ -0,0 +1,20 @@
+from django.db.backends.postgresql import creation
+
+
+class DatabaseCreation(creation.DatabaseCreation):
+    """
+    Closes pooled connections to a test database before it is
+    dropped or used as a template, both need it to be unused.
+    """
+
+    def _clone_test_db(self, suffix, verbosity, keepdb=False):
+        self.connection.close_pools(self.connection.settings_dict["NAME"])
+        super(DatabaseCreation, self)._clone_test_db(
+            suffix, verbosity, keepdb
+        )
+
+    def _destroy_test_db(self, test_database_name, verbosity):
+        self.connection.close_pools(test_database_name)
+        super(DatabaseCreation, self)._destroy_test_db(
+            test_database_name, verbosity
+        )
@@ -0,0 +1,193 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from rest_framework.response import Response
+
+from theater.routers import read_from_primary
+
+
+VERSION_KEY_PREFIX = "theater:version:"
+RESPONSE_KEY_PREFIX = "theater:response:"
+CHANGED_KEY_PREFIX = "theater:changed:"
+# Timestamp of the earliest seat hold expiry, see SeatHold.expire()
+HOLD_EXPIRY_KEY = "theater:seat_hold:expiry"
+
+
+def _version_key(namespace: str) -> str:
+    return f"{VERSION_KEY_PREFIX}{namespace}"
+
+
+def _initial_version() -> int:
+    # A fresh counter starts from the current time, so a key evicted
+    # from the cache never brings back versions used before.
+    return int(time.time() * 1000)
+
+
+def get_versions(namespaces) -> dict:
+    """
+    Returns `{namespace: version}`, creating missing counters.
+    With read replicas, the current request reads from the primary
+    if one of `namespaces` changed in the last `REPLICA_PIN_SECONDS`,
+    so nothing cached under the new versions comes from a replica
+    that is lagging behind.
+    """
+    keys = {_version_key(namespace): namespace for namespace in namespaces}
+    changed_keys = []
+    if settings.REPLICA_DATABASES:
+        changed_keys = [
+            f"{CHANGED_KEY_PREFIX}{namespace}" for namespace in namespaces
+        ]
+
+    versions = cache.get_many([*keys, *changed_keys])
+    if any(versions.pop(key, None) for key in changed_keys):
+        read_from_primary()
+
+    for key in keys.keys() - versions.keys():
+        cache.add(key, _initial_version(), timeout=None)
+        versions[key] = cache.get(key)
+
+    return {keys[key]: version for key, version in versions.items()}
+
+
+def _bump_versions(namespaces) -> None:
+    for namespace in namespaces:
+        key = _version_key(namespace)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, _initial_version(), timeout=None)
+
+
+def _mark_changed(namespaces) -> None:
+    cache.set_many(
+        {f"{CHANGED_KEY_PREFIX}{namespace}": True for namespace in namespaces},
+        settings.REPLICA_PIN_SECONDS
+    )
+
+
+def bump_versions(*namespaces) -> None:
+    """
+    Invalidates everything cached under `namespaces`. Versions are
+    bumped right away and once more after the current transaction
+    commits, so a response cached from not yet committed data
+    does not outlive the commit.
+    """
+    _bump_versions(namespaces)
+    transaction.on_commit(lambda: _bump_versions(namespaces))
+    if settings.REPLICA_DATABASES:
+        transaction.on_commit(lambda: _mark_changed(namespaces))
+
+
+def tickets_changed(performance_ids, user_ids=()) -> None:
+    bump_versions(
+        "ticket",
+        *[f"ticket:performance:{pk}" for pk in set(performance_ids)],
+        *[f"reservation:user:{pk}" for pk in set(user_ids)],
+    )
+
+
+def seat_holds_changed(performance_ids) -> None:
+    bump_versions(
+        "seat_hold",
+        *[f"seat_hold:performance:{pk}" for pk in set(performance_ids)],
+    )
+    # The earliest expiry is looked up again with the changed holds
+    cache.delete(HOLD_EXPIRY_KEY)
+    transaction.on_commit(lambda: cache.delete(HOLD_EXPIRY_KEY))
+
+
+def _versions_digest(view, request, *parts) -> str:
+    versions = get_versions(view.get_cache_namespaces())
+    raw_key = "|".join(
+        [
+            view.basename,
+            view.action,
+            request.get_host(),
+            request.get_full_path(),
+            *parts,
+        ]
+        + [f"{name}={versions[name]}" for name in sorted(versions)]
+    )
+    return hashlib.md5(raw_key.encode("utf-8")).hexdigest()
+
+
+class ConditionalGetMixin:
+    """
+    Adds an ETag to list and retrieve responses and answers
+    `If-None-Match` with 304 before the queryset is touched.
+    The ETag is derived from version counters of
+    `get_cache_namespaces()` only, so checking it costs
+    one cache round trip and no SQL.
+    """
+    cache_namespaces = ()
+
+    def get_cache_namespaces(self) -> tuple:
+        return self.cache_namespaces
+
+    def get_etag(self, request) -> str:
+        digest = _versions_digest(
+            self, request, request.META.get("HTTP_ACCEPT", "")
+        )
+        return f'W/"{digest}"'
+
+    def conditional_response(self, handler, request, *args, **kwargs):
+        etag = self.get_etag(request)
+        if_none_match = request.META.get("HTTP_IF_NONE_MATCH", "")
+
+        if etag in (tag.strip() for tag in if_none_match.split(",")):
+            return Response(status=304, headers={"ETag": etag})
+
+        response = handler(request, *args, **kwargs)
+        if response.status_code == 200:
+            response["ETag"] = etag
+
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(
+            super().list, request, *args, **kwargs
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(
+            super().retrieve, request, *args, **kwargs
+        )
+
+
+class CachedResponseMixin:
+    """
+    Caches successful list and retrieve responses in the default cache.
+    The key covers the host, the full query string and the versions
+    of `cache_namespaces`, which signals bump on every write.
+    """
+    cache_namespaces = ()
+
+    def get_cache_namespaces(self) -> tuple:
+        return self.cache_namespaces
+
+    def get_cache_key(self, request) -> str:
+        return RESPONSE_KEY_PREFIX + _versions_digest(self, request)
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        key = self.get_cache_key(request)
+        data = cache.get(key)
+
+        if data is not None:
+            return Response(data)
+
+        response = handler(request, *args, **kwargs)
+        if response.status_code == 200:
+            cache.set(key, response.data, settings.CATALOG_CACHE_TIMEOUT)
+
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(
+            super().retrieve, request, *args, **kwargs
+        )
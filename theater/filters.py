@@ -0,0 +1,139 @@
+from datetime import datetime, time
+
+from django.db.models import F, Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from rest_framework.exceptions import ValidationError
+
+from theater.models import SeatHold
+
+
+PERFORMANCE_ORDERINGS = {
+    "id": ("id",),
+    "show_time": ("show_time", "id"),
+    "-show_time": ("-show_time", "-id"),
+}
+
+
+def int_param(query_params, name: str, minimum: int = 1):
+    value = query_params.get(name)
+
+    if value in (None, ""):
+        return None
+
+    try:
+        value = int(value)
+    except ValueError:
+        raise ValidationError({name: "A whole number is required."})
+
+    if value < minimum:
+        raise ValidationError(
+            {name: f"Must be greater than or equal to {minimum}."}
+        )
+
+    return value
+
+
+def datetime_param(query_params, name: str):
+    """Parses an ISO date or datetime, a date means its midnight."""
+    value = query_params.get(name)
+
+    if not value:
+        return None
+
+    try:
+        parsed = parse_datetime(value)
+        if parsed is None and parse_date(value) is not None:
+            parsed = datetime.combine(parse_date(value), time.min)
+    except ValueError:
+        parsed = None
+
+    if parsed is None:
+        raise ValidationError(
+            {name: "An ISO 8601 date or datetime is required."}
+        )
+
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+
+    return parsed
+
+
+def annotate_tickets_available(queryset):
+    """Hall capacity minus sold tickets and seats held right now."""
+    seats_held = (
+        SeatHold.active()
+        .filter(performance=OuterRef("pk"))
+        .values("performance")
+        .annotate(count=Count("id"))
+        .values("count")
+    )
+    return queryset.annotate(
+        tickets_available=F("theatre_hall__rows")
+        * F("theatre_hall__seats_in_row")
+        - F("tickets_sold")
+        - Coalesce(Subquery(seats_held), 0)
+    )
+
+
+def filter_performances(queryset, query_params):
+    """
+    Applies the schedule filters of the performance list:
+    `show_time_after` (inclusive), `show_time_before` (exclusive),
+    `theatre_hall` and `play_id` ids, `min_available` seats and
+    `ordering`. The queryset must be annotated with
+    `tickets_available` when `min_available` is given.
+    """
+    show_time_after = datetime_param(query_params, "show_time_after")
+    show_time_before = datetime_param(query_params, "show_time_before")
+    theatre_hall = int_param(query_params, "theatre_hall")
+    play_id = int_param(query_params, "play_id")
+    min_available = int_param(query_params, "min_available")
+    ordering = query_params.get("ordering", "id")
+
+    if show_time_after:
+        queryset = queryset.filter(show_time__gte=show_time_after)
+
+    if show_time_before:
+        queryset = queryset.filter(show_time__lt=show_time_before)
+
+    if theatre_hall:
+        queryset = queryset.filter(theatre_hall_id=theatre_hall)
+
+    if play_id:
+        queryset = queryset.filter(play_id=play_id)
+
+    if min_available:
+        queryset = queryset.filter(tickets_available__gte=min_available)
+
+    if ordering not in PERFORMANCE_ORDERINGS:
+        raise ValidationError(
+            {
+                "ordering": f"Must be one of "
+                            f"{', '.join(PERFORMANCE_ORDERINGS)}."
+            }
+        )
+
+    return queryset.order_by(*PERFORMANCE_ORDERINGS[ordering])
+
+
+def filter_reservations(queryset, query_params):
+    """
+    Applies the `user` id, `created_after` (inclusive) and
+    `created_before` (exclusive) filters of reservation exports.
+    """
+    user = int_param(query_params, "user")
+    created_after = datetime_param(query_params, "created_after")
+    created_before = datetime_param(query_params, "created_before")
+
+    if user:
+        queryset = queryset.filter(user_id=user)
+
+    if created_after:
+        queryset = queryset.filter(created_at__gte=created_after)
+
+    if created_before:
+        queryset = queryset.filter(created_at__lt=created_before)
+
+    return queryset
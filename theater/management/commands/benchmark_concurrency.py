@@ -0,0 +1,257 @@
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections, connection
+from django.test import AsyncClient, Client
+from django.test.utils import (
+    setup_test_environment,
+    teardown_test_environment,
+)
+from rest_framework.reverse import reverse
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from theater.management.commands.benchmark_endpoints import (
+    DATASET_OPTIONS,
+    percentile,
+)
+from theater.models import Performance
+
+
+MODES = ("wsgi", "asgi")
+
+
+class ConcurrencyBenchmark:
+    """
+    Sends `requests` reads from `clients` concurrent clients through
+    the WSGI handler, served by `threads` threads like a threaded WSGI
+    server, or the ASGI handler with its async read views.
+    """
+
+    def __init__(self, requests: int, clients: int, threads: int):
+        self.requests = requests
+        self.clients = clients
+        self.threads = threads
+        self.latencies = []
+        self.errors = 0
+
+    def get_urls(self) -> list:
+        performance = Performance.objects.order_by("-tickets_sold").first()
+        if performance is None:
+            raise CommandError("The database has no performances.")
+
+        return [
+            reverse("theater:performance-list"),
+            reverse("theater:performance-detail", args=(performance.id,)),
+            reverse("theater:play-list"),
+            reverse("theater:genre-list"),
+        ]
+
+    def get_headers(self) -> list:
+        """An access token per client, each user has its own throttle."""
+        headers = []
+        for number in range(self.clients):
+            user, _ = get_user_model().objects.get_or_create(
+                email=f"concurrency{number}@load.test"
+            )
+            token = RefreshToken.for_user(user).access_token
+            headers.append({"Authorization": f"Bearer {token}"})
+        return headers
+
+    def record(self, response, started: float) -> None:
+        self.latencies.append((time.perf_counter() - started) * 1000)
+        if response.status_code >= 400:
+            self.errors += 1
+
+    def run_wsgi(self, urls: list, headers: list) -> None:
+        server_threads = threading.Semaphore(self.threads)
+
+        def client(number: int) -> None:
+            django_client = Client()
+            for index in range(number, self.requests, self.clients):
+                started = time.perf_counter()
+                with server_threads:
+                    response = django_client.get(
+                        urls[index % len(urls)], headers=headers[number]
+                    )
+                    # The test client keeps connections open, unlike
+                    # request_finished in a server
+                    close_old_connections()
+                self.record(response, started)
+
+        workers = [
+            threading.Thread(target=client, args=(number,))
+            for number in range(self.clients)
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+    async def run_asgi(self, urls: list, headers: list) -> None:
+        async def client(number: int) -> None:
+            django_client = AsyncClient()
+            for index in range(number, self.requests, self.clients):
+                started = time.perf_counter()
+                response = await django_client.get(
+                    urls[index % len(urls)], headers=headers[number]
+                )
+                self.record(response, started)
+
+        await asyncio.gather(
+            *(client(number) for number in range(self.clients))
+        )
+
+    def run(self, mode: str) -> dict:
+        if (mode == "asgi") != settings.ASYNC_READ_VIEWS:
+            raise CommandError(f"Run --mode={mode} with DJANGO_ASGI set.")
+
+        urls = self.get_urls()
+        headers = self.get_headers()
+        close_old_connections()
+
+        started = time.perf_counter()
+        if mode == "asgi":
+            asyncio.run(self.run_asgi(urls, headers))
+        else:
+            self.run_wsgi(urls, headers)
+        duration = time.perf_counter() - started
+
+        return {
+            "requests_per_second": round(self.requests / duration, 1),
+            "p50_ms": round(percentile(self.latencies, 50), 2),
+            "p95_ms": round(percentile(self.latencies, 95), 2),
+            "errors": self.errors,
+        }
+
+
+class Command(BaseCommand):
+    """Django command to compare the throughput of WSGI and ASGI"""
+
+    help = (
+        "Seeds a test database with generate_load_data and sends the "
+        "same concurrent read requests through the WSGI handler and "
+        "the ASGI handler with async read views, each in a new "
+        "process, then reports requests per second and latencies."
+    )
+
+    def add_arguments(self, parser):
+        for name, default in DATASET_OPTIONS.items():
+            parser.add_argument(f"--{name}", type=int, default=default)
+        parser.add_argument("--seed", type=int, default=1)
+        parser.add_argument("--requests", type=int, default=1000)
+        parser.add_argument(
+            "--clients",
+            type=int,
+            default=32,
+            help="Concurrent clients.",
+        )
+        parser.add_argument(
+            "--threads",
+            type=int,
+            default=4,
+            help="Threads of the WSGI server.",
+        )
+        parser.add_argument(
+            "--use-current-db",
+            action="store_true",
+            help="Seed and measure the configured database instead "
+                 "of a temporary test database.",
+        )
+        parser.add_argument(
+            "--mode",
+            choices=MODES,
+            help="Measure one handler in this process and print JSON.",
+        )
+
+    def handle(self, *args, **options) -> None:
+        if options["mode"]:
+            setup_test_environment(debug=False)
+            result = ConcurrencyBenchmark(
+                options["requests"], options["clients"], options["threads"]
+            ).run(options["mode"])
+            self.stdout.write(json.dumps(result))
+            return
+
+        dataset = {name: options[name] for name in DATASET_OPTIONS}
+        dataset["seed"] = options["seed"]
+
+        if options["use_current_db"]:
+            results = self.benchmark(dataset, options)
+        else:
+            setup_test_environment(debug=False)
+            old_name = connection.settings_dict["NAME"]
+            connection.creation.create_test_db(verbosity=0, autoclobber=True)
+            try:
+                results = self.benchmark(dataset, options)
+            finally:
+                connection.creation.destroy_test_db(old_name, verbosity=0)
+                teardown_test_environment()
+
+        self.report(results, options)
+
+    def benchmark(self, dataset: dict, options: dict) -> dict:
+        call_command(
+            "generate_load_data",
+            *[f"--{name}={value}" for name, value in dataset.items()],
+            stdout=self.stdout if options["verbosity"] > 1 else StringIO(),
+        )
+        connection.close()
+
+        return {mode: self.run_process(mode, options) for mode in MODES}
+
+    def run_process(self, mode: str, options: dict) -> dict:
+        env = {
+            **os.environ,
+            "POSTGRES_DB": connection.settings_dict["NAME"],
+            "DJANGO_ASGI": "1" if mode == "asgi" else "0",
+            "REQUEST_TIMING_LOG_LEVEL": "WARNING",
+        }
+        process = subprocess.run(
+            [
+                sys.executable, "-m", "django", "benchmark_concurrency",
+                f"--mode={mode}",
+                *[
+                    f"--{name}={options[name]}"
+                    for name in ("requests", "clients", "threads")
+                ],
+            ],
+            env=env,
+            cwd=settings.BASE_DIR,
+            capture_output=True,
+            text=True,
+        )
+        if process.returncode:
+            raise CommandError(f"{mode}: {process.stderr.strip()}")
+        return json.loads(process.stdout)
+
+    def report(self, results: dict, options: dict) -> None:
+        self.stdout.write(
+            f"{options['clients']} clients, {options['requests']} "
+            f"requests, {options['threads']} WSGI threads"
+        )
+        self.stdout.write(
+            f"{'mode':<8}{'req/s':>10}{'p50 ms':>9}{'p95 ms':>9}"
+            f"{'errors':>8}"
+        )
+        for mode, result in results.items():
+            self.stdout.write(
+                f"{mode:<8}{result['requests_per_second']:>10}"
+                f"{result['p50_ms']:>9}{result['p95_ms']:>9}"
+                f"{result['errors']:>8}"
+            )
+
+        speedup = (
+            results["asgi"]["requests_per_second"]
+            / results["wsgi"]["requests_per_second"]
+        )
+        self.stdout.write(f"ASGI throughput: {speedup:.2f}x WSGI")
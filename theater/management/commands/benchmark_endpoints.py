@@ -0,0 +1,253 @@
+import json
+import math
+import pathlib
+import time
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import (
+    CaptureQueriesContext,
+    setup_test_environment,
+    teardown_test_environment,
+)
+from rest_framework.reverse import reverse
+from rest_framework.test import APIClient
+
+from theater.models import Performance, Ticket
+
+
+DATASET_OPTIONS = {
+    "users": 1000,
+    "plays": 200,
+    "performances": 2000,
+    "tickets": 200000,
+}
+
+
+def percentile(samples, percent: float) -> float:
+    """Nearest-rank percentile of `samples`."""
+    ordered = sorted(samples)
+    rank = max(1, math.ceil(percent / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+class EndpointBenchmark:
+    """
+    Requests every endpoint `iterations` times through the test
+    client and records the latency, SQL queries and body size.
+    """
+
+    def __init__(self, iterations: int, warm_cache: bool):
+        self.iterations = iterations
+        self.warm_cache = warm_cache
+        self.client = APIClient()
+        self.user, _ = get_user_model().objects.get_or_create(
+            email="benchmark@load.test"
+        )
+        self.client.force_authenticate(self.user)
+
+    def measure(self, request) -> dict:
+        latencies = []
+        queries = []
+        size = 0
+
+        for _ in range(self.iterations):
+            if not self.warm_cache:
+                cache.clear()
+            with CaptureQueriesContext(connection) as context:
+                started = time.perf_counter()
+                response = request()
+                latencies.append((time.perf_counter() - started) * 1000)
+
+            if response.status_code >= 400:
+                raise CommandError(
+                    f"{response.status_code} {response.content[:200]!r}"
+                )
+            queries.append(len(context.captured_queries))
+            size = len(response.content)
+
+        return {
+            "p50_ms": round(percentile(latencies, 50), 2),
+            "p95_ms": round(percentile(latencies, 95), 2),
+            "p99_ms": round(percentile(latencies, 99), 2),
+            "queries": max(queries),
+            "bytes": size,
+        }
+
+    def free_seats(self, performance):
+        taken = set(
+            Ticket.objects.filter(performance=performance)
+            .values_list("row", "seat")
+        )
+        hall = performance.theatre_hall
+        for row in range(1, hall.rows + 1):
+            for seat in range(1, hall.seats_in_row + 1):
+                if (row, seat) not in taken:
+                    yield row, seat
+
+    def run(self) -> dict:
+        busiest = Performance.objects.order_by("-tickets_sold", "id").first()
+        emptiest = Performance.objects.select_related(
+            "theatre_hall"
+        ).order_by("tickets_sold", "id").first()
+        if busiest is None:
+            raise CommandError("The database has no performances.")
+
+        seats = self.free_seats(emptiest)
+
+        def reserve():
+            tickets = [
+                {"row": row, "seat": seat, "performance": emptiest.id}
+                for row, seat in (next(seats), next(seats))
+            ]
+            return self.client.post(
+                reverse("theater:reservation-list"),
+                {"tickets": tickets},
+                format="json"
+            )
+
+        endpoints = {
+            "performance-list": lambda: self.client.get(
+                reverse("theater:performance-list")
+            ),
+            "performance-list-cursor": lambda: self.client.get(
+                reverse("theater:performance-list"),
+                {"pagination": "cursor", "limit": 50}
+            ),
+            "performance-detail": lambda: self.client.get(
+                reverse("theater:performance-detail", args=(busiest.id,))
+            ),
+            "play-list": lambda: self.client.get(
+                reverse("theater:play-list")
+            ),
+            "play-detail": lambda: self.client.get(
+                reverse("theater:play-detail", args=(busiest.play_id,))
+            ),
+            "reservation-create": reserve,
+            "reservation-list": lambda: self.client.get(
+                reverse("theater:reservation-list")
+            ),
+        }
+
+        capacity = emptiest.theatre_hall.rows
+        capacity *= emptiest.theatre_hall.seats_in_row
+        if capacity - emptiest.tickets_sold < 2 * self.iterations:
+            raise CommandError("Not enough free seats, lower --tickets.")
+
+        return {
+            name: self.measure(request)
+            for name, request in endpoints.items()
+        }
+
+
+class Command(BaseCommand):
+    """Django command to benchmark the main API endpoints"""
+
+    help = (
+        "Seeds a test database with generate_load_data, requests the "
+        "main endpoints and reports p50/p95/p99 latency, SQL query "
+        "counts and body sizes. Results can be saved as JSON and "
+        "compared with a baseline."
+    )
+
+    def add_arguments(self, parser):
+        for name, default in DATASET_OPTIONS.items():
+            parser.add_argument(f"--{name}", type=int, default=default)
+        parser.add_argument("--seed", type=int, default=1)
+        parser.add_argument("--iterations", type=int, default=50)
+        parser.add_argument(
+            "--warm-cache",
+            action="store_true",
+            help="Keep the response cache between requests.",
+        )
+        parser.add_argument(
+            "--use-current-db",
+            action="store_true",
+            help="Seed and measure the configured database instead "
+                 "of a temporary test database.",
+        )
+        parser.add_argument("--output", help="Save results to this file.")
+        parser.add_argument("--baseline", help="Compare with this file.")
+        parser.add_argument(
+            "--max-slowdown",
+            type=float,
+            help="Fail when a p95 latency exceeds the baseline "
+                 "by more than this many percent.",
+        )
+
+    def handle(self, *args, **options) -> None:
+        dataset = {name: options[name] for name in DATASET_OPTIONS}
+        dataset["seed"] = options["seed"]
+
+        if options["use_current_db"]:
+            results = self.benchmark(dataset, options)
+        else:
+            setup_test_environment(debug=False)
+            old_name = connection.settings_dict["NAME"]
+            connection.creation.create_test_db(verbosity=0, autoclobber=True)
+            try:
+                results = self.benchmark(dataset, options)
+            finally:
+                connection.creation.destroy_test_db(old_name, verbosity=0)
+                teardown_test_environment()
+
+        report = {"dataset": dataset, "endpoints": results}
+        if options["output"]:
+            pathlib.Path(options["output"]).write_text(
+                json.dumps(report, indent=2) + "\n"
+            )
+
+        baseline = None
+        if options["baseline"]:
+            baseline = json.loads(
+                pathlib.Path(options["baseline"]).read_text()
+            )
+
+        self.report(results, baseline, options["max_slowdown"])
+
+    def benchmark(self, dataset: dict, options: dict) -> dict:
+        call_command(
+            "generate_load_data",
+            *[f"--{name}={value}" for name, value in dataset.items()],
+            stdout=self.stdout if options["verbosity"] > 1 else StringIO(),
+        )
+        return EndpointBenchmark(
+            options["iterations"], options["warm_cache"]
+        ).run()
+
+    def report(self, results: dict, baseline, max_slowdown) -> None:
+        regressions = []
+        self.stdout.write(
+            f"{'endpoint':<26}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"
+            f"{'queries':>9}{'bytes':>9}"
+        )
+
+        for name, result in results.items():
+            line = (
+                f"{name:<26}{result['p50_ms']:>9}{result['p95_ms']:>9}"
+                f"{result['p99_ms']:>9}{result['queries']:>9}"
+                f"{result['bytes']:>9}"
+            )
+            before = (baseline or {}).get("endpoints", {}).get(name)
+
+            if before:
+                change = (result["p95_ms"] / before["p95_ms"] - 1) * 100
+                line += f"  p95 {change:+.0f}%"
+                if result["queries"] > before["queries"]:
+                    regressions.append(
+                        f"{name}: {result['queries']} queries, "
+                        f"baseline {before['queries']}"
+                    )
+                if max_slowdown is not None and change > max_slowdown:
+                    regressions.append(
+                        f"{name}: p95 {change:+.0f}% over baseline"
+                    )
+
+            self.stdout.write(line)
+
+        if regressions:
+            raise CommandError("\n".join(["Regressions:", *regressions]))
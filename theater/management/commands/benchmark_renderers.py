@@ -0,0 +1,85 @@
+import timeit
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from theater.models import Performance, Play, Reservation, TheatreHall, Ticket
+from theater.renderers import ORJSONRenderer
+from theater.serializers import ReservationListSerializer
+
+
+def reservation_payload(reservations: int, tickets: int) -> list:
+    """
+    Output of `ReservationListSerializer` for unsaved reservations,
+    each with `tickets` tickets of different performances.
+    """
+    now = timezone.now()
+    hall = TheatreHall(id=1, name="Main hall", rows=20, seats_in_row=20)
+    performances = []
+    for performance_id in range(1, tickets + 1):
+        performance = Performance(
+            id=performance_id,
+            play=Play(id=performance_id, title=f"Play {performance_id}"),
+            theatre_hall=hall,
+            show_time=now + timedelta(days=performance_id),
+        )
+        performance.tickets_available = (
+            hall.rows * hall.seats_in_row - performance_id
+        )
+        performances.append(performance)
+
+    instances = []
+    for reservation_id in range(1, reservations + 1):
+        reservation = Reservation(id=reservation_id, created_at=now)
+        # Served like prefetched tickets, without queries
+        reservation._prefetched_objects_cache = {
+            "tickets": [
+                Ticket(
+                    id=reservation_id * tickets + index,
+                    row=index // 20 + 1,
+                    seat=index % 20 + 1,
+                    performance=performance,
+                    reservation=reservation,
+                )
+                for index, performance in enumerate(performances)
+            ]
+        }
+        instances.append(reservation)
+
+    return ReservationListSerializer(instances, many=True).data
+
+
+class Command(BaseCommand):
+    """Django command to compare JSON renderers on a nested payload"""
+
+    help = (
+        "Renders a reservation list payload with DRF's JSONRenderer "
+        "and ORJSONRenderer and prints the time of each."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--reservations", type=int, default=100)
+        parser.add_argument("--tickets", type=int, default=10)
+        parser.add_argument("--repeat", type=int, default=50)
+
+    def handle(self, *args, **options) -> None:
+        data = reservation_payload(
+            options["reservations"], options["tickets"]
+        )
+        timings = {}
+
+        for renderer in (JSONRenderer(), ORJSONRenderer()):
+            name = type(renderer).__name__
+            timings[name] = min(
+                timeit.repeat(
+                    lambda: renderer.render(data),
+                    number=options["repeat"],
+                    repeat=3,
+                )
+            ) / options["repeat"]
+            self.stdout.write(f"{name}: {timings[name] * 1000:.2f} ms")
+
+        speedup = timings["JSONRenderer"] / timings["ORJSONRenderer"]
+        self.stdout.write(self.style.SUCCESS(f"Speedup: {speedup:.1f}x"))
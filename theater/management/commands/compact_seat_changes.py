@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from theater.models import SeatChange
+
+
+class Command(BaseCommand):
+    """Django command to delete old changes of the seat change log"""
+
+    help = (
+        "Keeps the last --keep seat versions of every performance in the "
+        "seat change log, older `?since=` requests get the whole "
+        "performance."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--keep", type=int, default=1000)
+
+    def handle(self, *args, **options) -> None:
+        deleted = SeatChange.compact(options["keep"])
+        self.stdout.write(
+            self.style.SUCCESS(f"{deleted} seat change(s) compacted.")
+        )
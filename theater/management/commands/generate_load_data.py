@@ -0,0 +1,336 @@
+import random
+import time
+from datetime import datetime, timedelta
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from theater.cache import bump_versions
+from theater.models import (
+    Actor,
+    Genre,
+    Performance,
+    Play,
+    Reservation,
+    TheatreHall,
+    Ticket,
+)
+from theater.utils import bulk_insert, copy_rows
+
+
+FIRST_NAMES = (
+    "Anna", "Boris", "Clara", "Daniel", "Elena", "Felix", "Greta", "Hugo",
+    "Iris", "Jonas", "Kira", "Leon", "Maria", "Nikolai", "Olga", "Pavel",
+    "Rosa", "Simon", "Tanya", "Victor",
+)
+LAST_NAMES = (
+    "Adler", "Brandt", "Chekhova", "Dorn", "Ebert", "Fischer", "Gorky",
+    "Hoffmann", "Ivanova", "Jung", "Keller", "Lorenz", "Meyer", "Novak",
+    "Orlova", "Petrov", "Richter", "Schulz", "Tarkova", "Weber",
+)
+GENRE_NAMES = (
+    "Drama", "Comedy", "Tragedy", "Musical", "Opera", "Ballet", "Farce",
+    "Satire", "Melodrama", "Thriller", "Fantasy", "Puppetry", "Mime",
+    "Cabaret", "Improv",
+)
+TITLE_WORDS = (
+    "Seagull", "Garden", "Winter", "Storm", "Night", "King", "Mirror",
+    "Orchard", "Sisters", "Island", "Masquerade", "Dream", "River",
+    "Lantern", "Crown", "Shadow", "Harvest", "Wolf", "Violin", "Letter",
+)
+HALL_SIZES = ((10, 12), (15, 20), (20, 25), (25, 30), (30, 40))
+PERFORMANCE_HOURS = (12, 15, 18, 19, 20)
+SEATS_PER_RESERVATION = (1, 2, 2, 2, 3, 4, 4, 6)
+
+
+class Command(BaseCommand):
+    """Django command to generate reproducible data for load tests"""
+
+    help = (
+        "Bulk inserts users, genres, actors, theatre halls, plays, "
+        "performances and reservations with tickets. The same --seed "
+        "and volumes always produce the same data."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--seed", type=int, default=1)
+        parser.add_argument("--users", type=int, default=1000)
+        parser.add_argument("--genres", type=int, default=15)
+        parser.add_argument("--actors", type=int, default=500)
+        parser.add_argument("--theatre-halls", type=int, default=10)
+        parser.add_argument("--plays", type=int, default=200)
+        parser.add_argument("--performances", type=int, default=2000)
+        parser.add_argument(
+            "--tickets",
+            type=int,
+            default=200000,
+            help="Approximate number of tickets, limited by hall capacity.",
+        )
+        parser.add_argument(
+            "--start",
+            default="2025-01-01",
+            help="Date of the first performance.",
+        )
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=365,
+            help="Performances are spread over this many days.",
+        )
+        parser.add_argument(
+            "--password",
+            default="loadtest",
+            help="Password of every generated user.",
+        )
+        parser.add_argument("--batch-size", type=int, default=5000)
+
+    def handle(self, *args, **options) -> None:
+        self.rng = random.Random(options["seed"])
+        self.options = options
+        self.counts = {}
+        start = parse_date(options["start"])
+        if start is None:
+            raise CommandError("--start must be a date (ex. 2025-01-01).")
+        self.start = timezone.make_aware(
+            datetime.combine(start, datetime.min.time())
+        )
+
+        email = self.email(0)
+        if get_user_model().objects.filter(email=email).exists():
+            raise CommandError(
+                f"Users of seed {options['seed']} already exist "
+                f"({email}), pick another --seed."
+            )
+
+        started = time.monotonic()
+
+        with transaction.atomic():
+            user_ids = self.create_users()
+            genre_ids = self.create_genres()
+            actor_ids = self.create_actors()
+            halls = self.create_theatre_halls()
+            play_ids = self.create_plays(genre_ids, actor_ids)
+            performances = self.create_performances(play_ids, halls)
+            self.create_reservations(performances, user_ids)
+            bump_versions(
+                "genre", "actor", "theatre_hall", "play", "performance",
+                "ticket"
+            )
+
+        elapsed = time.monotonic() - started
+        total = sum(self.counts.values())
+        for name, count in self.counts.items():
+            self.stdout.write(f"{name}: {count}")
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Inserted {total} row(s) in {elapsed:.1f}s "
+                f"({total / max(elapsed, 1e-6):.0f} rows/s)."
+            )
+        )
+
+    def insert(self, model, fields, rows) -> list:
+        ids = bulk_insert(model, fields, rows, self.options["batch_size"])
+        self.counts[model._meta.verbose_name_plural] = len(ids)
+        return ids
+
+    def email(self, index: int) -> str:
+        return f"user{index}.seed{self.options['seed']}@load.test"
+
+    def person(self) -> tuple:
+        return self.rng.choice(FIRST_NAMES), self.rng.choice(LAST_NAMES)
+
+    def create_users(self) -> list:
+        password = make_password(self.options["password"])
+        joined = self.start - timedelta(days=self.options["days"])
+
+        return self.insert(
+            get_user_model(),
+            (
+                "email", "password", "first_name", "last_name",
+                "is_staff", "is_superuser", "is_active", "date_joined",
+            ),
+            (
+                (
+                    self.email(index), password, *self.person(),
+                    False, False, True,
+                    joined + timedelta(
+                        minutes=self.rng.randrange(
+                            self.options["days"] * 24 * 60
+                        )
+                    ),
+                )
+                for index in range(self.options["users"])
+            )
+        )
+
+    def create_genres(self) -> list:
+        seed = self.options["seed"]
+        return self.insert(
+            Genre,
+            ("name",),
+            (
+                (f"{GENRE_NAMES[index % len(GENRE_NAMES)]} "
+                 f"{seed}-{index}",)
+                for index in range(self.options["genres"])
+            )
+        )
+
+    def create_actors(self) -> list:
+        return self.insert(
+            Actor,
+            ("first_name", "last_name"),
+            (self.person() for _ in range(self.options["actors"]))
+        )
+
+    def create_theatre_halls(self) -> list:
+        """Returns `(id, rows, seats_in_row)` of every hall."""
+        sizes = [
+            self.rng.choice(HALL_SIZES)
+            for _ in range(self.options["theatre_halls"])
+        ]
+        ids = self.insert(
+            TheatreHall,
+            ("name", "rows", "seats_in_row"),
+            (
+                (f"Hall {self.options['seed']}-{index}", *size)
+                for index, size in enumerate(sizes)
+            )
+        )
+        return [(pk, *size) for pk, size in zip(ids, sizes)]
+
+    def create_plays(self, genre_ids, actor_ids) -> list:
+        play_ids = self.insert(
+            Play,
+            ("title", "description"),
+            (
+                (
+                    " ".join(self.rng.sample(TITLE_WORDS, 2)),
+                    " ".join(self.rng.choices(TITLE_WORDS, k=30)).lower(),
+                )
+                for _ in range(self.options["plays"])
+            )
+        )
+
+        for through, related, ids, most in (
+            (Play.genres.through, "genre_id", genre_ids, 3),
+            (Play.actors.through, "actor_id", actor_ids, 12),
+        ):
+            rows = [
+                (play_id, related_id)
+                for play_id in play_ids
+                for related_id in self.rng.sample(
+                    ids, min(len(ids), self.rng.randint(1, most))
+                )
+            ]
+            copy_rows(
+                through, ("play_id", related), rows,
+                self.options["batch_size"]
+            )
+
+        batch_size = self.options["batch_size"]
+        for start in range(0, len(play_ids), batch_size):
+            Play.update_search_vectors(play_ids[start:start + batch_size])
+
+        return play_ids
+
+    def create_performances(self, play_ids, halls) -> list:
+        """
+        Returns `(id, show_time, rows, seats_in_row, sold)` of every
+        performance. Occupancy varies around the share of all seats
+        needed to reach `--tickets`.
+        """
+        count = self.options["performances"]
+        planned = []
+        for _ in range(count):
+            hall_id, rows, seats_in_row = self.rng.choice(halls)
+            show_time = self.start + timedelta(
+                days=self.rng.randrange(self.options["days"]),
+                hours=self.rng.choice(PERFORMANCE_HOURS),
+            )
+            planned.append(
+                [self.rng.choice(play_ids), hall_id, show_time,
+                 rows, seats_in_row]
+            )
+
+        capacity = sum(plan[3] * plan[4] for plan in planned) or 1
+        occupancy = min(1.0, self.options["tickets"] / capacity)
+        for plan in planned:
+            seats = plan[3] * plan[4]
+            share = occupancy * self.rng.uniform(0.5, 1.5)
+            plan.append(min(seats, round(seats * share)))
+
+        ids = self.insert(
+            Performance,
+            ("play_id", "theatre_hall_id", "show_time", "tickets_sold"),
+            ((play, hall, show_time, sold)
+             for play, hall, show_time, _, _, sold in planned)
+        )
+        return [
+            (pk, show_time, rows, seats_in_row, sold)
+            for pk, (_, _, show_time, rows, seats_in_row, sold)
+            in zip(ids, planned)
+        ]
+
+    def create_reservations(self, performances, user_ids) -> None:
+        """
+        Sells `sold` distinct seats of every performance. Seats are
+        picked at random, sorted and handed out in small groups, so
+        the tickets of a reservation mostly sit next to each other.
+        """
+        batch_size = self.options["batch_size"]
+        performances = iter(performances)
+        reservations = tickets = 0
+
+        while chunk := list(islice(performances, 500)):
+            reservation_rows = []
+            ticket_rows = []
+
+            for pk, show_time, rows, seats_in_row, sold in chunk:
+                seats = sorted(
+                    self.rng.sample(range(rows * seats_in_row), sold)
+                )
+                while seats:
+                    size = self.rng.choice(SEATS_PER_RESERVATION)
+                    group, seats = seats[:size], seats[size:]
+                    reservation_rows.append(
+                        (
+                            show_time - timedelta(
+                                minutes=self.rng.randrange(60 * 24 * 60)
+                            ),
+                            self.rng.choice(user_ids),
+                        )
+                    )
+                    index = len(reservation_rows) - 1
+                    ticket_rows.extend(
+                        (
+                            seat // seats_in_row + 1,
+                            seat % seats_in_row + 1,
+                            pk,
+                            index,
+                        )
+                        for seat in group
+                    )
+
+            reservation_ids = bulk_insert(
+                Reservation, ("created_at", "user_id"), reservation_rows,
+                batch_size
+            )
+            copy_rows(
+                Ticket,
+                ("row", "seat", "performance_id", "reservation_id"),
+                (
+                    (row, seat, performance_id, reservation_ids[index])
+                    for row, seat, performance_id, index in ticket_rows
+                ),
+                batch_size
+            )
+            reservations += len(reservation_ids)
+            tickets += len(ticket_rows)
+
+        self.counts["reservations"] = reservations
+        self.counts["tickets"] = tickets
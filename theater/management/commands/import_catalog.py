@@ -0,0 +1,338 @@
+import csv
+import json
+import pathlib
+import time
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from theater.cache import bump_versions
+from theater.models import Actor, Genre, Performance, Play, TheatreHall
+from theater.utils import bulk_insert, copy_rows
+
+
+SECTIONS = ("genres", "actors", "theatre_halls", "plays", "performances")
+LIST_SEPARATOR = "|"
+MAX_REPORTED_ERRORS = 20
+
+
+def read_rows(path: str):
+    """
+    Yields `(line, row)` pairs of a CSV file with a header row
+    or of a JSON lines file (`.jsonl`, `.ndjson`) of objects.
+    """
+    path = pathlib.Path(path)
+
+    try:
+        with path.open(encoding="utf-8", newline="") as file:
+            if path.suffix in (".jsonl", ".ndjson"):
+                for line, text in enumerate(file, start=1):
+                    if text.strip():
+                        yield line, json.loads(text)
+            else:
+                reader = csv.DictReader(file)
+                for row in reader:
+                    yield reader.line_num, row
+    except OSError as error:
+        raise CommandError(f"Cannot read {path}: {error}")
+    except json.JSONDecodeError as error:
+        raise CommandError(f"{path.name}: {error}")
+
+
+def split_names(value) -> list:
+    """`["a", "b"]` in JSON lines, `"a|b"` in CSV."""
+    if not value:
+        return []
+    if isinstance(value, str):
+        value = value.split(LIST_SEPARATOR)
+    return [name.strip() for name in value if name and name.strip()]
+
+
+class CatalogImporter:
+    """
+    Loads catalog rows in bulk. References are resolved in memory by
+    natural keys: genre name, actor full name, theatre hall name and
+    play title. Rows whose key already exists in the database or
+    earlier in the file are skipped, as are performances of the same
+    play in the same hall at the same time, so importing the same
+    files again adds nothing.
+    """
+
+    def __init__(self, batch_size: int):
+        self.batch_size = batch_size
+        self.errors = []
+        self.counts = {}
+        self.genres = dict(Genre.objects.values_list("name", "id"))
+        self.actors = {
+            f"{first_name} {last_name}": pk
+            for pk, first_name, last_name in Actor.objects.values_list(
+                "id", "first_name", "last_name"
+            )
+        }
+        # The oldest object wins when names repeat.
+        self.theatre_halls = dict(
+            TheatreHall.objects.order_by("-id").values_list("name", "id")
+        )
+        self.plays = dict(
+            Play.objects.order_by("-id").values_list("title", "id")
+        )
+
+    def error(self, source: str, line, message: str) -> None:
+        self.errors.append(f"{source}:{line}: {message}")
+
+    def clean(self, model, row: dict, fields, source: str, line):
+        """
+        Values of `fields` in `row` converted and validated by the
+        model fields, None if any of them is invalid.
+        """
+        values = []
+        valid = True
+
+        for name in fields:
+            try:
+                values.append(
+                    model._meta.get_field(name).clean(row.get(name), None)
+                )
+            except ValidationError as error:
+                self.error(source, line, f"{name}: {' '.join(error)}")
+                valid = False
+
+        return values if valid else None
+
+    def resolve(self, known: dict, names, kind: str, source: str, line):
+        """Ids of `names`, None if one of them is unknown."""
+        ids = []
+        for name in names:
+            if known.get(name) is None:
+                self.error(source, line, f"Unknown {kind} {name!r}.")
+                return None
+            ids.append(known[name])
+        return list(dict.fromkeys(ids))
+
+    def import_objects(self, model, fields, rows, source, known, key):
+        """Creates objects of `model`, skipping keys already `known`."""
+        new = {}
+        skipped = 0
+
+        for line, row in rows:
+            values = self.clean(model, row, fields, source, line)
+            if values is None:
+                continue
+            if key(values) in known or key(values) in new:
+                skipped += 1
+                continue
+            new[key(values)] = values
+
+        ids = bulk_insert(model, fields, new.values(), self.batch_size)
+        known.update(zip(new, ids))
+        return len(new), skipped
+
+    def import_genres(self, rows, source: str) -> None:
+        self.counts["genres"] = self.import_objects(
+            Genre, ("name",), rows, source, self.genres,
+            lambda values: values[0]
+        )
+
+    def import_actors(self, rows, source: str) -> None:
+        self.counts["actors"] = self.import_objects(
+            Actor, ("first_name", "last_name"), rows, source, self.actors,
+            lambda values: " ".join(values)
+        )
+
+    def import_theatre_halls(self, rows, source: str) -> None:
+        self.counts["theatre_halls"] = self.import_objects(
+            TheatreHall, ("name", "rows", "seats_in_row"), rows, source,
+            self.theatre_halls, lambda values: values[0]
+        )
+
+    def import_plays(self, rows, source: str) -> None:
+        new = {}
+        skipped = 0
+
+        for line, row in rows:
+            values = self.clean(
+                Play, row, ("title", "description"), source, line
+            )
+            genre_ids = self.resolve(
+                self.genres, split_names(row.get("genres")),
+                "genre", source, line
+            )
+            actor_ids = self.resolve(
+                self.actors, split_names(row.get("actors")),
+                "actor", source, line
+            )
+            if values is None or genre_ids is None or actor_ids is None:
+                continue
+            if values[0] in self.plays or values[0] in new:
+                skipped += 1
+                continue
+            new[values[0]] = (values, genre_ids, actor_ids)
+
+        play_ids = bulk_insert(
+            Play,
+            ("title", "description"),
+            (values for values, _, _ in new.values()),
+            self.batch_size
+        )
+        self.plays.update(zip(new, play_ids))
+
+        relations = list(zip(play_ids, new.values()))
+        copy_rows(
+            Play.genres.through,
+            ("play_id", "genre_id"),
+            (
+                (play_id, genre_id)
+                for play_id, (_, genre_ids, _) in relations
+                for genre_id in genre_ids
+            ),
+            self.batch_size
+        )
+        copy_rows(
+            Play.actors.through,
+            ("play_id", "actor_id"),
+            (
+                (play_id, actor_id)
+                for play_id, (_, _, actor_ids) in relations
+                for actor_id in actor_ids
+            ),
+            self.batch_size
+        )
+
+        for start in range(0, len(play_ids), self.batch_size):
+            Play.update_search_vectors(
+                play_ids[start:start + self.batch_size]
+            )
+
+        self.counts["plays"] = (len(new), skipped)
+
+    def import_performances(self, rows, source: str) -> None:
+        new = {}
+
+        for line, row in rows:
+            play_id = self.resolve(
+                self.plays, [row.get("play")], "play", source, line
+            )
+            hall_id = self.resolve(
+                self.theatre_halls, [row.get("theatre_hall")],
+                "theatre hall", source, line
+            )
+            values = self.clean(
+                Performance, row, ("show_time",), source, line
+            )
+            if values is None or play_id is None or hall_id is None:
+                continue
+
+            show_time = values[0]
+            if timezone.is_naive(show_time):
+                show_time = timezone.make_aware(show_time)
+            new[(play_id[0], hall_id[0], show_time)] = None
+
+        existing = set(
+            Performance.objects.filter(
+                play_id__in={play_id for play_id, _, _ in new}
+            ).values_list("play_id", "theatre_hall_id", "show_time")
+        )
+        created = [key for key in new if key not in existing]
+
+        copy_rows(
+            Performance,
+            ("play_id", "theatre_hall_id", "show_time", "tickets_sold"),
+            ((*key, 0) for key in created),
+            self.batch_size
+        )
+        self.counts["performances"] = (
+            len(created), len(new) - len(created)
+        )
+
+
+class Command(BaseCommand):
+    """Django command to import the catalog from CSV or JSON lines"""
+
+    help = (
+        "Imports genres, actors, theatre halls, plays and performances "
+        "from CSV or JSON lines files in one transaction. Plays refer "
+        "to genres by name and to actors by full name (`|` separated "
+        "in CSV), performances refer to a play title and a theatre "
+        "hall name."
+    )
+
+    def add_arguments(self, parser):
+        for section in SECTIONS:
+            parser.add_argument(
+                f"--{section.replace('_', '-')}",
+                dest=section,
+                metavar="FILE",
+                help=f"CSV or JSON lines file of {section.replace('_', ' ')}."
+            )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=5000,
+            help="Rows per INSERT statement.",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Validate and resolve every row, then roll back.",
+        )
+
+    def handle(self, *args, **options) -> None:
+        files = {
+            section: options[section]
+            for section in SECTIONS
+            if options[section]
+        }
+        if not files:
+            raise CommandError(
+                "Pass at least one of "
+                + ", ".join(f"--{s.replace('_', '-')}" for s in SECTIONS)
+            )
+
+        started = time.monotonic()
+
+        with transaction.atomic():
+            importer = CatalogImporter(options["batch_size"])
+            for section, path in files.items():
+                getattr(importer, f"import_{section}")(
+                    read_rows(path), pathlib.Path(path).name
+                )
+
+            if importer.errors:
+                raise CommandError(
+                    "\n".join(
+                        [
+                            f"{len(importer.errors)} invalid row(s), "
+                            f"nothing was imported:",
+                            *importer.errors[:MAX_REPORTED_ERRORS],
+                        ]
+                    )
+                )
+
+            if options["dry_run"]:
+                transaction.set_rollback(True)
+            else:
+                bump_versions(
+                    "genre", "actor", "theatre_hall", "play", "performance"
+                )
+
+        elapsed = time.monotonic() - started
+        total = 0
+        for section, (created, skipped) in importer.counts.items():
+            total += created + skipped
+            self.stdout.write(
+                f"{section}: {created} new, {skipped} already present"
+            )
+
+        if options["dry_run"]:
+            self.stdout.write(
+                self.style.WARNING("Dry run, nothing was imported.")
+            )
+        else:
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"Imported {total} row(s) in {elapsed:.2f}s "
+                    f"({total / max(elapsed, 1e-6):.0f} rows/s)."
+                )
+            )
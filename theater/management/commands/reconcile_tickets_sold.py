@@ -0,0 +1,61 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from theater.models import Performance, Ticket
+
+
+class Command(BaseCommand):
+    """Django command to compare and repair sold tickets counters"""
+
+    help = (
+        "Recounts tickets of every performance and fixes "
+        "`Performance.tickets_sold` where it drifted."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only report performances with a wrong counter.",
+        )
+
+    def handle(self, *args, **options) -> None:
+        actual = Coalesce(
+            Subquery(
+                Ticket.objects.filter(performance=OuterRef("pk"))
+                .values("performance")
+                .annotate(count=Count("id"))
+                .values("count")
+            ),
+            0
+        )
+
+        with transaction.atomic():
+            drifted = list(
+                Performance.objects.select_for_update()
+                .annotate(actual=actual)
+                .exclude(tickets_sold=F("actual"))
+                .values_list("id", "tickets_sold", "actual")
+            )
+
+            for performance_id, tickets_sold, actual_count in drifted:
+                self.stdout.write(
+                    f"Performance {performance_id}: counter {tickets_sold}, "
+                    f"actual {actual_count}"
+                )
+
+            if drifted and not options["dry_run"]:
+                Performance.objects.filter(
+                    pk__in=[performance_id for performance_id, *_ in drifted]
+                ).update(tickets_sold=actual)
+
+        if not drifted:
+            message = "All sold tickets counters are correct."
+        elif options["dry_run"]:
+            message = f"{len(drifted)} counter(s) are out of date."
+        else:
+            message = f"{len(drifted)} counter(s) repaired."
+
+        self.stdout.write(self.style.SUCCESS(message))
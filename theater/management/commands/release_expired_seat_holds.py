@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from theater.models import SeatHold
+
+
+class Command(BaseCommand):
+    """Django command to delete expired seat holds in bulk"""
+
+    help = "Deletes every seat hold whose TTL has passed."
+
+    def handle(self, *args, **kwargs) -> None:
+        released = SeatHold.release_expired()
+        self.stdout.write(
+            self.style.SUCCESS(f"{released} expired seat hold(s) released.")
+        )
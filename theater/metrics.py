@@ -0,0 +1,150 @@
+import os
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+
+# Set PROMETHEUS_MULTIPROC_DIR to an empty directory shared by the
+# worker processes to aggregate their metrics. It must be set before
+# the workers start and the master must call mark_process_dead() when
+# a worker exits, see the prometheus_client documentation.
+MULTIPROCESS_DIR_VARIABLE = "PROMETHEUS_MULTIPROC_DIR"
+
+LABELS = ("route", "method")
+
+REQUESTS = Counter(
+    "theater_requests",
+    "Handled requests by route and status code.",
+    (*LABELS, "status"),
+)
+REQUEST_DURATION = Histogram(
+    "theater_request_duration_seconds",
+    "Time to build a response, streamed content excluded.",
+    LABELS,
+)
+REQUEST_DB_DURATION = Histogram(
+    "theater_request_db_duration_seconds",
+    "Time spent in SQL queries per request.",
+    LABELS,
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1,
+             2.5, 5),
+)
+RESPONSE_SIZE = Histogram(
+    "theater_response_size_bytes",
+    "Size of response bodies, streamed responses excluded.",
+    LABELS,
+    buckets=[256 * 4 ** power for power in range(9)],
+)
+RESERVATIONS = Counter(
+    "theater_reservations",
+    "Created reservations.",
+)
+TICKETS_SOLD = Counter(
+    "theater_tickets_sold",
+    "Sold tickets.",
+)
+SEAT_CONFLICTS = Counter(
+    "theater_seat_conflicts",
+    "Seats taken or held by someone else between validation and "
+    "insert (IntegrityError), by what was being created.",
+    ("kind",),
+)
+
+DB_POOL_CONNECTIONS = Gauge(
+    "theater_db_pool_connections",
+    "Pooled database connections by state (in_use, idle).",
+    ("alias", "state"),
+    multiprocess_mode="livesum",
+)
+DB_POOL_WAITING = Gauge(
+    "theater_db_pool_requests_waiting",
+    "Requests waiting for a pooled database connection.",
+    ("alias",),
+    multiprocess_mode="livesum",
+)
+DB_POOL_REQUESTS = Counter(
+    "theater_db_pool_requests",
+    "Connections requested from the pool.",
+    ("alias",),
+)
+DB_POOL_WAIT = Counter(
+    "theater_db_pool_wait_seconds",
+    "Time spent waiting for pooled connections.",
+    ("alias",),
+)
+DB_POOL_ERRORS = Counter(
+    "theater_db_pool_errors",
+    "Connection requests that failed or timed out.",
+    ("alias",),
+)
+
+
+def route_name(view_func, request) -> str:
+    """
+    `<basename>-<action>` of viewset actions (ex. `reservation-create`),
+    the URL name of other views (ex. `token_obtain_pair`).
+    """
+    actions = getattr(view_func, "actions", None)
+    if actions:
+        basename = view_func.initkwargs.get("basename")
+        action = actions.get(request.method.lower(), request.method.lower())
+        return f"{basename}-{action}"
+
+    return request.resolver_match.url_name or "unnamed"
+
+
+def observe_request(route: str, method: str, status: int, duration: float,
+                    db_duration: float, size) -> None:
+    REQUESTS.labels(route, method, status).inc()
+    REQUEST_DURATION.labels(route, method).observe(duration)
+    REQUEST_DB_DURATION.labels(route, method).observe(db_duration)
+    if size is not None:
+        RESPONSE_SIZE.labels(route, method).observe(size)
+
+
+def reservation_created(tickets: int) -> None:
+    RESERVATIONS.inc()
+    TICKETS_SOLD.inc(tickets)
+
+
+def observe_pool(alias: str, stats: dict) -> None:
+    """Records `ConnectionPool.pop_stats()` of the pool of `alias`."""
+    DB_POOL_CONNECTIONS.labels(alias, "in_use").set(
+        stats["pool_size"] - stats["pool_available"]
+    )
+    DB_POOL_CONNECTIONS.labels(alias, "idle").set(stats["pool_available"])
+    DB_POOL_WAITING.labels(alias).set(stats.get("requests_waiting", 0))
+    DB_POOL_REQUESTS.labels(alias).inc(stats.get("requests_num", 0))
+    DB_POOL_WAIT.labels(alias).inc(stats.get("requests_wait_ms", 0) / 1000)
+    DB_POOL_ERRORS.labels(alias).inc(stats.get("requests_errors", 0))
+
+
+def mark_process_dead(pid: int) -> None:
+    """
+    Drops the `livesum` gauges of an exited worker in multiprocess
+    mode, called by the server master (see gunicorn.conf.py).
+    """
+    if os.environ.get(MULTIPROCESS_DIR_VARIABLE):
+        multiprocess.mark_process_dead(pid)
+
+
+def export() -> tuple:
+    """
+    `(body, content type)` of all metrics in the Prometheus text
+    format, those of every worker process in multiprocess mode.
+    """
+    if os.environ.get(MULTIPROCESS_DIR_VARIABLE):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+
+    return generate_latest(registry), CONTENT_TYPE_LATEST
@@ -0,0 +1,278 @@
+import logging
+import random
+import time
+from contextvars import ContextVar
+from types import MethodType
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.utils.functional import LazyObject
+
+from theater import metrics, routers
+
+
+logger = logging.getLogger(__name__)
+
+# Timers of the current request, context variables follow requests
+# into the threads of sync_to_async, unlike connection wrappers
+query_timers = ContextVar("query_timers", default=())
+
+
+class QueryTimer:
+    """Counts the queries of a request and their time."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def start(self) -> None:
+        self.token = query_timers.set((*query_timers.get(), self))
+
+    def stop(self) -> None:
+        query_timers.reset(self.token)
+
+
+def record_queries(execute, sql, params, many, context):
+    """Database execute wrapper feeding the timers of the request."""
+    timers = query_timers.get()
+    if not timers:
+        return execute(sql, params, many, context)
+
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        duration = time.perf_counter() - started
+        for timer in timers:
+            timer.duration += duration
+            timer.count += 1
+
+
+class RequestMiddleware:
+    """
+    Runs `before()` and `after()` around each request in the thread
+    or task handling it, so it suits both WSGI and ASGI. `close()`
+    runs last, even when the view raised.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    hooks = ("process_view", "process_template_response")
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+            # Sync hooks would be sent to the sync thread of Django
+            for name in self.hooks:
+                if hasattr(self, name):
+                    setattr(self, name, self.async_hook(getattr(self, name)))
+
+    def async_hook(self, hook):
+        async def run_hook(middleware, *args):
+            return hook(*args)
+
+        # Bound like the hook, Django reports errors with its __self__
+        return MethodType(run_hook, self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        self.before(request)
+        try:
+            return self.after(request, self.get_response(request))
+        finally:
+            self.close(request)
+
+    async def __acall__(self, request):
+        self.before(request)
+        try:
+            return self.after(request, await self.get_response(request))
+        finally:
+            self.close(request)
+
+    def before(self, request) -> None:
+        pass
+
+    def after(self, request, response):
+        return response
+
+    def close(self, request) -> None:
+        pass
+
+
+class RequestTiming:
+    def __init__(self):
+        self.queries = QueryTimer()
+        self.started = time.perf_counter()
+        # {phase: (time, SQL time so far)} of the moments phases start
+        self.marks = {}
+
+    def mark(self, phase: str) -> None:
+        self.marks[phase] = (time.perf_counter(), self.queries.duration)
+
+    def metrics(self) -> dict:
+        """Milliseconds spent per phase, SQL time excluded from phases."""
+        self.mark("end")
+        end, db_end = self.marks["end"]
+        metrics = {
+            "total": end - self.started,
+            "db": self.queries.duration,
+        }
+
+        phases = [phase for phase in ("view", "render") if phase in self.marks]
+        for phase, following in zip(phases, [*phases[1:], "end"]):
+            started, db_started = self.marks[phase]
+            ended, db_ended = self.marks[following]
+            metrics[phase] = (ended - started) - (db_ended - db_started)
+
+        return {
+            name: round(value * 1000, 2) for name, value in metrics.items()
+        }
+
+
+class ServerTimingMiddleware(RequestMiddleware):
+    """
+    Times a sample of requests (`REQUEST_TIMING_SAMPLE_RATE`): the
+    total time, SQL queries and their time, the view with its
+    serializers and the rendering of the response. Timings are logged
+    as one line per request and sent in the `Server-Timing` header to
+    staff users and `INTERNAL_IPS`, or to everybody with
+    `REQUEST_TIMING_PUBLIC_HEADER`. Must be the first middleware to
+    include all of them in `total`.
+    """
+
+    descriptions = {
+        "total": "Total",
+        "view": "View and serializers",
+        "render": "Rendering",
+    }
+
+    def before(self, request) -> None:
+        if random.random() < settings.REQUEST_TIMING_SAMPLE_RATE:
+            request._timing = RequestTiming()
+            request._timing.queries.start()
+
+    def after(self, request, response):
+        timing = getattr(request, "_timing", None)
+        if timing is None:
+            return response
+
+        metrics = timing.metrics()
+        if self.shows_header(request):
+            self.add_header(response, metrics, timing.queries.count)
+        self.log(request, response, metrics, timing.queries.count)
+        return response
+
+    def close(self, request) -> None:
+        # Threads serve many requests, their timers must not pile up
+        if hasattr(request, "_timing"):
+            request._timing.queries.stop()
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if hasattr(request, "_timing"):
+            request._timing.mark("view")
+
+    def process_template_response(self, request, response):
+        if hasattr(request, "_timing"):
+            request._timing.mark("render")
+        return response
+
+    @staticmethod
+    def shows_header(request) -> bool:
+        if settings.REQUEST_TIMING_PUBLIC_HEADER:
+            return True
+        if request.META.get("REMOTE_ADDR") in settings.INTERNAL_IPS:
+            return True
+
+        # The API sets the user it authenticated, the lazy session user
+        # is not loaded for this
+        user = getattr(request, "user", None)
+        if isinstance(user, LazyObject):
+            return False
+        return getattr(user, "is_staff", False)
+
+    def add_header(self, response, metrics: dict, queries: int) -> None:
+        entries = []
+        for name, duration in metrics.items():
+            if name == "db":
+                description = f"{queries} SQL queries"
+            else:
+                description = self.descriptions[name]
+            entries.append(f'{name};dur={duration};desc="{description}"')
+
+        if response.has_header("Server-Timing"):
+            entries.insert(0, response["Server-Timing"])
+        response["Server-Timing"] = ", ".join(entries)
+
+    def log(self, request, response, metrics: dict, queries: int) -> None:
+        if not logger.isEnabledFor(logging.INFO):
+            return
+
+        fields = {
+            "method": request.method,
+            "path": request.path,
+            "status": response.status_code,
+            "queries": queries,
+            **{f"{name}_ms": duration for name, duration in metrics.items()},
+        }
+        logger.info(
+            " ".join(f"{name}={value}" for name, value in fields.items()),
+            extra={"timing": fields},
+        )
+
+
+class MetricsMiddleware(RequestMiddleware):
+    """
+    Records the latency, SQL time, response size and status of every
+    request in the Prometheus metrics, labelled by route.
+    """
+
+    def before(self, request) -> None:
+        request._metrics_route = "unmatched"
+        request._metrics_queries = QueryTimer()
+        request._metrics_queries.start()
+        request._metrics_started = time.perf_counter()
+
+    def after(self, request, response):
+        metrics.observe_request(
+            request._metrics_route,
+            request.method,
+            response.status_code,
+            time.perf_counter() - request._metrics_started,
+            request._metrics_queries.duration,
+            None if response.streaming else len(response.content),
+        )
+        return response
+
+    def close(self, request) -> None:
+        request._metrics_queries.stop()
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request._metrics_route = metrics.route_name(view_func, request)
+
+
+class ReplicaRoutingMiddleware(RequestMiddleware):
+    """
+    Makes the request available to `ReplicaRouter` and pins reads of
+    a user to the primary after each of their successful writes.
+    Must follow `AuthenticationMiddleware`.
+    """
+
+    def before(self, request) -> None:
+        routers.current_request.set(request)
+
+    def after(self, request, response):
+        routers.current_request.set(None)
+
+        if (
+            settings.REPLICA_DATABASES
+            and request.method not in routers.SAFE_METHODS
+            and response.status_code < 400
+            and request.user.is_authenticated
+        ):
+            routers.pin_to_primary(request.user)
+
+        return response
@@ -0,0 +1,47 @@
+# Generated by Django 4.2.16 on 2026-10-18 19:17
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_tickets_sold(apps, schema_editor):
+    Performance = apps.get_model("theater", "Performance")
+    Ticket = apps.get_model("theater", "Ticket")
+    tickets_sold = (
+        Ticket.objects.filter(performance=OuterRef("pk"))
+        .values("performance")
+        .annotate(count=Count("id"))
+        .values("count")
+    )
+    Performance.objects.update(tickets_sold=Coalesce(Subquery(tickets_sold), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("theater", "0003_play_image"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="performance",
+            name="tickets_sold",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(count_tickets_sold, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name="play",
+            name="actors",
+            field=models.ManyToManyField(
+                blank=True, related_name="plays", to="theater.actor"
+            ),
+        ),
+        migrations.AlterField(
+            model_name="play",
+            name="genres",
+            field=models.ManyToManyField(
+                blank=True, related_name="plays", to="theater.genre"
+            ),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 4.2.16 on 2026-10-18 19:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("theater", "0005_seathold"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="performance",
+            index=models.Index(
+                fields=["show_time", "id"], name="theater_per_show_ti_07e009_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="reservation",
+            index=models.Index(
+                fields=["user", "created_at", "id"],
+                name="theater_res_user_id_171572_idx",
+            ),
+        ),
+    ]
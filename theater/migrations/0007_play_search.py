@@ -0,0 +1,60 @@
+# Generated by Django 4.2.16 on 2026-10-18 19:25
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+import django.db.models.functions.text
+
+
+UPDATE_SEARCH_VECTORS = """
+UPDATE theater_play p SET search_vector =
+    setweight(to_tsvector('english', p.title), 'A')
+    || setweight(to_tsvector('english', coalesce((
+        SELECT string_agg(g.name, ' ')
+        FROM theater_genre g
+        JOIN theater_play_genres pg ON pg.genre_id = g.id
+        WHERE pg.play_id = p.id
+    ), '')), 'B')
+    || setweight(to_tsvector('english', coalesce((
+        SELECT string_agg(a.first_name || ' ' || a.last_name, ' ')
+        FROM theater_actor a
+        JOIN theater_play_actors pa ON pa.actor_id = a.id
+        WHERE pa.play_id = p.id
+    ), '')), 'B')
+    || setweight(to_tsvector('english', p.description), 'C');
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("theater", "0006_keyset_pagination_indexes"),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name="play",
+            name="search_vector",
+            field=django.contrib.postgres.search.SearchVectorField(
+                editable=False, null=True
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="play",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["search_vector"], name="theater_pla_search__75facd_gin"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="play",
+            index=django.contrib.postgres.indexes.GinIndex(
+                django.contrib.postgres.indexes.OpClass(
+                    django.db.models.functions.text.Upper("title"), name="gin_trgm_ops"
+                ),
+                name="theater_play_title_trgm",
+            ),
+        ),
+        migrations.RunSQL(UPDATE_SEARCH_VECTORS, migrations.RunSQL.noop),
+    ]
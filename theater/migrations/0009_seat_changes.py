@@ -0,0 +1,67 @@
+# Generated by Django 4.2.16 on 2026-10-18 20:36
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("theater", "0008_performance_schedule_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="performance",
+            name="compacted_seat_version",
+            field=models.PositiveBigIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="performance",
+            name="seat_version",
+            field=models.PositiveBigIntegerField(default=0, editable=False),
+        ),
+        # Rows copied without these columns (generate_load_data) start at 0
+        migrations.RunSQL(
+            "ALTER TABLE theater_performance "
+            "ALTER COLUMN seat_version SET DEFAULT 0, "
+            "ALTER COLUMN compacted_seat_version SET DEFAULT 0",
+            "ALTER TABLE theater_performance "
+            "ALTER COLUMN seat_version DROP DEFAULT, "
+            "ALTER COLUMN compacted_seat_version DROP DEFAULT",
+        ),
+        migrations.CreateModel(
+            name="SeatChange",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("version", models.PositiveBigIntegerField()),
+                ("row", models.IntegerField()),
+                ("seat", models.IntegerField()),
+                ("taken", models.BooleanField()),
+                (
+                    "performance",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="seat_changes",
+                        to="theater.performance",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["performance", "version"],
+                        name="seat_change_version_idx",
+                    )
+                ],
+            },
+        ),
+    ]
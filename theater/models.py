@@ -1,10 +1,19 @@
+import math
 import pathlib
 import uuid
 
 from django.conf import settings
-from django.db import models
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.contrib.postgres.search import SearchVector, SearchVectorField
+from django.core.cache import cache
+from django.db import connection, models, transaction
+from django.db.models.functions import Coalesce, Concat, Greatest, Upper
+from django.utils import timezone
 from django.utils.text import slugify
 
+from theater.cache import HOLD_EXPIRY_KEY, seat_holds_changed
+
 
 class Genre(models.Model):
     name = models.CharField(max_length=255, unique=True)
@@ -18,7 +27,7 @@ class Actor(models.Model):
     last_name = models.CharField(max_length=255)
 
     @property
-    def full_name(self):
+    def full_name(self) -> str:
         return f"{self.first_name} {self.last_name}"
 
     def __str__(self):
@@ -37,10 +46,68 @@ class Play(models.Model):
     genres = models.ManyToManyField(Genre, related_name="plays", blank=True)
     actors = models.ManyToManyField(Actor, related_name="plays", blank=True)
     image = models.ImageField(null=True, upload_to=play_image_path)
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    SEARCH_CONFIG = "english"
+
+    class Meta:
+        indexes = (
+            GinIndex(fields=("search_vector",)),
+            # Serves `title__icontains`, which compares UPPER(title).
+            GinIndex(
+                OpClass(Upper("title"), name="gin_trgm_ops"),
+                name="theater_play_title_trgm",
+            ),
+        )
 
     def __str__(self):
         return self.title
 
+    @staticmethod
+    def update_search_vectors(play_ids) -> None:
+        """
+        Rebuilds the search document of the given plays in one UPDATE:
+        title (A), genre names and actor full names (B), description (C).
+        """
+        genre_names = (
+            Genre.objects.filter(plays=models.OuterRef("pk"))
+            .values("plays")
+            .annotate(names=StringAgg("name", " "))
+            .values("names")
+        )
+        actor_names = (
+            Actor.objects.filter(plays=models.OuterRef("pk"))
+            .values("plays")
+            .annotate(
+                names=StringAgg(
+                    Concat("first_name", models.Value(" "), "last_name"),
+                    " "
+                )
+            )
+            .values("names")
+        )
+
+        def vector(expression, weight):
+            return SearchVector(
+                expression, weight=weight, config=Play.SEARCH_CONFIG
+            )
+
+        def names(subquery):
+            return Coalesce(
+                models.Subquery(subquery),
+                models.Value(""),
+                output_field=models.TextField()
+            )
+
+        Play.objects.filter(pk__in=play_ids).update(
+            search_vector=(
+                vector("title", "A")
+                + vector(names(genre_names), "B")
+                + vector(names(actor_names), "B")
+                + vector("description", "C")
+            )
+        )
+
 
 class TheatreHall(models.Model):
     name = models.CharField(max_length=255)
@@ -62,11 +129,64 @@ class Performance(models.Model):
         TheatreHall, on_delete=models.CASCADE, related_name="performances"
     )
     show_time = models.DateTimeField()
+    tickets_sold = models.PositiveIntegerField(default=0, editable=False)
+    # Version of the taken seats, changes up to the compacted version
+    # are no longer in the seat change log
+    seat_version = models.PositiveBigIntegerField(default=0, editable=False)
+    compacted_seat_version = models.PositiveBigIntegerField(
+        default=0, editable=False
+    )
+
+    class Meta:
+        indexes = (
+            models.Index(fields=("show_time", "id")),
+            models.Index(
+                fields=("theatre_hall", "show_time"),
+                name="performance_hall_time_idx",
+            ),
+            models.Index(
+                fields=("play", "show_time"),
+                name="performance_play_time_idx",
+            ),
+        )
 
     def __str__(self):
         return (f"Play: {self.play.title}, "
                 f"theatre hall: {self.theatre_hall.name}")
 
+    @staticmethod
+    def update_tickets_sold(counts: dict) -> None:
+        """
+        Applies `{performance_id: delta}` to the sold tickets counters
+        in one UPDATE.
+        """
+        counts = {pk: delta for pk, delta in counts.items() if delta}
+        if not counts:
+            return
+
+        delta = models.Case(
+            *[
+                models.When(pk=performance_id, then=models.Value(delta))
+                for performance_id, delta in counts.items()
+            ],
+            output_field=models.IntegerField()
+        )
+        Performance.objects.filter(pk__in=counts).update(
+            tickets_sold=Greatest(models.F("tickets_sold") + delta, 0)
+        )
+
+
+def seats_condition(seats) -> models.Q:
+    """
+    Builds a filter matching any of `(performance_id, row, seat)` triples.
+    """
+    condition = models.Q()
+    for performance_id, row, seat in seats:
+        condition |= models.Q(
+            performance_id=performance_id, row=row, seat=seat
+        )
+    return condition
+
 
 class Ticket(models.Model):
     row = models.IntegerField()
@@ -109,6 +229,22 @@ class Ticket(models.Model):
                 }
             )
 
+    @staticmethod
+    def find_taken_seats(seats) -> set:
+        """
+        Returns the subset of `(performance_id, row, seat)` triples
+        that are already sold, using a single query.
+        """
+        seats = set(seats)
+        if not seats:
+            return set()
+
+        return set(
+            Ticket.objects.filter(seats_condition(seats)).values_list(
+                "performance_id", "row", "seat"
+            )
+        )
+
     def clean(self):
         self.ticket_validate(
             self.row,
@@ -139,5 +275,218 @@ class Reservation(models.Model):
         related_name="reservations"
     )
 
+    class Meta:
+        indexes = (
+            models.Index(fields=("user", "created_at", "id")),
+        )
+
     def __str__(self):
         return f"{self.created_at}"
+
+
+class SeatHold(models.Model):
+    row = models.IntegerField()
+    seat = models.IntegerField()
+    performance = models.ForeignKey(
+        Performance,
+        on_delete=models.CASCADE,
+        related_name="seat_holds"
+    )
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="seat_holds"
+    )
+    expires_at = models.DateTimeField()
+
+    class Meta:
+        unique_together = ("row", "seat", "performance")
+        indexes = (
+            models.Index(fields=("performance", "expires_at")),
+            models.Index(fields=("expires_at",)),
+        )
+
+    def __str__(self):
+        return (f"Performance: {self.performance_id}, "
+                f"Row: {self.row}, seat: {self.seat}, "
+                f"until {self.expires_at}.")
+
+    @staticmethod
+    def active():
+        return SeatHold.objects.filter(expires_at__gt=timezone.now())
+
+    @staticmethod
+    def find_held_seats(seats, exclude_user=None) -> set:
+        """
+        Returns the subset of `(performance_id, row, seat)` triples
+        that are held by somebody other than `exclude_user`.
+        """
+        seats = set(seats)
+        if not seats:
+            return set()
+
+        holds = SeatHold.active().filter(seats_condition(seats))
+        if exclude_user is not None:
+            holds = holds.exclude(user=exclude_user)
+
+        return set(holds.values_list("performance_id", "row", "seat"))
+
+    @staticmethod
+    def release_expired() -> int:
+        """Deletes all expired holds with one query."""
+        expired = SeatHold.objects.filter(expires_at__lte=timezone.now())
+        performance_ids = set(
+            expired.values_list("performance_id", flat=True).distinct()
+        )
+        deleted, _ = expired.delete()
+        seat_holds_changed(performance_ids)
+        return deleted
+
+    @staticmethod
+    def expire() -> None:
+        """
+        Releases expired holds once the earliest hold has expired, so
+        the versions of their performances change like on any other
+        release. The earliest expiry is kept in the cache for at most
+        `SEAT_HOLD_TTL`, until then checking it costs no SQL.
+        """
+        now = timezone.now()
+        expiry = cache.get(HOLD_EXPIRY_KEY)
+        if expiry is not None and expiry > now.timestamp():
+            return
+
+        earliest = SeatHold.objects.aggregate(
+            earliest=models.Min("expires_at")
+        )["earliest"]
+        if earliest is not None and earliest <= now:
+            SeatHold.release_expired()
+            earliest = SeatHold.objects.aggregate(
+                earliest=models.Min("expires_at")
+            )["earliest"]
+
+        cache.set(
+            HOLD_EXPIRY_KEY,
+            math.inf if earliest is None else earliest.timestamp(),
+            settings.SEAT_HOLD_TTL.total_seconds()
+        )
+
+
+class SeatChange(models.Model):
+    """
+    Append-only log of seats taken and released, each change of a
+    performance gets its next `seat_version`.
+    """
+    performance = models.ForeignKey(
+        Performance,
+        on_delete=models.CASCADE,
+        related_name="seat_changes"
+    )
+    version = models.PositiveBigIntegerField()
+    row = models.IntegerField()
+    seat = models.IntegerField()
+    taken = models.BooleanField()
+
+    class Meta:
+        indexes = (
+            models.Index(
+                fields=("performance", "version"),
+                name="seat_change_version_idx",
+            ),
+        )
+
+    def __str__(self):
+        return (f"Performance: {self.performance_id}, "
+                f"version {self.version}, row: {self.row}, "
+                f"seat: {self.seat}, taken: {self.taken}.")
+
+    @staticmethod
+    def record(taken: bool, seats) -> dict:
+        """
+        Logs `(performance_id, row, seat)` triples as taken or released
+        under the next version of each performance, with one query.
+        Returns `{performance_id: version}`.
+        """
+        seats = sorted(set(seats))
+        if not seats:
+            return {}
+
+        quote = connection.ops.quote_name
+        performance_ids, rows, seat_numbers = zip(*seats)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                WITH bumped AS (
+                    UPDATE {quote(Performance._meta.db_table)}
+                    SET seat_version = seat_version + 1
+                    WHERE id = ANY(%s)
+                    RETURNING id, seat_version
+                )
+                INSERT INTO {quote(SeatChange._meta.db_table)}
+                    (performance_id, version, {quote("row")}, seat, taken)
+                SELECT
+                    bumped.id, bumped.seat_version,
+                    changed.row, changed.seat, %s
+                FROM unnest(%s::bigint[], %s::integer[], %s::integer[])
+                    AS changed(performance_id, row, seat)
+                JOIN bumped ON bumped.id = changed.performance_id
+                RETURNING performance_id, version
+                """,
+                [
+                    list(set(performance_ids)),
+                    taken,
+                    list(performance_ids),
+                    list(rows),
+                    list(seat_numbers),
+                ]
+            )
+            return dict(cursor.fetchall())
+
+    @staticmethod
+    def changes_since(performance: Performance, version: int):
+        """
+        Seats taken and released after `version`, as `(taken, released)`
+        sets of `(row, seat)` pairs up to `performance.seat_version`.
+        None when the log no longer holds all of those changes.
+        """
+        if not (
+            performance.compacted_seat_version
+            <= version
+            <= performance.seat_version
+        ):
+            return None
+
+        changes = SeatChange.objects.filter(
+            performance=performance,
+            version__gt=version,
+            version__lte=performance.seat_version,
+        ).order_by("version").values_list("version", "row", "seat", "taken")
+
+        versions = set()
+        latest = {}
+        for change_version, row, seat, taken in changes:
+            versions.add(change_version)
+            latest[row, seat] = taken
+
+        # Versions have no gaps, a missing one was compacted meanwhile
+        if len(versions) != performance.seat_version - version:
+            return None
+
+        return (
+            {seat for seat, taken in latest.items() if taken},
+            {seat for seat, taken in latest.items() if not taken},
+        )
+
+    @staticmethod
+    def compact(keep: int) -> int:
+        """
+        Removes changes older than the last `keep` versions of every
+        performance. Returns the number of deleted changes.
+        """
+        with transaction.atomic():
+            Performance.objects.filter(
+                seat_version__gt=models.F("compacted_seat_version") + keep
+            ).update(compacted_seat_version=models.F("seat_version") - keep)
+            deleted, _ = SeatChange.objects.filter(
+                version__lte=models.F("performance__compacted_seat_version")
+            ).delete()
+        return deleted
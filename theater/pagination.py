@@ -0,0 +1,289 @@
+import json
+from base64 import b64decode, b64encode
+
+from django.core import exceptions
+from django.db.models import Q
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import (
+    BasePagination,
+    CursorPagination,
+    LimitOffsetPagination,
+)
+from rest_framework.utils.urls import replace_query_param
+
+from theater.filters import PERFORMANCE_ORDERINGS
+
+
+class CountOptionalLimitOffsetPagination(LimitOffsetPagination):
+    """
+    Limit/offset pagination which skips `COUNT(*)` on `?count=false`.
+    One extra row is fetched instead to find out whether
+    there is a next page, and `count` is returned as null.
+    """
+    count_query_param = "count"
+
+    def skip_count(self, request) -> bool:
+        return request.query_params.get(
+            self.count_query_param, ""
+        ).lower() in ("false", "0")
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if not self.skip_count(request):
+            return super().paginate_queryset(queryset, request, view)
+
+        self.request = request
+        self.limit = self.get_limit(request)
+        if self.limit is None:
+            return None
+
+        self.count = None
+        self.offset = self.get_offset(request)
+        results = list(queryset[self.offset:self.offset + self.limit + 1])
+        self.has_next = len(results) > self.limit
+
+        return results[:self.limit]
+
+    def get_next_link(self):
+        if self.count is not None:
+            return super().get_next_link()
+
+        if not self.has_next:
+            return None
+
+        url = self.request.build_absolute_uri()
+        url = replace_query_param(url, self.limit_query_param, self.limit)
+        return replace_query_param(
+            url, self.offset_query_param, self.offset + self.limit
+        )
+
+    def get_paginated_response_schema(self, schema):
+        response_schema = super().get_paginated_response_schema(schema)
+        response_schema["required"] = ["results"]
+        response_schema["properties"]["count"]["nullable"] = True
+        return response_schema
+
+    def get_schema_operation_parameters(self, view):
+        return super().get_schema_operation_parameters(view) + [
+            {
+                "name": self.count_query_param,
+                "required": False,
+                "in": "query",
+                "description": "Pass false to skip counting all results.",
+                "schema": {"type": "boolean"},
+            }
+        ]
+
+
+class KeysetPagination(CursorPagination):
+    """
+    Cursor pagination keyed on every field of `ordering`, so pages are
+    found with `WHERE show_time >= x AND (show_time, id) > (x, y)`
+    style conditions, which seek an index on the ordering instead of
+    skipping an offset. The cursor holds the key of the first or last
+    row of the current page and the direction.
+    """
+    page_size_query_param = "limit"
+    max_page_size = 100
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.fields = [field.lstrip("-") for field in self.ordering]
+        self.model = queryset.model
+        self.base_url = request.build_absolute_uri()
+        key, self.reverse = self.decode_cursor(request)
+
+        ordering = [
+            self._flip(field) if self.reverse else field
+            for field in self.ordering
+        ]
+        queryset = queryset.order_by(*ordering)
+        if key is not None:
+            queryset = queryset.filter(self._after(key, ordering))
+
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        self.page = results[:self.page_size]
+
+        if self.reverse:
+            self.page.reverse()
+            self.has_next, self.has_previous = key is not None, has_more
+        else:
+            self.has_next, self.has_previous = has_more, key is not None
+
+        if self.template is not None:
+            self.display_page_controls = self.has_next or self.has_previous
+
+        return self.page
+
+    @staticmethod
+    def _flip(field: str) -> str:
+        return field[1:] if field.startswith("-") else f"-{field}"
+
+    def _after(self, key, ordering) -> Q:
+        """Rows following `key` in `ordering` (lexicographic compare)."""
+        condition = Q(pk__in=[])
+        equal = Q()
+
+        for field, value in zip(ordering, key):
+            name = field.lstrip("-")
+            lookup = "lt" if field.startswith("-") else "gt"
+            condition |= equal & Q(**{f"{name}__{lookup}": value})
+            equal &= Q(**{name: value})
+
+        # Redundant bound on the leading field, the OR-chain alone
+        # cannot start an index scan at the key
+        first = ordering[0]
+        lookup = "lte" if first.startswith("-") else "gte"
+        return Q(**{f"{first.lstrip('-')}__{lookup}": key[0]}) & condition
+
+    def _key(self, instance) -> list:
+        if isinstance(instance, dict):
+            values = [instance[field] for field in self.fields]
+        else:
+            values = [getattr(instance, field) for field in self.fields]
+
+        return [
+            value.isoformat() if hasattr(value, "isoformat") else value
+            for value in values
+        ]
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor((self._key(self.page[-1]), False))
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor((self._key(self.page[0]), True))
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None, False
+
+        try:
+            cursor = json.loads(b64decode(encoded.encode("ascii")))
+            key, reverse = cursor["k"], bool(cursor["r"])
+            if len(key) != len(self.ordering):
+                raise ValueError
+            key = [
+                self.model._meta.get_field(field).to_python(value)
+                for field, value in zip(self.fields, key)
+            ]
+            if None in key:
+                raise ValueError
+        except (TypeError, ValueError, KeyError, exceptions.ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+        return key, reverse
+
+    def encode_cursor(self, cursor):
+        key, reverse = cursor
+        encoded = b64encode(
+            json.dumps({"k": key, "r": int(reverse)}).encode("utf-8")
+        ).decode("ascii")
+        return replace_query_param(
+            self.base_url, self.cursor_query_param, encoded
+        )
+
+
+class KeysetOrLimitOffsetPagination(BasePagination):
+    """
+    Uses keyset (cursor) pagination when the request asks for it with
+    `?pagination=cursor` or follows a cursor link, limit/offset otherwise.
+    Subclasses set `ordering` to a stable, indexed ordering, and
+    `orderings` to the orderings `?ordering=` may choose instead.
+    """
+    ordering = ("id",)
+    orderings = {}
+    mode_query_param = "pagination"
+    ordering_query_param = "ordering"
+
+    def __init__(self):
+        self.cursor_paginator = KeysetPagination()
+        self.cursor_paginator.ordering = self.ordering
+        self.limit_offset_paginator = CountOptionalLimitOffsetPagination()
+        self.paginator = self.limit_offset_paginator
+
+    def uses_cursor(self, request) -> bool:
+        return (
+            request.query_params.get(self.mode_query_param) == "cursor"
+            or self.cursor_paginator.cursor_query_param in request.query_params
+        )
+
+    def get_ordering(self, request) -> tuple:
+        ordering = request.query_params.get(self.ordering_query_param)
+        if ordering is None or not self.orderings:
+            return self.ordering
+
+        if ordering not in self.orderings:
+            raise ValidationError(
+                {
+                    self.ordering_query_param: f"Must be one of "
+                                               f"{', '.join(self.orderings)}."
+                }
+            )
+        return self.orderings[ordering]
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.uses_cursor(request):
+            self.paginator = self.cursor_paginator
+            self.paginator.ordering = self.get_ordering(request)
+
+        return self.paginator.paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        return self.paginator.get_paginated_response(data)
+
+    def get_paginated_response_schema(self, schema):
+        return self.limit_offset_paginator.get_paginated_response_schema(
+            schema
+        )
+
+    def get_schema_operation_parameters(self, view):
+        cursor_paginator = self.cursor_paginator
+        return (
+            self.limit_offset_paginator.get_schema_operation_parameters(view)
+            + [
+                {
+                    "name": self.mode_query_param,
+                    "required": False,
+                    "in": "query",
+                    "description": "Pass cursor to page by a stable "
+                                   "ordering without offsets or counts.",
+                    "schema": {"type": "string", "enum": ["cursor"]},
+                },
+                {
+                    "name": cursor_paginator.cursor_query_param,
+                    "required": False,
+                    "in": "query",
+                    "description": cursor_paginator.cursor_query_description,
+                    "schema": {"type": "string"},
+                },
+            ]
+        )
+
+    def to_html(self):
+        return self.paginator.to_html()
+
+    @property
+    def display_page_controls(self):
+        return getattr(self.paginator, "display_page_controls", False)
+
+
+class PerformancePagination(KeysetOrLimitOffsetPagination):
+    ordering = ("show_time", "id")
+    orderings = PERFORMANCE_ORDERINGS
+
+
+class PlayPagination(KeysetOrLimitOffsetPagination):
+    ordering = ("id",)
+
+
+class ReservationPagination(KeysetOrLimitOffsetPagination):
+    ordering = ("-created_at", "-id")
@@ -0,0 +1,151 @@
+import csv
+import io
+import json
+
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+
+class ORJSONRenderer(JSONRenderer):
+    """
+    JSON renderer built on orjson, producing JSON equivalent to
+    compact `JSONRenderer` output (floats may be spelled differently,
+    ex. `1e16` for `1e+16`). Datetimes, decimals, UUIDs,
+    lazy strings and other non-native types go through the DRF
+    encoder. Pretty printing, non-compact or ASCII-only output and
+    anything orjson cannot encode fall back to `JSONRenderer`, as
+    does a missing orjson package. NaN and infinity become null.
+    """
+    options = (
+        orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+        if orjson else 0
+    )
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+
+        renderer_context = renderer_context or {}
+        if (
+            orjson is None
+            or self.ensure_ascii
+            or not self.compact
+            or self.get_indent(accepted_media_type, renderer_context)
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = orjson.dumps(
+                data,
+                default=self.encoder_class().default,
+                option=self.options
+            )
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        # Keep the output a strict javascript subset like JSONRenderer.
+        if b"\xe2\x80\xa8" in ret or b"\xe2\x80\xa9" in ret:
+            ret = ret.replace(b"\xe2\x80\xa8", b"\\u2028").replace(
+                b"\xe2\x80\xa9", b"\\u2029"
+            )
+
+        return ret
+
+
+class RowsRenderer(BaseRenderer):
+    """
+    Base of export renderers. `stream()` turns an iterable of flat
+    dicts into byte chunks of about `chunk_size` bytes, so rows can
+    be sent as they are read from the database.
+    """
+    chunk_size = 64 * 1024
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+
+        rows = [data] if isinstance(data, dict) else data
+        return b"".join(self.stream(rows))
+
+    def stream(self, rows, fields=None):
+        raise NotImplementedError("stream() must be implemented.")
+
+
+class NDJSONRenderer(RowsRenderer):
+    """Newline delimited JSON, one object per row."""
+    media_type = "application/x-ndjson"
+    format = "ndjson"
+    charset = None
+
+    def stream(self, rows, fields=None):
+        render = ORJSONRenderer().render
+        buffer = []
+        size = 0
+
+        for row in rows:
+            line = render(row) + b"\n"
+            buffer.append(line)
+            size += len(line)
+            if size >= self.chunk_size:
+                yield b"".join(buffer)
+                buffer, size = [], 0
+
+        if buffer:
+            yield b"".join(buffer)
+
+
+class CSVRenderer(RowsRenderer):
+    """
+    Comma separated values with a header row. Columns are `fields`
+    or the keys of the first row, missing values are left empty.
+    """
+    media_type = "text/csv"
+    format = "csv"
+    charset = "utf-8"
+
+    def stream(self, rows, fields=None):
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+
+        if fields is not None:
+            writer.writerow(fields)
+
+        for row in rows:
+            if fields is None:
+                fields = list(row)
+                writer.writerow(fields)
+
+            writer.writerow([row.get(field) for field in fields])
+            if buffer.tell() >= self.chunk_size:
+                yield buffer.getvalue().encode(self.charset)
+                buffer.seek(0)
+                buffer.truncate()
+
+        if buffer.tell():
+            yield buffer.getvalue().encode(self.charset)
+
+
+class EventStreamRenderer(BaseRenderer):
+    """
+    Server-Sent Events. Streams write their events with `event()`,
+    `render()` only sends an error response as one `error` event.
+    """
+    media_type = "text/event-stream"
+    format = "event-stream"
+    charset = "utf-8"
+
+    @staticmethod
+    def event(name: str, data, event_id=None) -> bytes:
+        event = f"event: {name}\ndata: {json.dumps(data)}\n"
+        if event_id is not None:
+            event = f"id: {event_id}\n{event}"
+        return f"{event}\n".encode()
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        return self.event("error", data)
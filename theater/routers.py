@@ -0,0 +1,81 @@
+import random
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+
+
+PIN_KEY_PREFIX = "theater:primary:user:"
+REPLICA_APPS = ("theater",)
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+current_request = ContextVar("current_request", default=None)
+
+
+def _pin_key(user_id) -> str:
+    return f"{PIN_KEY_PREFIX}{user_id}"
+
+
+def pin_to_primary(user) -> None:
+    """Reads of `user` go to the primary for `REPLICA_PIN_SECONDS`."""
+    cache.set(_pin_key(user.pk), True, settings.REPLICA_PIN_SECONDS)
+
+
+def read_from_primary() -> None:
+    """Sends the remaining reads of the current request to the primary."""
+    request = current_request.get()
+    if request is not None:
+        request._read_from_primary = True
+
+
+def _reads_from_replica(request) -> bool:
+    if request.method not in SAFE_METHODS:
+        return False
+    if getattr(request, "_read_from_primary", False):
+        return False
+
+    # request.user is the session user until DRF authenticates the
+    # request, which happens before the view reads any theater model.
+    user = request.user
+    if not user.is_authenticated:
+        return True
+
+    pinned = getattr(request, "_pinned_user", None)
+    if pinned is None or pinned[0] != user.pk:
+        pinned = (user.pk, bool(cache.get(_pin_key(user.pk))))
+        request._pinned_user = pinned
+
+    return not pinned[1]
+
+
+class ReplicaRouter:
+    """
+    Sends reads of theater models made by safe requests to a random
+    database of `REPLICA_DATABASES` and everything else to `default`.
+    Reads stay on the primary for `REPLICA_PIN_SECONDS` after the user
+    writes anything and while cached data they depend on may be newer
+    than the replicas.
+    """
+
+    def db_for_read(self, model, **hints):
+        request = current_request.get()
+
+        if (
+            settings.REPLICA_DATABASES
+            and request is not None
+            and model._meta.app_label in REPLICA_APPS
+            and _reads_from_replica(request)
+        ):
+            return random.choice(settings.REPLICA_DATABASES)
+
+        return "default"
+
+    def db_for_write(self, model, **hints):
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == "default"
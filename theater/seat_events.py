@@ -0,0 +1,305 @@
+import asyncio
+import json
+import logging
+import queue
+import select
+import threading
+import time
+from collections import defaultdict
+
+import psycopg
+from django.conf import settings
+from django.db import connections, transaction
+from django.http import StreamingHttpResponse
+from psycopg import sql
+
+from theater.models import SeatChange
+from theater.renderers import EventStreamRenderer
+
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "theater_seats"
+# NOTIFY payloads must stay under 8000 bytes
+SEATS_PER_MESSAGE = 500
+
+TAKEN = "taken"
+RELEASED = "released"
+
+
+def _messages(event: str, seats, versions: dict) -> list:
+    by_performance = defaultdict(set)
+    for performance_id, row, seat in seats:
+        if performance_id in versions:
+            by_performance[performance_id].add((row, seat))
+
+    messages = []
+    for performance_id, performance_seats in by_performance.items():
+        performance_seats = sorted(performance_seats)
+        for start in range(0, len(performance_seats), SEATS_PER_MESSAGE):
+            messages.append(
+                {
+                    "performance": performance_id,
+                    "event": event,
+                    "version": versions[performance_id],
+                    "seats": performance_seats[
+                        start:start + SEATS_PER_MESSAGE
+                    ],
+                }
+            )
+    return messages
+
+
+def seats_changed(event: str, seats) -> None:
+    """
+    Logs `(performance_id, row, seat)` triples as `TAKEN` or `RELEASED`
+    in the seat change log and publishes the event with the new seat
+    versions once the current transaction commits.
+    """
+    seats = list(seats)
+    versions = SeatChange.record(event == TAKEN, seats)
+    messages = _messages(event, seats, versions)
+    if not messages:
+        return
+
+    if settings.SEAT_EVENTS_BACKEND == "postgres":
+        # Notifications are delivered on commit and dropped on rollback.
+        with connections["default"].cursor() as cursor:
+            cursor.execute(
+                "SELECT pg_notify(%s, payload) "
+                "FROM unnest(%s::text[]) AS payload",
+                [CHANNEL, [json.dumps(message) for message in messages]]
+            )
+    else:
+        broker = get_broker()
+        transaction.on_commit(
+            lambda: [broker.publish(message) for message in messages]
+        )
+
+
+class Subscription:
+    """
+    Events of one performance for one watcher. A subscription made
+    in an event loop is read with `aget()`, others with `get()`.
+    """
+
+    def __init__(self, broker, performance_id: int, loop=None):
+        self.broker = broker
+        self.performance_id = performance_id
+        self.loop = loop
+        self.queue = asyncio.Queue() if loop else queue.SimpleQueue()
+
+    def put(self, message: dict) -> None:
+        if self.loop is None:
+            self.queue.put(message)
+        else:
+            self.loop.call_soon_threadsafe(self.queue.put_nowait, message)
+
+    def get(self, timeout: float):
+        """The next message or None after `timeout` seconds."""
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    async def aget(self, timeout: float):
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def close(self) -> None:
+        self.broker.unsubscribe(self)
+
+
+class Broker:
+    """Hands published messages to the watchers of this process."""
+
+    def __init__(self):
+        self._subscriptions = {}
+        self._lock = threading.Lock()
+
+    def start(self) -> None:
+        """Prepares the broker for subscriptions, may block."""
+
+    def subscribe(self, performance_id: int, loop=None) -> Subscription:
+        subscription = Subscription(self, performance_id, loop)
+        with self._lock:
+            self._subscriptions.setdefault(performance_id, set()).add(
+                subscription
+            )
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            watchers = self._subscriptions.get(subscription.performance_id)
+            if watchers is not None:
+                watchers.discard(subscription)
+                if not watchers:
+                    del self._subscriptions[subscription.performance_id]
+
+    def publish(self, message: dict) -> None:
+        with self._lock:
+            watchers = list(
+                self._subscriptions.get(message["performance"], ())
+            )
+        for subscription in watchers:
+            subscription.put(message)
+
+    def close(self) -> None:
+        pass
+
+
+class PostgresBroker(Broker):
+    """
+    Listens to `CHANNEL` with one connection per process, started with
+    the first stream, and hands notifications to the watchers.
+    The listener reconnects after errors, events sent meanwhile are
+    lost and watchers should reload the seats when they reconnect.
+    """
+
+    poll_seconds = 1.0
+
+    def __init__(self):
+        super(PostgresBroker, self).__init__()
+        self._thread = None
+        self._listening = threading.Event()
+        self._stopped = threading.Event()
+
+    def start(self) -> None:
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._listen, name="seat-events", daemon=True
+                )
+                self._thread.start()
+        self._listening.wait(5)
+
+    def _notify(self, notify) -> None:
+        try:
+            self.publish(json.loads(notify.payload))
+        except (ValueError, KeyError):
+            logger.warning("Invalid seat event: %s", notify.payload)
+
+    def _listen(self) -> None:
+        params = connections["default"].get_connection_params()
+
+        while not self._stopped.is_set():
+            try:
+                with psycopg.connect(**params, autocommit=True) as conn:
+                    conn.add_notify_handler(self._notify)
+                    conn.execute(
+                        sql.SQL("LISTEN {}").format(sql.Identifier(CHANNEL))
+                    )
+                    self._listening.set()
+
+                    while not self._stopped.is_set():
+                        readable, _, _ = select.select(
+                            [conn], [], [], self.poll_seconds
+                        )
+                        if readable:
+                            # Notifications are read with any result
+                            conn.execute("SELECT 1")
+            except psycopg.Error:
+                logger.exception("Seat events listener failed, reconnecting")
+                self._stopped.wait(self.poll_seconds)
+            finally:
+                self._listening.clear()
+
+    def close(self) -> None:
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+
+
+BROKERS = {
+    "postgres": PostgresBroker,
+    "memory": Broker,
+}
+_brokers = {}
+_brokers_lock = threading.Lock()
+
+
+def get_broker() -> Broker:
+    """The broker of `SEAT_EVENTS_BACKEND` in this process."""
+    backend = settings.SEAT_EVENTS_BACKEND
+    with _brokers_lock:
+        if backend not in _brokers:
+            _brokers[backend] = BROKERS[backend]()
+        return _brokers[backend]
+
+
+def close_brokers() -> None:
+    with _brokers_lock:
+        brokers = list(_brokers.values())
+        _brokers.clear()
+    for broker in brokers:
+        broker.close()
+
+
+def _event(message: dict) -> bytes:
+    return EventStreamRenderer.event(
+        message["event"],
+        {"seats": [{"row": row, "seat": seat}
+                   for row, seat in message["seats"]]},
+        message["version"]
+    )
+
+
+def _stream(subscription: Subscription):
+    deadline = time.monotonic() + settings.SEAT_EVENTS_STREAM_SECONDS
+    try:
+        yield f"retry: {settings.SEAT_EVENTS_RETRY_MS}\n\n".encode()
+        while time.monotonic() < deadline:
+            message = subscription.get(settings.SEAT_EVENTS_HEARTBEAT_SECONDS)
+            yield b": keep-alive\n\n" if message is None else _event(message)
+    finally:
+        subscription.close()
+
+
+async def _astream(broker: Broker, performance_id: int):
+    # Queues of asyncio belong to the loop serving the stream
+    subscription = broker.subscribe(
+        performance_id, asyncio.get_running_loop()
+    )
+    deadline = time.monotonic() + settings.SEAT_EVENTS_STREAM_SECONDS
+    try:
+        yield f"retry: {settings.SEAT_EVENTS_RETRY_MS}\n\n".encode()
+        while time.monotonic() < deadline:
+            message = await subscription.aget(
+                settings.SEAT_EVENTS_HEARTBEAT_SECONDS
+            )
+            yield b": keep-alive\n\n" if message is None else _event(message)
+    finally:
+        subscription.close()
+
+
+def _release_connections() -> None:
+    # Streams outlive the request, return connections to the pool now
+    for connection in connections.all(initialized_only=True):
+        if not connection.in_atomic_block:
+            connection.close_if_unusable_or_obsolete()
+
+
+def event_stream_response(performance_id: int) -> StreamingHttpResponse:
+    """
+    Streams seat events of a performance as Server-Sent Events until
+    `SEAT_EVENTS_STREAM_SECONDS` pass, clients reconnect after that.
+    Events published from now on are sent, with a comment every
+    `SEAT_EVENTS_HEARTBEAT_SECONDS` to keep the connection open.
+    """
+    broker = get_broker()
+    broker.start()
+
+    if settings.ASYNC_READ_VIEWS:
+        stream = _astream(broker, performance_id)
+    else:
+        stream = _stream(broker.subscribe(performance_id))
+
+    _release_connections()
+    response = StreamingHttpResponse(
+        stream, content_type="text/event-stream"
+    )
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
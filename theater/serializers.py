@@ -1,6 +1,16 @@
-from django.db import transaction
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.contrib.postgres.expressions import ArraySubquery
+from django.db import connections, transaction, IntegrityError
+from django.db.models import CharField, F, Manager, OuterRef, Q, Value
+from django.db.models.functions import Concat, JSONObject
+from django.utils import timezone
+from drf_spectacular.utils import extend_schema_field
 from rest_framework import serializers
 
+from theater import metrics, seat_events
+from theater.cache import tickets_changed, seat_holds_changed
 from theater.models import (
     Genre,
     Actor,
@@ -8,8 +18,11 @@ from theater.models import (
     TheatreHall,
     Performance,
     Ticket,
-    Reservation
+    Reservation,
+    SeatHold,
+    seats_condition,
 )
+from theater.utils import encode_seat_bitmap
 
 
 class GenreSerializer(serializers.ModelSerializer):
@@ -33,6 +46,51 @@ class PlaySerializer(serializers.ModelSerializer):
         fields = ("id", "title", "description", "genres", "actors")
 
 
+def _play_relations(field: str, value) -> ArraySubquery:
+    """Array of `value` over `Play.<field>` in the order of adding."""
+    return ArraySubquery(
+        getattr(Play, field).through.objects.filter(play=OuterRef("pk"))
+        .order_by("id")
+        .values(value=value)
+    )
+
+
+class PlayRowsSerializer(serializers.ListSerializer):
+    """
+    Serializes plays given as `QuerySet.values()` rows. On PostgreSQL
+    the rows already hold `genre_names` and `actor_names` arrays,
+    elsewhere names of the whole page are fetched with one query
+    for genres and one for actors.
+    """
+
+    @staticmethod
+    def _names_by_play(field, play_ids, *columns) -> dict:
+        names = defaultdict(list)
+        related = field[:-1]
+        for play_id, *values in (
+            getattr(Play, field).through.objects.filter(play__in=play_ids)
+            .order_by("id")
+            .values_list("play", *[f"{related}__{c}" for c in columns])
+        ):
+            names[play_id].append(" ".join(values))
+        return names
+
+    def to_representation(self, data):
+        rows = list(data.all() if isinstance(data, Manager) else data)
+
+        if rows and isinstance(rows[0], dict) and "genre_names" not in rows[0]:
+            play_ids = [row["id"] for row in rows]
+            genres = self._names_by_play("genres", play_ids, "name")
+            actors = self._names_by_play(
+                "actors", play_ids, "first_name", "last_name"
+            )
+            for row in rows:
+                row["genre_names"] = genres[row["id"]]
+                row["actor_names"] = actors[row["id"]]
+
+        return [self.child.to_representation(row) for row in rows]
+
+
 class PlayListSerializer(PlaySerializer):
     genres = serializers.SlugRelatedField(
         many=True,
@@ -45,11 +103,113 @@ class PlayListSerializer(PlaySerializer):
         slug_field="full_name"
     )
 
+    class Meta(PlaySerializer.Meta):
+        list_serializer_class = PlayRowsSerializer
+
+    @staticmethod
+    def values(queryset):
+        queryset = queryset.values("id", "title", "description")
+
+        if connections[queryset.db].vendor != "postgresql":
+            return queryset
+
+        return queryset.annotate(
+            genre_names=_play_relations("genres", F("genre__name")),
+            actor_names=_play_relations(
+                "actors",
+                Concat(
+                    "actor__first_name",
+                    Value(" "),
+                    "actor__last_name",
+                    output_field=CharField()
+                )
+            ),
+        )
+
+    def to_representation(self, instance):
+        if not isinstance(instance, dict):
+            return super(PlayListSerializer, self).to_representation(
+                instance
+            )
+
+        return {
+            "id": instance["id"],
+            "title": instance["title"],
+            "description": instance["description"],
+            "genres": instance["genre_names"],
+            "actors": instance["actor_names"],
+        }
+
+
+class PlaySearchSerializer(PlayListSerializer):
+    rank = serializers.FloatField(read_only=True)
+
+    class Meta(PlayListSerializer.Meta):
+        fields = ("id", "title", "description", "genres", "actors", "rank")
+
+    def to_representation(self, instance):
+        data = super(PlaySearchSerializer, self).to_representation(instance)
+
+        if isinstance(instance, dict):
+            data["rank"] = self.fields["rank"].to_representation(
+                instance["rank"]
+            )
+
+        return data
+
 
 class PlayRetrieveSerializer(PlaySerializer):
     genres = GenreSerializer(many=True, read_only=True)
     actors = ActorSerializer(many=True, read_only=True)
 
+    @staticmethod
+    def annotate_relations(queryset):
+        """
+        Adds `genre_list` and `actor_list` arrays built by PostgreSQL,
+        other databases prefetch genres and actors instead.
+        """
+        if connections[queryset.db].vendor != "postgresql":
+            return queryset.prefetch_related("genres", "actors")
+
+        return queryset.annotate(
+            genre_list=_play_relations(
+                "genres", JSONObject(id="genre_id", name="genre__name")
+            ),
+            actor_list=_play_relations(
+                "actors",
+                JSONObject(
+                    id="actor_id",
+                    first_name="actor__first_name",
+                    last_name="actor__last_name",
+                )
+            ),
+        )
+
+    def to_representation(self, instance):
+        if not hasattr(instance, "genre_list"):
+            return super(PlayRetrieveSerializer, self).to_representation(
+                instance
+            )
+
+        # Keys of JSON objects come back reordered by PostgreSQL.
+        return {
+            "id": instance.id,
+            "title": instance.title,
+            "description": instance.description,
+            "genres": [
+                {"id": genre["id"], "name": genre["name"]}
+                for genre in instance.genre_list
+            ],
+            "actors": [
+                {
+                    "id": actor["id"],
+                    "first_name": actor["first_name"],
+                    "last_name": actor["last_name"],
+                }
+                for actor in instance.actor_list
+            ],
+        }
+
 
 class ItemImageSerializer(serializers.ModelSerializer):
 
@@ -95,12 +255,89 @@ class PerformanceListSerializer(PerformanceSerializer):
             "tickets_available"
         )
 
+    @staticmethod
+    def values(queryset):
+        return queryset.values(
+            "id",
+            "show_time",
+            "tickets_available",
+            play_title=F("play__title"),
+            theatre_hall_name=F("theatre_hall__name"),
+        )
+
+    def to_representation(self, instance):
+        """Builds the output straight from `values()` rows."""
+        if not isinstance(instance, dict):
+            return super(PerformanceListSerializer, self).to_representation(
+                instance
+            )
+
+        return {
+            "id": instance["id"],
+            "play": instance["play_title"],
+            "theatre_hall": instance["theatre_hall_name"],
+            "show_time": self.fields["show_time"].to_representation(
+                instance["show_time"]
+            ),
+            "tickets_available": instance["tickets_available"],
+        }
+
+
+class PerformanceBatchField(serializers.PrimaryKeyRelatedField):
+    """
+    Takes the performance from the batch preloaded by
+    `TicketBatchSerializer` and only queries the database
+    when the ticket is validated on its own.
+    """
+
+    def to_internal_value(self, data):
+        batch = getattr(self.parent.parent, "performances", None)
+
+        if batch is not None and not isinstance(data, bool):
+            try:
+                return batch[int(data)]
+            except (KeyError, TypeError, ValueError):
+                pass
+
+        return super(PerformanceBatchField, self).to_internal_value(data)
+
+
+class TicketBatchSerializer(serializers.ListSerializer):
+    """
+    Loads every performance referenced by the tickets together
+    with its theatre hall in one query before validating them.
+    """
+
+    def to_internal_value(self, data):
+        if isinstance(data, list):
+            performance_ids = set()
+            for ticket_data in data:
+                if not isinstance(ticket_data, dict):
+                    continue
+                try:
+                    performance_ids.add(int(ticket_data.get("performance")))
+                except (TypeError, ValueError):
+                    continue
+
+            self.performances = Performance.objects.select_related(
+                "theatre_hall"
+            ).in_bulk(performance_ids)
+
+        return super(TicketBatchSerializer, self).to_internal_value(data)
+
 
 class TicketSerializer(serializers.ModelSerializer):
+    performance = PerformanceBatchField(
+        queryset=Performance.objects.select_related("theatre_hall")
+    )
 
     class Meta:
         model = Ticket
         fields = ("id", "row", "seat", "performance")
+        list_serializer_class = TicketBatchSerializer
+        # Taken seats are looked up for the whole reservation at once
+        # in `ReservationSerializer.validate`.
+        validators = []
 
     def validate(self, attrs):
         data = super(TicketSerializer, self).validate(attrs)
@@ -133,10 +370,109 @@ class PerformanceRetrieveSerializer(PerformanceSerializer):
         read_only=True,
         source="tickets"
     )
+    held_seats = serializers.SerializerMethodField()
 
     class Meta:
         model = Performance
-        fields = ("id", "play", "theatre_hall", "show_time", "taken_seats")
+        fields = (
+            "id",
+            "play",
+            "theatre_hall",
+            "show_time",
+            "seat_version",
+            "taken_seats",
+            "held_seats"
+        )
+
+    @staticmethod
+    def _held_seats(performance):
+        return SeatHold.active().filter(performance=performance)
+
+    @extend_schema_field(TakenSeatsInRowSerializer(many=True))
+    def get_held_seats(self, performance) -> list:
+        return list(self._held_seats(performance).values("row", "seat"))
+
+
+class PerformanceSeatChangesSerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    since = serializers.IntegerField(
+        help_text="Seat version the changes start after."
+    )
+    seat_version = serializers.IntegerField()
+    taken_seats = TakenSeatsInRowSerializer(many=True)
+    released_seats = TakenSeatsInRowSerializer(many=True)
+
+
+class TakenSeatsBitmapSerializer(serializers.Serializer):
+    rows = serializers.IntegerField()
+    seats_in_row = serializers.IntegerField()
+    bitmap = serializers.CharField(
+        help_text="Base64 row-major bitset of seats, "
+                  "the most significant bit of a byte comes first."
+    )
+
+
+class PerformanceRetrieveBitmapSerializer(PerformanceRetrieveSerializer):
+    taken_seats = serializers.SerializerMethodField()
+
+    @staticmethod
+    def _bitmap(performance, seats) -> dict:
+        hall = performance.theatre_hall
+        return {
+            "rows": hall.rows,
+            "seats_in_row": hall.seats_in_row,
+            "bitmap": encode_seat_bitmap(
+                hall.rows,
+                hall.seats_in_row,
+                seats.values_list("row", "seat").iterator()
+            ),
+        }
+
+    @extend_schema_field(TakenSeatsBitmapSerializer)
+    def get_taken_seats(self, performance) -> dict:
+        return self._bitmap(
+            performance, Ticket.objects.filter(performance=performance)
+        )
+
+    @extend_schema_field(TakenSeatsBitmapSerializer)
+    def get_held_seats(self, performance) -> dict:
+        return self._bitmap(performance, self._held_seats(performance))
+
+
+def _seats(items) -> list:
+    return [
+        (item["performance"].id, item["row"], item["seat"])
+        for item in items
+    ]
+
+
+def _seats_errors(seats, reason: str) -> list:
+    return [
+        f"Seat {seat} in row {row} {reason} for performance {performance_id}."
+        for performance_id, row, seat in sorted(seats)
+    ]
+
+
+def _validate_seats_are_free(seats, user=None) -> None:
+    """
+    Rejects seats requested twice, held by other users or sold,
+    reporting every conflicting seat at once.
+    """
+    duplicated_seats = [
+        seat for seat, count in Counter(seats).items() if count > 1
+    ]
+    errors = _seats_errors(duplicated_seats, "is requested more than once")
+    errors += _seats_errors(
+        SeatHold.find_held_seats(seats, exclude_user=user),
+        "is held by another customer"
+    )
+    if not errors:
+        errors += _seats_errors(
+            Ticket.find_taken_seats(seats), "is already taken"
+        )
+
+    if errors:
+        raise serializers.ValidationError(errors)
 
 
 class ReservationSerializer(serializers.ModelSerializer):
@@ -146,14 +482,117 @@ class ReservationSerializer(serializers.ModelSerializer):
         model = Reservation
         fields = ("id", "created_at", "tickets")
 
+    def validate(self, attrs):
+        data = super(ReservationSerializer, self).validate(attrs)
+        request = self.context.get("request")
+
+        try:
+            _validate_seats_are_free(
+                _seats(attrs["tickets"]), request and request.user
+            )
+        except serializers.ValidationError as error:
+            raise serializers.ValidationError({"tickets": error.detail})
+
+        return data
+
     @transaction.atomic
     def create(self, validated_data):
         tickets_data = validated_data.pop("tickets")
         reservation = Reservation.objects.create(**validated_data)
-        for ticket_data in tickets_data:
-            Ticket.objects.create(reservation=reservation, **ticket_data)
+        tickets = [
+            Ticket(reservation=reservation, **ticket_data)
+            for ticket_data in tickets_data
+        ]
+        seats = _seats(tickets_data)
+
+        try:
+            with transaction.atomic():
+                Ticket.objects.bulk_create(tickets)
+                Performance.update_tickets_sold(
+                    Counter(ticket.performance_id for ticket in tickets)
+                )
+        except IntegrityError:
+            metrics.SEAT_CONFLICTS.labels("ticket").inc()
+            raise serializers.ValidationError(
+                {
+                    "tickets": _seats_errors(
+                        Ticket.find_taken_seats(seats), "is already taken"
+                    )
+                    or ["Some of the requested seats have just been taken."]
+                }
+            )
+
+        transaction.on_commit(
+            lambda: metrics.reservation_created(len(tickets))
+        )
+        performance_ids = {ticket.performance_id for ticket in tickets}
+        tickets_changed(performance_ids, [reservation.user_id])
+        seat_events.seats_changed(seat_events.TAKEN, seats)
+        released, _ = SeatHold.objects.filter(
+            seats_condition(seats), user=reservation.user
+        ).delete()
+        if released:
+            seat_holds_changed(performance_ids)
+
         return reservation
 
 
 class ReservationListSerializer(ReservationSerializer):
     tickets = TicketListSerializer(many=True, read_only=True)
+
+
+class SeatHoldBatchSerializer(TicketBatchSerializer):
+    """
+    Holds all requested seats at once, replacing expired holds
+    and the user's own holds on the same seats.
+    """
+
+    def validate(self, attrs):
+        data = super(SeatHoldBatchSerializer, self).validate(attrs)
+        _validate_seats_are_free(
+            _seats(attrs), self.context["request"].user
+        )
+        return data
+
+    @transaction.atomic
+    def create(self, validated_data):
+        seats = _seats(validated_data)
+        user = validated_data[0]["user"]
+        now = timezone.now()
+
+        SeatHold.objects.filter(seats_condition(seats)).filter(
+            Q(expires_at__lte=now) | Q(user=user)
+        ).delete()
+
+        holds = [
+            SeatHold(expires_at=now + settings.SEAT_HOLD_TTL, **hold_data)
+            for hold_data in validated_data
+        ]
+
+        try:
+            with transaction.atomic():
+                SeatHold.objects.bulk_create(holds)
+        except IntegrityError:
+            metrics.SEAT_CONFLICTS.labels("seat_hold").inc()
+            raise serializers.ValidationError(
+                _seats_errors(
+                    SeatHold.find_held_seats(seats, exclude_user=user),
+                    "is held by another customer"
+                )
+                or ["Some of the requested seats have just been held."]
+            )
+
+        seat_holds_changed(hold.performance_id for hold in holds)
+
+        return holds
+
+
+class SeatHoldSerializer(TicketSerializer):
+
+    class Meta:
+        model = SeatHold
+        fields = ("id", "row", "seat", "performance", "expires_at")
+        read_only_fields = ("expires_at",)
+        list_serializer_class = SeatHoldBatchSerializer
+        # Conflicting holds are looked up for the whole batch at once.
+        validators = []
@@ -0,0 +1,179 @@
+from django.db.backends.signals import connection_created
+from django.db.models import QuerySet
+from django.db.models.signals import (
+    pre_save,
+    post_save,
+    pre_delete,
+    post_delete,
+    m2m_changed,
+)
+from django.dispatch import receiver
+
+from theater.cache import bump_versions, tickets_changed
+from theater.middleware import record_queries
+from theater.models import (
+    Genre,
+    Actor,
+    Play,
+    TheatreHall,
+    Performance,
+    Ticket,
+    Reservation,
+)
+from theater.seat_events import RELEASED, TAKEN, seats_changed
+
+
+MODEL_NAMESPACES = {
+    Genre: "genre",
+    Actor: "actor",
+    Play: "play",
+    TheatreHall: "theatre_hall",
+    Performance: "performance",
+}
+
+
+@receiver(pre_save, sender=Ticket)
+def remember_ticket_performance(sender, instance, **kwargs):
+    """Keeps the performance and seat of a ticket before an update."""
+    instance._previous_performance_id = None
+    instance._previous_seat = None
+
+    if instance.pk and not instance._state.adding:
+        previous = (
+            Ticket.objects.filter(pk=instance.pk)
+            .values_list("performance_id", "row", "seat")
+            .first()
+        )
+        if previous is not None:
+            instance._previous_performance_id = previous[0]
+            instance._previous_seat = previous
+
+
+def _reservation_user_ids(ticket) -> list:
+    if Ticket.reservation.is_cached(ticket):
+        return [ticket.reservation.user_id]
+
+    return list(
+        Reservation.objects.filter(pk=ticket.reservation_id)
+        .values_list("user_id", flat=True)
+    )
+
+
+@receiver(post_save, sender=Ticket)
+def count_saved_ticket(sender, instance, created, **kwargs):
+    previous_performance_id = getattr(
+        instance, "_previous_performance_id", None
+    )
+
+    if created:
+        Performance.update_tickets_sold({instance.performance_id: 1})
+    elif (
+        previous_performance_id
+        and previous_performance_id != instance.performance_id
+    ):
+        Performance.update_tickets_sold(
+            {previous_performance_id: -1, instance.performance_id: 1}
+        )
+
+    tickets_changed(
+        {instance.performance_id, previous_performance_id} - {None},
+        _reservation_user_ids(instance)
+    )
+
+    seat = (instance.performance_id, instance.row, instance.seat)
+    previous_seat = getattr(instance, "_previous_seat", None)
+    if created or previous_seat != seat:
+        if previous_seat is not None:
+            seats_changed(RELEASED, [previous_seat])
+        seats_changed(TAKEN, [seat])
+
+
+def _deletes_performances(origin) -> bool:
+    """
+    Whether deleting `origin`, a model instance or queryset, cascades
+    to performances, whose seats are not logged any more.
+    """
+    model = origin.model if isinstance(origin, QuerySet) else type(origin)
+    return issubclass(model, (Performance, Play, TheatreHall))
+
+
+@receiver(post_delete, sender=Ticket)
+def count_deleted_ticket(sender, instance, **kwargs):
+    Performance.update_tickets_sold({instance.performance_id: -1})
+    tickets_changed(
+        [instance.performance_id], _reservation_user_ids(instance)
+    )
+    if not _deletes_performances(kwargs.get("origin")):
+        seats_changed(
+            RELEASED,
+            [(instance.performance_id, instance.row, instance.seat)]
+        )
+
+
+@receiver(post_save, sender=Reservation)
+@receiver(post_delete, sender=Reservation)
+def invalidate_reservations_cache(sender, instance, **kwargs):
+    bump_versions(f"reservation:user:{instance.user_id}")
+
+
+@receiver(post_save)
+@receiver(post_delete)
+def invalidate_model_cache(sender, **kwargs):
+    if sender in MODEL_NAMESPACES:
+        bump_versions(MODEL_NAMESPACES[sender])
+
+
+@receiver(m2m_changed, sender=Play.genres.through)
+@receiver(m2m_changed, sender=Play.actors.through)
+def play_relations_changed(
+    sender, instance, action, reverse, pk_set, **kwargs
+):
+    if reverse and action == "pre_clear":
+        instance._cleared_play_ids = list(
+            instance.plays.values_list("pk", flat=True)
+        )
+
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+
+    bump_versions("play")
+
+    if not reverse:
+        Play.update_search_vectors([instance.pk])
+    elif action == "post_clear":
+        Play.update_search_vectors(instance._cleared_play_ids)
+    else:
+        Play.update_search_vectors(pk_set)
+
+
+@receiver(post_save, sender=Play)
+def update_play_search_vector(sender, instance, **kwargs):
+    Play.update_search_vectors([instance.pk])
+
+
+@receiver(pre_delete, sender=Genre)
+@receiver(pre_delete, sender=Actor)
+def remember_related_plays(sender, instance, **kwargs):
+    instance._play_ids = list(instance.plays.values_list("pk", flat=True))
+
+
+@receiver(post_save, sender=Genre)
+@receiver(post_save, sender=Actor)
+@receiver(post_delete, sender=Genre)
+@receiver(post_delete, sender=Actor)
+def update_related_plays_search_vectors(sender, instance, **kwargs):
+    if kwargs.get("created"):
+        return
+
+    play_ids = getattr(instance, "_play_ids", None)
+
+    if play_ids is None:
+        play_ids = instance.plays.values("pk")
+
+    Play.update_search_vectors(play_ids)
+
+
+@receiver(connection_created)
+def add_query_recorder(sender, connection, **kwargs):
+    if record_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_queries)
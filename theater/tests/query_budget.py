@@ -0,0 +1,48 @@
+from contextlib import ContextDecorator
+
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test.utils import CaptureQueriesContext
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+class query_budget(ContextDecorator):
+    """
+    Fails when the wrapped block or function runs more than
+    `max_queries` SQL queries and lists the queries it ran.
+
+        with query_budget(2):
+            client.get(url)
+
+        @query_budget(3)
+        def test_something(self): ...
+    """
+
+    def __init__(self, max_queries: int, using: str = DEFAULT_DB_ALIAS):
+        self.max_queries = max_queries
+        self.context = CaptureQueriesContext(connections[using])
+
+    @property
+    def count(self) -> int:
+        return len(self.context.captured_queries)
+
+    def __enter__(self):
+        self.context.__enter__()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.context.__exit__(exc_type, exc_value, traceback)
+
+        if exc_type is None and self.count > self.max_queries:
+            queries = "\n".join(
+                f"{number}. {query['sql']}"
+                for number, query in enumerate(
+                    self.context.captured_queries, start=1
+                )
+            )
+            raise QueryBudgetExceeded(
+                f"{self.count} queries executed, the budget is "
+                f"{self.max_queries}:\n{queries}"
+            )
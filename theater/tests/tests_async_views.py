@@ -0,0 +1,123 @@
+import asyncio
+import threading
+from unittest import mock
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django import db
+from django.db import connection
+from django.http import HttpResponse
+from django.test import (
+    AsyncRequestFactory,
+    SimpleTestCase,
+    TransactionTestCase,
+    override_settings,
+)
+from rest_framework import status
+from rest_framework.test import force_authenticate
+
+from theater.async_views import iterate_in_thread
+from theater.middleware import ServerTimingMiddleware
+from theater.models import Genre
+from theater.views import GenreViewSet
+
+
+GENRE_ACTIONS = {"get": "list", "post": "create"}
+
+
+def genre_view():
+    with override_settings(ASYNC_READ_VIEWS=True):
+        return GenreViewSet.as_view(GENRE_ACTIONS, basename="genre")
+
+
+class AsyncReadViewTests(TransactionTestCase):
+    def setUp(self):
+        self.factory = AsyncRequestFactory()
+        self.user = get_user_model().objects.create_user(
+            email="test@test.test",
+            password="testpassword",
+            is_staff=True,
+        )
+        Genre.objects.create(name="Drama")
+        self.view = genre_view()
+
+    async def request(self, method, data=None):
+        request = getattr(self.factory, method)(
+            "/api/theater/genres/", data, content_type="application/json"
+        )
+        force_authenticate(request, self.user)
+        response = await self.view(request)
+        return await sync_to_async(response.render)()
+
+    def test_views_are_async_only_when_enabled(self):
+        self.assertTrue(asyncio.iscoroutinefunction(self.view))
+        self.assertIs(self.view.cls, GenreViewSet)
+        self.assertEqual(self.view.actions, GENRE_ACTIONS)
+        self.assertFalse(
+            asyncio.iscoroutinefunction(GenreViewSet.as_view(GENRE_ACTIONS))
+        )
+
+    async def test_reads_run_in_thread_pool(self):
+        threads = set()
+
+        def close_old_connections():
+            threads.add(threading.get_ident())
+            db.close_old_connections()
+
+        patcher = mock.patch(
+            "theater.async_views.close_old_connections",
+            close_old_connections
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        responses = await asyncio.gather(
+            *(self.request("get") for _ in range(4))
+        )
+
+        for response in responses:
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertIn(b"Drama", response.content)
+        self.assertNotIn(threading.get_ident(), threads)
+
+    async def test_writes_stay_sync(self):
+        response = await self.request("post", {"name": "Comedy"})
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertTrue(await Genre.objects.filter(name="Comedy").aexists())
+
+
+@override_settings(REQUEST_TIMING_SAMPLE_RATE=1)
+class AsyncMiddlewareTests(SimpleTestCase):
+    databases = {"default"}
+
+    async def test_server_timing_of_async_views(self):
+        def query():
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1")
+
+        async def view(request):
+            await sync_to_async(query, thread_sensitive=False)()
+            return HttpResponse()
+
+        middleware = ServerTimingMiddleware(view)
+
+        self.assertTrue(asyncio.iscoroutinefunction(middleware))
+        response = await middleware(AsyncRequestFactory().get("/"))
+        self.assertIn('desc="1 SQL queries"', response["Server-Timing"])
+
+
+class IterateInThreadTests(SimpleTestCase):
+    async def test_items_are_pulled_one_at_a_time(self):
+        pulled = []
+
+        def chunks():
+            for number in range(3):
+                pulled.append(number)
+                yield number
+
+        iterator = iterate_in_thread(chunks())
+
+        self.assertEqual(await anext(iterator), 0)
+        self.assertEqual(pulled, [0])
+        self.assertEqual([item async for item in iterator], [1, 2])
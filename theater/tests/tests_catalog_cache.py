@@ -0,0 +1,83 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from rest_framework.reverse import reverse
+from rest_framework.test import APIClient
+
+from theater.models import Genre, Play
+
+
+GENRE_URL = reverse("theater:genre-list")
+PLAY_URL = reverse("theater:play-list")
+
+
+class CatalogCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="test@test.test",
+            password="testpassword"
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_list_is_served_from_cache(self):
+        Genre.objects.create(name="Drama")
+        self.client.get(GENRE_URL)
+
+        with self.assertNumQueries(0):
+            res = self.client.get(GENRE_URL)
+
+        self.assertEqual(len(res.data["results"]), 1)
+
+    def test_write_invalidates_cached_list(self):
+        Genre.objects.create(name="Drama")
+        self.client.get(GENRE_URL)
+
+        Genre.objects.create(name="Comedy")
+        res = self.client.get(GENRE_URL)
+
+        self.assertEqual(len(res.data["results"]), 2)
+
+    def test_m2m_change_invalidates_cached_play(self):
+        play = Play.objects.create(title="Hamlet", description="Tragedy")
+        genre = Genre.objects.create(name="Drama")
+        url = reverse("theater:play-detail", args=(play.id,))
+        self.client.get(url)
+
+        play.genres.add(genre)
+        res = self.client.get(url)
+
+        self.assertEqual(
+            res.data["genres"], [{"id": genre.id, "name": "Drama"}]
+        )
+
+    def test_genre_rename_invalidates_cached_plays(self):
+        play = Play.objects.create(title="Hamlet", description="Tragedy")
+        genre = Genre.objects.create(name="Drama")
+        play.genres.add(genre)
+        self.client.get(PLAY_URL)
+
+        genre.name = "Tragedy"
+        genre.save()
+        res = self.client.get(PLAY_URL)
+
+        self.assertEqual(res.data["results"][0]["genres"], ["Tragedy"])
+
+    def test_query_string_is_part_of_the_key(self):
+        drama = Genre.objects.create(name="Drama")
+        comedy = Genre.objects.create(name="Comedy")
+        Play.objects.create(
+            title="Hamlet", description="Tragedy"
+        ).genres.add(drama)
+        Play.objects.create(
+            title="Twelfth Night", description="Comedy"
+        ).genres.add(comedy)
+
+        drama_res = self.client.get(PLAY_URL, {"genres": drama.id})
+        comedy_res = self.client.get(PLAY_URL, {"genres": comedy.id})
+
+        self.assertEqual(drama_res.data["results"][0]["title"], "Hamlet")
+        self.assertEqual(
+            comedy_res.data["results"][0]["title"], "Twelfth Night"
+        )
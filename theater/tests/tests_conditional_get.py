@@ -0,0 +1,139 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.reverse import reverse
+from rest_framework.test import APIClient
+
+from theater.models import (
+    Genre,
+    Performance,
+    Play,
+    Reservation,
+    TheatreHall,
+    Ticket
+)
+
+
+GENRE_URL = reverse("theater:genre-list")
+RESERVATION_URL = reverse("theater:reservation-list")
+
+
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="test@test.test",
+            password="testpassword"
+        )
+        self.client.force_authenticate(self.user)
+        play = Play.objects.create(
+            title="Test Title",
+            description="Test Description"
+        )
+        theatre_hall = TheatreHall.objects.create(
+            name="Great Arena",
+            rows=20,
+            seats_in_row=20
+        )
+        self.performance = Performance.objects.create(
+            play=play,
+            theatre_hall=theatre_hall,
+            show_time="2024-10-15 18:00+00:00"
+        )
+        self.other_performance = Performance.objects.create(
+            play=play,
+            theatre_hall=theatre_hall,
+            show_time="2024-10-16 18:00+00:00"
+        )
+        self.performance_url = reverse(
+            "theater:performance-detail", args=(self.performance.id,)
+        )
+
+    def sell(self, performance, seat):
+        Ticket.objects.create(
+            row=1,
+            seat=seat,
+            performance=performance,
+            reservation=Reservation.objects.create(user=self.user)
+        )
+
+    def test_matching_etag_returns_304_without_queries(self):
+        Genre.objects.create(name="Drama")
+        etag = self.client.get(GENRE_URL)["ETag"]
+
+        with self.assertNumQueries(0):
+            res = self.client.get(GENRE_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(res["ETag"], etag)
+
+    def test_write_changes_etag(self):
+        etag = self.client.get(GENRE_URL)["ETag"]
+
+        Genre.objects.create(name="Drama")
+        res = self.client.get(GENRE_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(res["ETag"], etag)
+
+    def test_performance_etag_follows_its_own_tickets(self):
+        etag = self.client.get(self.performance_url)["ETag"]
+
+        self.sell(self.other_performance, 1)
+        res = self.client.get(
+            self.performance_url, HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        self.sell(self.performance, 1)
+        res = self.client.get(
+            self.performance_url, HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data["taken_seats"]), 1)
+
+    def test_new_reservation_changes_reservations_etag(self):
+        etag = self.client.get(RESERVATION_URL)["ETag"]
+        payload = {
+            "tickets": [
+                {"row": 1, "seat": 1, "performance": self.performance.id},
+            ]
+        }
+
+        self.client.post(RESERVATION_URL, payload, format="json")
+        res = self.client.get(RESERVATION_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data["results"]), 1)
+
+    def test_expired_seat_hold_changes_performance_etag(self):
+        self.client.post(
+            reverse("theater:seat-hold-list"),
+            [{"row": 1, "seat": 1, "performance": self.performance.id}],
+            format="json"
+        )
+        res = self.client.get(self.performance_url)
+        etag = res["ETag"]
+        self.assertEqual(len(res.data["held_seats"]), 1)
+
+        with self.assertNumQueries(0):
+            res = self.client.get(
+                self.performance_url, HTTP_IF_NONE_MATCH=etag
+            )
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        later = timezone.now() + settings.SEAT_HOLD_TTL + timedelta(minutes=1)
+        with mock.patch("django.utils.timezone.now", return_value=later):
+            res = self.client.get(
+                self.performance_url, HTTP_IF_NONE_MATCH=etag
+            )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["held_seats"], [])
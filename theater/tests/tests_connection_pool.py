@@ -0,0 +1,87 @@
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connections
+from django.test import SimpleTestCase
+from prometheus_client import REGISTRY
+
+from theater.backends.postgresql.base import DatabaseWrapper, warm_pools
+
+
+def backend_pid(wrapper) -> int:
+    with wrapper.cursor() as cursor:
+        cursor.execute("SELECT pg_backend_pid()")
+        return cursor.fetchone()[0]
+
+
+class ConnectionPoolTests(SimpleTestCase):
+    def setUp(self):
+        # A separate alias keeps the pool of "default" untouched.
+        settings_dict = connections["default"].settings_dict
+        connections.settings["pool_test"] = {
+            **settings_dict,
+            "OPTIONS": {
+                **settings_dict["OPTIONS"],
+                "pool": {"min_size": 1, "max_size": 2},
+            },
+        }
+        self.wrapper = connections["pool_test"]
+        self.addCleanup(connections.settings.pop, "pool_test")
+        self.addCleanup(connections.__delitem__, "pool_test")
+        self.addCleanup(self.wrapper.close_pool)
+        self.addCleanup(self.wrapper.close)
+
+    def test_closed_connections_return_to_the_pool(self):
+        self.wrapper.warm_pool()
+
+        pids = set()
+        for _ in range(5):
+            pids.add(backend_pid(self.wrapper))
+            self.wrapper.close()
+
+        self.assertLessEqual(len(pids), 2)
+        self.assertEqual(self.wrapper.pool.get_stats()["pool_max"], 2)
+
+    def test_warm_pools_fill_pools_of_the_process(self):
+        warm_pools()
+
+        self.assertGreaterEqual(self.wrapper.pool.get_stats()["pool_size"], 1)
+
+    def test_pool_statistics_are_exported(self):
+        def sample(name, **labels):
+            return REGISTRY.get_sample_value(
+                name, {"alias": "pool_test", **labels}
+            )
+
+        backend_pid(self.wrapper)
+
+        self.assertGreaterEqual(
+            sample("theater_db_pool_connections", state="in_use"), 1
+        )
+
+        self.wrapper.close()
+
+        self.assertGreaterEqual(
+            sample("theater_db_pool_connections", state="idle"), 1
+        )
+        self.assertGreaterEqual(sample("theater_db_pool_requests_total"), 1)
+        self.assertIsNotNone(sample("theater_db_pool_wait_seconds_total"))
+        self.assertEqual(sample("theater_db_pool_requests_waiting"), 0)
+
+    def test_pool_is_replaced_when_database_changes(self):
+        backend_pid(self.wrapper)
+        self.wrapper.close()
+        pool = self.wrapper.pool
+
+        self.wrapper.settings_dict["OPTIONS"] = {
+            **self.wrapper.settings_dict["OPTIONS"],
+            "application_name": "pool-test",
+        }
+        backend_pid(self.wrapper)
+
+        self.assertTrue(pool.closed)
+        self.assertIsNot(self.wrapper.pool, pool)
+
+    def test_persistent_connections_are_rejected(self):
+        self.wrapper.settings_dict["CONN_MAX_AGE"] = 60
+
+        with self.assertRaises(ImproperlyConfigured):
+            backend_pid(self.wrapper)
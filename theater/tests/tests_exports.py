@@ -0,0 +1,217 @@
+import csv
+import io
+import json
+
+from django.contrib.auth import get_user_model
+from django.test import (
+    AsyncClient,
+    TestCase,
+    TransactionTestCase,
+    override_settings,
+)
+from rest_framework import status
+from rest_framework.reverse import reverse
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from theater.models import (
+    Performance,
+    Play,
+    Reservation,
+    TheatreHall,
+    Ticket
+)
+from theater.renderers import CSVRenderer, NDJSONRenderer
+
+
+PERFORMANCE_EXPORT_URL = reverse("theater:performance-export")
+TICKET_EXPORT_URL = reverse("theater:performance-export-tickets")
+RESERVATION_EXPORT_URL = reverse("theater:reservation-export")
+
+
+def content(response) -> str:
+    return b"".join(response.streaming_content).decode("utf-8")
+
+
+def ndjson(response) -> list:
+    return [json.loads(line) for line in content(response).splitlines()]
+
+
+class ExportPermissionTests(TestCase):
+    def test_export_is_staff_only(self):
+        client = APIClient()
+        client.force_authenticate(
+            get_user_model().objects.create_user(
+                email="test@test.test",
+                password="testpassword"
+            )
+        )
+
+        for url in (
+            PERFORMANCE_EXPORT_URL,
+            TICKET_EXPORT_URL,
+            RESERVATION_EXPORT_URL,
+        ):
+            res = client.get(url)
+            self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class ExportTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.admin = get_user_model().objects.create_user(
+            email="admin@admin.test",
+            password="testpassword",
+            is_staff=True
+        )
+        self.user = get_user_model().objects.create_user(
+            email="test@test.test",
+            password="testpassword"
+        )
+        self.client.force_authenticate(self.admin)
+        hall = TheatreHall.objects.create(
+            name="Great Arena",
+            rows=20,
+            seats_in_row=20
+        )
+        self.performances = [
+            Performance.objects.create(
+                play=Play.objects.create(title=f"Play {day}"),
+                theatre_hall=hall,
+                show_time=f"2024-10-{day} 18:00+00:00"
+            )
+            for day in (15, 16)
+        ]
+        self.reservation = Reservation.objects.create(user=self.user)
+        for performance in self.performances:
+            Ticket.objects.create(
+                row=1,
+                seat=1,
+                performance=performance,
+                reservation=self.reservation
+            )
+        Reservation.objects.create(user=self.admin)
+
+    def test_export_performances_as_ndjson(self):
+        res = self.client.get(PERFORMANCE_EXPORT_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res.streaming)
+        self.assertEqual(res["Content-Type"], "application/x-ndjson")
+        self.assertEqual(
+            ndjson(res)[0],
+            {
+                "id": self.performances[0].id,
+                "show_time": "2024-10-15T18:00:00Z",
+                "play_id": self.performances[0].play_id,
+                "theatre_hall_id": self.performances[0].theatre_hall_id,
+                "tickets_sold": 1,
+                "tickets_available": 399,
+                "play_title": "Play 15",
+                "theatre_hall_name": "Great Arena",
+            }
+        )
+
+    def test_export_performances_as_csv(self):
+        res = self.client.get(PERFORMANCE_EXPORT_URL, {"format": "csv"})
+
+        self.assertEqual(res["Content-Type"], "text/csv; charset=utf-8")
+        self.assertIn("performances.csv", res["Content-Disposition"])
+        rows = list(csv.DictReader(io.StringIO(content(res))))
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(rows[1]["play_title"], "Play 16")
+        self.assertEqual(rows[1]["show_time"], "2024-10-16T18:00:00Z")
+
+    def test_export_applies_performance_filters(self):
+        res = self.client.get(
+            PERFORMANCE_EXPORT_URL, {"show_time_after": "2024-10-16"}
+        )
+        self.assertEqual(
+            [row["id"] for row in ndjson(res)], [self.performances[1].id]
+        )
+
+        res = self.client.get(
+            TICKET_EXPORT_URL, {"play_id": self.performances[0].play_id}
+        )
+        tickets = ndjson(res)
+        self.assertEqual(len(tickets), 1)
+        self.assertEqual(
+            tickets[0]["performance_id"], self.performances[0].id
+        )
+        self.assertEqual(tickets[0]["user_id"], self.user.id)
+
+    def test_export_reservations_of_all_users(self):
+        res = self.client.get(RESERVATION_EXPORT_URL)
+
+        reservations = ndjson(res)
+        self.assertEqual(len(reservations), 2)
+        self.assertEqual(reservations[0]["user_email"], "test@test.test")
+        self.assertEqual(reservations[0]["tickets_count"], 2)
+
+        res = self.client.get(
+            RESERVATION_EXPORT_URL, {"user": self.admin.id}
+        )
+        self.assertEqual(len(ndjson(res)), 1)
+
+    def test_export_invalid_filter(self):
+        res = self.client.get(RESERVATION_EXPORT_URL, {"user": "me"})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+@override_settings(ASYNC_READ_VIEWS=True)
+class AsgiExportTests(TransactionTestCase):
+    def setUp(self):
+        admin = get_user_model().objects.create_user(
+            email="admin@admin.test",
+            password="testpassword",
+            is_staff=True
+        )
+        self.headers = {
+            "Authorization":
+                f"Bearer {RefreshToken.for_user(admin).access_token}"
+        }
+        hall = TheatreHall.objects.create(
+            name="Great Arena",
+            rows=20,
+            seats_in_row=20
+        )
+        for day in (15, 16):
+            Performance.objects.create(
+                play=Play.objects.create(title=f"Play {day}"),
+                theatre_hall=hall,
+                show_time=f"2024-10-{day} 18:00+00:00"
+            )
+
+    async def test_export_streams_from_async_iterator(self):
+        res = await AsyncClient().get(
+            PERFORMANCE_EXPORT_URL, headers=self.headers
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res.is_async)
+        lines = b"".join(
+            [chunk async for chunk in res.streaming_content]
+        ).splitlines()
+        self.assertEqual(
+            [json.loads(line)["play_title"] for line in lines],
+            ["Play 15", "Play 16"]
+        )
+
+
+class RowsRendererTests(TestCase):
+    def test_stream_in_chunks(self):
+        renderer = NDJSONRenderer()
+        renderer.chunk_size = 100
+        rows = ({"id": index, "name": "x" * 20} for index in range(50))
+
+        chunks = list(renderer.stream(rows))
+
+        self.assertGreater(len(chunks), 10)
+        self.assertEqual(b"".join(chunks).count(b"\n"), 50)
+
+    def test_csv_writes_header_without_rows(self):
+        self.assertEqual(
+            b"".join(CSVRenderer().stream([], ["id", "name"])),
+            b"id,name\r\n"
+        )
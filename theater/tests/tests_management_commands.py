@@ -0,0 +1,365 @@
+import json
+import pathlib
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db.models import Count, F
+from django.test import TestCase, TransactionTestCase
+
+from theater.models import (
+    Actor,
+    Genre,
+    Performance,
+    Play,
+    TheatreHall,
+    Reservation,
+    SeatChange,
+    Ticket
+)
+
+
+class ReconcileTicketsSoldCommandTests(TestCase):
+    def setUp(self):
+        user = get_user_model().objects.create_user(
+            email="test@test.test",
+            password="testpassword",
+        )
+        play = Play.objects.create(
+            title="Test Title",
+            description="Test Description"
+        )
+        theatre_hall = TheatreHall.objects.create(
+            name="Great Arena",
+            rows=20,
+            seats_in_row=20
+        )
+        self.performance = Performance.objects.create(
+            play=play,
+            theatre_hall=theatre_hall,
+            show_time="2024-10-15 18:00"
+        )
+        reservation = Reservation.objects.create(user=user)
+        for seat in (1, 2):
+            Ticket.objects.create(
+                row=1,
+                seat=seat,
+                performance=self.performance,
+                reservation=reservation
+            )
+        Performance.objects.update(tickets_sold=7)
+
+    def test_dry_run_only_reports(self):
+        out = StringIO()
+
+        call_command("reconcile_tickets_sold", "--dry-run", stdout=out)
+
+        self.performance.refresh_from_db()
+        self.assertEqual(self.performance.tickets_sold, 7)
+        self.assertIn("1 counter(s) are out of date.", out.getvalue())
+
+    def test_repairs_drifted_counters(self):
+        call_command("reconcile_tickets_sold", stdout=StringIO())
+
+        self.performance.refresh_from_db()
+        self.assertEqual(self.performance.tickets_sold, 2)
+
+
+class CompactSeatChangesCommandTests(TestCase):
+    def setUp(self):
+        self.performance = Performance.objects.create(
+            play=Play.objects.create(
+                title="Test Title",
+                description="Test Description"
+            ),
+            theatre_hall=TheatreHall.objects.create(
+                name="Great Arena",
+                rows=20,
+                seats_in_row=20
+            ),
+            show_time="2024-10-15 18:00"
+        )
+        reservation = Reservation.objects.create(
+            user=get_user_model().objects.create_user(
+                email="test@test.test",
+                password="testpassword",
+            )
+        )
+        for seat in (1, 2, 3):
+            Ticket.objects.create(
+                row=1,
+                seat=seat,
+                performance=self.performance,
+                reservation=reservation
+            )
+
+    def test_keeps_last_versions(self):
+        out = StringIO()
+
+        call_command("compact_seat_changes", "--keep=1", stdout=out)
+
+        self.performance.refresh_from_db()
+        self.assertEqual(self.performance.compacted_seat_version, 2)
+        self.assertEqual(
+            list(SeatChange.objects.values_list("version", flat=True)), [3]
+        )
+        self.assertIn("2 seat change(s) compacted.", out.getvalue())
+
+    def test_nothing_to_compact(self):
+        call_command("compact_seat_changes", stdout=StringIO())
+
+        self.assertEqual(SeatChange.objects.count(), 3)
+
+
+class ImportCatalogCommandTests(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = pathlib.Path(directory.name)
+        Genre.objects.create(name="Drama")
+
+        self.files = {
+            "genres": self.write(
+                "genres.csv", "name\nDrama\nComedy\nComedy\n"
+            ),
+            "actors": self.write(
+                "actors.jsonl",
+                "\n".join(
+                    json.dumps({"first_name": first, "last_name": last})
+                    for first, last in (
+                        ("Kate", "Winslet"), ("Leonardo", "DiCaprio")
+                    )
+                )
+            ),
+            "theatre_halls": self.write(
+                "halls.csv", "name,rows,seats_in_row\nGreat Arena,20,20\n"
+            ),
+            "plays": self.write(
+                "plays.csv",
+                "title,description,genres,actors\n"
+                "Titanic,A ship,Drama|Comedy,Kate Winslet|Leonardo DiCaprio\n"
+                "Cats,A musical,,\n"
+            ),
+            "performances": self.write(
+                "performances.jsonl",
+                json.dumps(
+                    {
+                        "play": "Titanic",
+                        "theatre_hall": "Great Arena",
+                        "show_time": "2024-10-15T18:00:00+00:00",
+                    }
+                )
+            ),
+        }
+
+    def write(self, name, text):
+        path = self.directory / name
+        path.write_text(text, encoding="utf-8")
+        return str(path)
+
+    def import_catalog(self, *args, **files):
+        options = []
+        for section, path in files.items():
+            options += [f"--{section.replace('_', '-')}", path]
+
+        out = StringIO()
+        call_command("import_catalog", *options, *args, stdout=out)
+        return out.getvalue()
+
+    def test_imports_catalog(self):
+        self.import_catalog(**self.files)
+
+        self.assertEqual(Genre.objects.count(), 2)
+        self.assertEqual(Actor.objects.count(), 2)
+        titanic = Play.objects.get(title="Titanic")
+        self.assertEqual(
+            sorted(titanic.genres.values_list("name", flat=True)),
+            ["Comedy", "Drama"]
+        )
+        self.assertEqual(titanic.actors.count(), 2)
+        self.assertEqual(
+            list(
+                Play.objects.filter(search_vector="winslet")
+                .values_list("title", flat=True)
+            ),
+            ["Titanic"]
+        )
+        performance = Performance.objects.get()
+        self.assertEqual(performance.play, titanic)
+        self.assertEqual(performance.theatre_hall.seats_in_row, 20)
+
+    def test_import_again_adds_nothing(self):
+        self.import_catalog(**self.files)
+
+        out = self.import_catalog(**self.files)
+
+        self.assertIn("plays: 0 new, 2 already present", out)
+        self.assertIn("performances: 0 new, 1 already present", out)
+        self.assertEqual(Performance.objects.count(), 1)
+
+    def test_dry_run_imports_nothing(self):
+        out = self.import_catalog("--dry-run", **self.files)
+
+        self.assertIn("plays: 2 new, 0 already present", out)
+        self.assertFalse(Play.objects.exists())
+        self.assertEqual(Genre.objects.count(), 1)
+
+    def test_invalid_rows_roll_back_everything(self):
+        self.files["performances"] = self.write(
+            "performances.csv",
+            "play,theatre_hall,show_time\n"
+            "Hamlet,Great Arena,2024-10-15 18:00\n"
+            "Titanic,Great Arena,tomorrow\n"
+        )
+
+        with self.assertRaisesMessage(CommandError, "2 invalid row(s)") as cm:
+            self.import_catalog(**self.files)
+
+        self.assertIn("performances.csv:2: Unknown play 'Hamlet'.", str(cm.exception))
+        self.assertIn("performances.csv:3: show_time:", str(cm.exception))
+        self.assertFalse(Play.objects.exists())
+
+
+class GenerateLoadDataCommandTests(TestCase):
+    options = (
+        "--users=5",
+        "--genres=3",
+        "--actors=10",
+        "--theatre-halls=2",
+        "--plays=4",
+        "--performances=6",
+        "--tickets=500",
+    )
+
+    def generate(self, seed=1):
+        call_command(
+            "generate_load_data", f"--seed={seed}", *self.options,
+            stdout=StringIO()
+        )
+
+    def snapshot(self):
+        return list(
+            Ticket.objects.order_by("id").values_list(
+                "row",
+                "seat",
+                "performance__show_time",
+                "performance__theatre_hall__name",
+                "reservation__user__email",
+            )
+        )
+
+    def test_generates_consistent_data(self):
+        self.generate()
+
+        self.assertEqual(get_user_model().objects.count(), 5)
+        self.assertEqual(Performance.objects.count(), 6)
+        self.assertGreater(Ticket.objects.count(), 250)
+        self.assertFalse(
+            Ticket.objects.filter(
+                row__gt=F("performance__theatre_hall__rows")
+            ).exists()
+            or Ticket.objects.filter(
+                seat__gt=F("performance__theatre_hall__seats_in_row")
+            ).exists()
+        )
+        self.assertFalse(
+            Performance.objects.annotate(actual=Count("tickets"))
+            .exclude(tickets_sold=F("actual"))
+            .exists()
+        )
+        self.assertFalse(Play.objects.filter(search_vector=None).exists())
+
+    def test_same_seed_generates_same_data(self):
+        self.generate()
+        first = self.snapshot()
+        get_user_model().objects.all().delete()
+        Play.objects.all().delete()
+        Genre.objects.all().delete()
+        TheatreHall.objects.all().delete()
+
+        self.generate()
+
+        self.assertEqual(self.snapshot(), first)
+
+    def test_seed_can_not_be_generated_twice(self):
+        self.generate()
+
+        with self.assertRaises(CommandError):
+            self.generate()
+
+
+class BenchmarkEndpointsCommandTests(TestCase):
+    def benchmark(self, *args):
+        out = StringIO()
+        call_command(
+            "benchmark_endpoints",
+            "--use-current-db",
+            "--users=3",
+            "--plays=3",
+            "--performances=3",
+            "--tickets=100",
+            "--iterations=3",
+            *args,
+            stdout=out
+        )
+        return out.getvalue()
+
+    def test_reports_every_endpoint(self):
+        with tempfile.TemporaryDirectory() as directory:
+            output = pathlib.Path(directory) / "results.json"
+
+            out = self.benchmark(f"--output={output}")
+
+            results = json.loads(output.read_text())
+        self.assertEqual(results["dataset"]["performances"], 3)
+        self.assertEqual(
+            set(results["endpoints"]["performance-detail"]),
+            {"p50_ms", "p95_ms", "p99_ms", "queries", "bytes"}
+        )
+        self.assertIn("reservation-create", out)
+
+    def test_fails_when_queries_exceed_baseline(self):
+        with tempfile.TemporaryDirectory() as directory:
+            baseline = pathlib.Path(directory) / "baseline.json"
+            baseline.write_text(
+                json.dumps(
+                    {
+                        "endpoints": {
+                            "play-list": {
+                                "p95_ms": 1000,
+                                "queries": 0,
+                            }
+                        }
+                    }
+                )
+            )
+
+            with self.assertRaisesMessage(CommandError, "play-list"):
+                self.benchmark(f"--baseline={baseline}")
+
+
+class BenchmarkConcurrencyCommandTests(TransactionTestCase):
+    def test_reports_both_handlers(self):
+        out = StringIO()
+
+        # The handlers run in new processes, which see committed data only
+        call_command(
+            "benchmark_concurrency",
+            "--use-current-db",
+            "--users=3",
+            "--plays=3",
+            "--performances=3",
+            "--tickets=100",
+            "--requests=8",
+            "--clients=2",
+            stdout=out
+        )
+
+        lines = out.getvalue().splitlines()
+        self.assertTrue(lines[2].startswith("wsgi"))
+        self.assertTrue(lines[3].startswith("asgi"))
+        self.assertEqual(lines[2].split()[-1], "0")
+        self.assertEqual(lines[3].split()[-1], "0")
+        self.assertIn("ASGI throughput", lines[4])
@@ -0,0 +1,213 @@
+import os
+import runpy
+import subprocess
+import sys
+import tempfile
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from prometheus_client import REGISTRY
+from rest_framework import status
+from rest_framework.reverse import reverse
+from rest_framework.test import APIClient
+
+from theater import metrics
+from theater.models import (
+    Performance,
+    Play,
+    Reservation,
+    TheatreHall,
+    Ticket
+)
+
+
+RESERVATION_URL = reverse("theater:reservation-list")
+METRICS_URL = reverse("metrics")
+
+
+def sample(name: str, **labels) -> float:
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+class MetricsTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="test@test.test",
+            password="testpassword",
+        )
+        self.client.force_authenticate(self.user)
+        self.performance = Performance.objects.create(
+            play=Play.objects.create(title="Hamlet", description="Danish"),
+            theatre_hall=TheatreHall.objects.create(
+                name="Great Arena", rows=20, seats_in_row=20
+            ),
+            show_time="2024-10-15 18:00"
+        )
+
+    def reserve(self, *seats):
+        return self.client.post(
+            RESERVATION_URL,
+            {
+                "tickets": [
+                    {"row": 1, "seat": seat,
+                     "performance": self.performance.id}
+                    for seat in seats
+                ]
+            },
+            format="json"
+        )
+
+    def test_requests_are_labelled_by_viewset_action(self):
+        labels = {"route": "performance-list", "method": "GET"}
+        requests = sample("theater_requests_total", status="200", **labels)
+        durations = sample(
+            "theater_request_duration_seconds_count", **labels
+        )
+        db_durations = sample(
+            "theater_request_db_duration_seconds_count", **labels
+        )
+        sizes = sample("theater_response_size_bytes_count", **labels)
+
+        self.client.get(reverse("theater:performance-list"))
+
+        self.assertEqual(
+            sample("theater_requests_total", status="200", **labels),
+            requests + 1
+        )
+        self.assertEqual(
+            sample("theater_request_duration_seconds_count", **labels),
+            durations + 1
+        )
+        self.assertEqual(
+            sample("theater_request_db_duration_seconds_count", **labels),
+            db_durations + 1
+        )
+        self.assertEqual(
+            sample("theater_response_size_bytes_count", **labels), sizes + 1
+        )
+
+    def test_other_views_are_labelled_by_url_name(self):
+        labels = {
+            "route": "token_obtain_pair", "method": "POST", "status": "401"
+        }
+        before = sample("theater_requests_total", **labels)
+
+        self.client.post(
+            reverse("user:token_obtain_pair"),
+            {"email": "test@test.test", "password": "wrong"}
+        )
+
+        self.assertEqual(
+            sample("theater_requests_total", **labels), before + 1
+        )
+
+    def test_reservations_and_tickets_are_counted_on_commit(self):
+        reservations = sample("theater_reservations_total")
+        tickets = sample("theater_tickets_sold_total")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            res = self.reserve(1, 2)
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(
+            sample("theater_reservations_total"), reservations + 1
+        )
+        self.assertEqual(sample("theater_tickets_sold_total"), tickets + 2)
+
+    def test_seat_conflicts_are_counted(self):
+        Ticket.objects.create(
+            row=1, seat=1, performance=self.performance,
+            reservation=Reservation.objects.create(user=self.user)
+        )
+        before = sample("theater_seat_conflicts_total", kind="ticket")
+
+        # Another customer takes the seat after the request is validated.
+        with mock.patch("theater.serializers._validate_seats_are_free"):
+            res = self.reserve(1)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            sample("theater_seat_conflicts_total", kind="ticket"),
+            before + 1
+        )
+
+    def test_metrics_endpoint(self):
+        self.client.get(reverse("theater:performance-list"))
+
+        res = self.client.get(METRICS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIn(
+            b'theater_requests_total{method="GET",'
+            b'route="performance-list",status="200"}',
+            res.content
+        )
+
+    @override_settings(METRICS_TOKEN="secret")
+    def test_metrics_endpoint_requires_token_when_set(self):
+        self.assertEqual(
+            self.client.get(METRICS_URL).status_code,
+            status.HTTP_403_FORBIDDEN
+        )
+        self.assertEqual(
+            self.client.get(
+                METRICS_URL, HTTP_AUTHORIZATION="Bearer secret"
+            ).status_code,
+            status.HTTP_200_OK
+        )
+
+
+class MultiprocessMetricsTests(TestCase):
+    def test_metrics_of_worker_processes_are_aggregated(self):
+        with tempfile.TemporaryDirectory() as directory:
+            env = {**os.environ, metrics.MULTIPROCESS_DIR_VARIABLE: directory}
+            for tickets in (2, 3):
+                subprocess.run(
+                    [
+                        sys.executable, "-c",
+                        "from theater import metrics; "
+                        f"metrics.reservation_created({tickets})",
+                    ],
+                    env=env,
+                    check=True,
+                )
+
+            with mock.patch.dict(os.environ, env):
+                body, _ = metrics.export()
+
+        self.assertIn(b"theater_reservations_total 2.0", body)
+        self.assertIn(b"theater_tickets_sold_total 5.0", body)
+
+    def test_gauges_of_exited_workers_are_dropped(self):
+        with tempfile.TemporaryDirectory() as directory:
+            env = {**os.environ, metrics.MULTIPROCESS_DIR_VARIABLE: directory}
+            worker = subprocess.run(
+                [
+                    sys.executable, "-c",
+                    "import os; from theater import metrics; "
+                    "metrics.observe_pool("
+                    "'default', {'pool_size': 3, 'pool_available': 1}); "
+                    "print(os.getpid())",
+                ],
+                env=env,
+                check=True,
+                capture_output=True,
+                text=True,
+            )
+
+            with mock.patch.dict(os.environ, env):
+                body, _ = metrics.export()
+                self.assertIn(b'state="in_use"} 2.0', body)
+
+                server = runpy.run_path(
+                    os.path.join(settings.BASE_DIR, "gunicorn.conf.py")
+                )
+                server["child_exit"](
+                    None, mock.Mock(pid=int(worker.stdout))
+                )
+                body, _ = metrics.export()
+
+        self.assertNotIn(b'state="in_use"}', body)
@@ -1,10 +1,29 @@
+import base64
+import json
+from datetime import datetime, timedelta, timezone
+from urllib.parse import urlencode
+
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.db import connection
+from django.http import QueryDict
+from django.test import SimpleTestCase, TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.renderers import JSONRenderer
 from rest_framework.test import APIClient
 from rest_framework import status
 from rest_framework.reverse import reverse
 
-from theater.models import Performance, Play, TheatreHall
+from theater.models import (
+    Performance,
+    Play,
+    TheatreHall,
+    Reservation,
+    SeatChange,
+    Ticket
+)
+from theater.filters import annotate_tickets_available, filter_performances
+from theater.serializers import PerformanceListSerializer
+from theater.utils import encode_seat_bitmap
 
 
 PERFORMANCE_URL = reverse("theater:performance-list")
@@ -54,6 +73,40 @@ class AuthenticatedPerformanceApi(TestCase):
         self.assertIsInstance(res.data["results"], list)
         self.assertEqual(len(res.data["results"]), 2)
 
+    def test_performance_list_from_values_matches_model_serializer(self):
+        theatre_hall = TheatreHall.objects.create(
+            name="Great Arena",
+            rows=20,
+            seats_in_row=20
+        )
+        for day in range(1, 4):
+            Performance.objects.create(
+                play=Play.objects.create(title=f"Play {day}"),
+                theatre_hall=theatre_hall,
+                show_time=f"2024-10-{day:02} 18:00:00.123456+02:00",
+            )
+
+        with self.assertNumQueries(2):
+            res = self.client.get(PERFORMANCE_URL)
+
+        serializer = PerformanceListSerializer(
+            annotate_tickets_available(
+                Performance.objects.select_related("play", "theatre_hall")
+            ).order_by("id"),
+            many=True
+        )
+        self.assertEqual(
+            res.content,
+            JSONRenderer().render(
+                {
+                    "count": 3,
+                    "next": None,
+                    "previous": None,
+                    "results": serializer.data,
+                }
+            )
+        )
+
     def test_retrieve_performance_detail(self):
         play = Play.objects.create(
             title="Test Title",
@@ -127,3 +180,498 @@ class AdminPerformanceApiTests(TestCase):
         res = self.client.post(PERFORMANCE_URL, payload)
 
         self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+    def test_performance_list_counts_available_tickets(self):
+        play = Play.objects.create(
+            title="Test Title",
+            description="Test Description"
+        )
+        theatre_hall = TheatreHall.objects.create(
+            name="Great Arena",
+            rows=20,
+            seats_in_row=20
+        )
+        performance = Performance.objects.create(
+            play=play,
+            theatre_hall=theatre_hall,
+            show_time="2024-10-15 18:00",
+        )
+        reservation = Reservation.objects.create(user=self.user)
+        for seat in (1, 2, 3):
+            Ticket.objects.create(
+                row=1,
+                seat=seat,
+                performance=performance,
+                reservation=reservation
+            )
+        Ticket.objects.filter(seat=3).delete()
+
+        res = self.client.get(PERFORMANCE_URL)
+
+        self.assertEqual(res.data["results"][0]["tickets_available"], 398)
+        performance.refresh_from_db()
+        self.assertEqual(performance.tickets_sold, 2)
+
+    def test_retrieve_performance_taken_seats_bitmap(self):
+        play = Play.objects.create(
+            title="Test Title",
+            description="Test Description"
+        )
+        theatre_hall = TheatreHall.objects.create(
+            name="Small Hall",
+            rows=3,
+            seats_in_row=4
+        )
+        performance = Performance.objects.create(
+            play=play,
+            theatre_hall=theatre_hall,
+            show_time="2024-10-15 18:00",
+        )
+        reservation = Reservation.objects.create(user=self.user)
+        for row, seat in ((1, 1), (2, 3), (3, 4)):
+            Ticket.objects.create(
+                row=row,
+                seat=seat,
+                performance=performance,
+                reservation=reservation
+            )
+        url = reverse("theater:performance-detail", args=(performance.id,))
+
+        res = self.client.get(url, {"seat_format": "bitmap"})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        taken_seats = res.data["taken_seats"]
+        self.assertEqual(taken_seats["rows"], 3)
+        self.assertEqual(taken_seats["seats_in_row"], 4)
+        self.assertEqual(
+            base64.b64decode(taken_seats["bitmap"]),
+            bytes([0b10000010, 0b00010000])
+        )
+
+    def test_retrieve_performance_unknown_seat_format(self):
+        play = Play.objects.create(
+            title="Test Title",
+            description="Test Description"
+        )
+        theatre_hall = TheatreHall.objects.create(
+            name="Great Arena",
+            rows=20,
+            seats_in_row=20
+        )
+        performance = Performance.objects.create(
+            play=play,
+            theatre_hall=theatre_hall,
+            show_time="2024-10-15 18:00",
+        )
+        url = reverse("theater:performance-detail", args=(performance.id,))
+
+        res = self.client.get(url, {"seat_format": "png"})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_performance_list_cursor_pagination(self):
+        play = Play.objects.create(
+            title="Test Title",
+            description="Test Description"
+        )
+        theatre_hall = TheatreHall.objects.create(
+            name="Great Arena",
+            rows=20,
+            seats_in_row=20
+        )
+        for day in (3, 1, 2, 1, 5):
+            Performance.objects.create(
+                play=play,
+                theatre_hall=theatre_hall,
+                show_time=f"2024-10-0{day} 18:00+00:00",
+            )
+        expected = list(
+            Performance.objects.order_by("show_time", "id")
+            .values_list("id", flat=True)
+        )
+
+        ids = []
+        res = self.client.get(PERFORMANCE_URL, {"pagination": "cursor",
+                                                "limit": 2})
+        while True:
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            self.assertNotIn("count", res.data)
+            ids += [performance["id"] for performance in res.data["results"]]
+            if not res.data["next"]:
+                break
+            res = self.client.get(res.data["next"])
+
+        self.assertEqual(ids, expected)
+
+        res = self.client.get(res.data["previous"])
+        self.assertEqual(
+            [performance["id"] for performance in res.data["results"]],
+            expected[2:4]
+        )
+
+    def test_performance_list_cursor_pagination_with_ordering(self):
+        play = Play.objects.create(
+            title="Test Title",
+            description="Test Description"
+        )
+        theatre_hall = TheatreHall.objects.create(
+            name="Great Arena",
+            rows=20,
+            seats_in_row=20
+        )
+        for day in (3, 1, 2, 1, 5):
+            Performance.objects.create(
+                play=play,
+                theatre_hall=theatre_hall,
+                show_time=f"2024-10-0{day} 18:00+00:00",
+            )
+        expected = list(
+            Performance.objects.order_by("-show_time", "-id")
+            .values_list("id", flat=True)
+        )
+
+        ids = []
+        res = self.client.get(
+            PERFORMANCE_URL,
+            {"pagination": "cursor", "ordering": "-show_time", "limit": 2}
+        )
+        while True:
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            ids += [performance["id"] for performance in res.data["results"]]
+            if not res.data["next"]:
+                break
+            res = self.client.get(res.data["next"])
+
+        self.assertEqual(ids, expected)
+
+    def test_performance_list_without_count(self):
+        play = Play.objects.create(
+            title="Test Title",
+            description="Test Description"
+        )
+        theatre_hall = TheatreHall.objects.create(
+            name="Great Arena",
+            rows=20,
+            seats_in_row=20
+        )
+        for day in (1, 2, 3):
+            Performance.objects.create(
+                play=play,
+                theatre_hall=theatre_hall,
+                show_time=f"2024-10-0{day} 18:00+00:00",
+            )
+
+        res = self.client.get(PERFORMANCE_URL, {"count": "false", "limit": 2})
+
+        self.assertIsNone(res.data["count"])
+        self.assertEqual(len(res.data["results"]), 2)
+        self.assertIsNotNone(res.data["next"])
+
+        res = self.client.get(res.data["next"])
+
+        self.assertEqual(len(res.data["results"]), 1)
+        self.assertIsNone(res.data["next"])
+
+    def test_performance_list_invalid_cursor(self):
+        res = self.client.get(PERFORMANCE_URL, {"cursor": "nonsense"})
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_performance_list_tampered_cursor(self):
+        for key in (["abc", "x"], [None, None], [{"a": 1}, 1]):
+            cursor = base64.b64encode(
+                json.dumps({"k": key, "r": 0}).encode()
+            ).decode()
+
+            res = self.client.get(PERFORMANCE_URL, {"cursor": cursor})
+
+            self.assertEqual(
+                res.status_code, status.HTTP_404_NOT_FOUND, key
+            )
+
+
+class SeatBitmapTests(SimpleTestCase):
+    def test_seats_outside_hall_are_skipped(self):
+        bitmap = encode_seat_bitmap(2, 2, [(1, 3), (3, 1), (0, 1), (2, 2)])
+
+        self.assertEqual(base64.b64decode(bitmap), bytes([0b00010000]))
+
+
+class PerformanceScheduleFilterTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="test@test.test",
+            password="testpassword",
+        )
+        self.client.force_authenticate(self.user)
+        self.hamlet = Play.objects.create(
+            title="Hamlet", description="Tragedy"
+        )
+        self.cats = Play.objects.create(title="Cats", description="Musical")
+        self.big_hall = TheatreHall.objects.create(
+            name="Great Arena", rows=20, seats_in_row=20
+        )
+        self.small_hall = TheatreHall.objects.create(
+            name="Studio", rows=1, seats_in_row=2
+        )
+        self.performances = [
+            Performance.objects.create(
+                play=play, theatre_hall=hall, show_time=show_time
+            )
+            for play, hall, show_time in (
+                (self.hamlet, self.big_hall, "2024-10-17 18:00+00:00"),
+                (self.cats, self.small_hall, "2024-10-15 18:00+00:00"),
+                (self.hamlet, self.small_hall, "2024-10-16 18:00+00:00"),
+            )
+        ]
+
+    def list_ids(self, **params):
+        res = self.client.get(PERFORMANCE_URL, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return [performance["id"] for performance in res.data["results"]]
+
+    def test_filter_by_show_time_range(self):
+        self.assertEqual(
+            self.list_ids(
+                show_time_after="2024-10-16",
+                show_time_before="2024-10-17T00:00:00Z"
+            ),
+            [self.performances[2].id]
+        )
+
+    def test_filter_by_hall_and_play(self):
+        self.assertEqual(
+            self.list_ids(theatre_hall=self.small_hall.id,
+                          play_id=self.hamlet.id),
+            [self.performances[2].id]
+        )
+
+    def test_filter_by_min_available(self):
+        Ticket.objects.create(
+            row=1,
+            seat=1,
+            performance=self.performances[1],
+            reservation=Reservation.objects.create(user=self.user)
+        )
+
+        self.assertEqual(
+            self.list_ids(min_available=2, ordering="show_time"),
+            [self.performances[2].id, self.performances[0].id]
+        )
+
+    def test_order_by_show_time(self):
+        self.assertEqual(
+            self.list_ids(ordering="-show_time"),
+            [self.performances[0].id,
+             self.performances[2].id,
+             self.performances[1].id]
+        )
+
+    def test_invalid_filters(self):
+        for params in (
+            {"show_time_after": "yesterday"},
+            {"theatre_hall": "big"},
+            {"min_available": "0"},
+            {"ordering": "title"},
+        ):
+            res = self.client.get(PERFORMANCE_URL, params)
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class PerformanceScheduleQueryPlanTests(TestCase):
+    """The schedule filters must be answerable from indexes."""
+
+    def setUp(self):
+        plays = [
+            Play.objects.create(title=f"Play {number}", description="Drama")
+            for number in range(10)
+        ]
+        halls = [
+            TheatreHall.objects.create(
+                name=f"Hall {number}", rows=20, seats_in_row=20
+            )
+            for number in range(10)
+        ]
+        self.play, self.hall = plays[0], halls[0]
+        Performance.objects.bulk_create(
+            Performance(
+                play=plays[number % 10],
+                theatre_hall=halls[number // 10 % 10],
+                show_time=datetime(2024, 1, 1, 18, tzinfo=timezone.utc)
+                + timedelta(days=number // 100, hours=number % 100)
+            )
+            for number in range(2000)
+        )
+        with connection.cursor() as cursor:
+            # Plans must not depend on statistics left by other tests
+            cursor.execute("ANALYZE theater_performance")
+            cursor.execute("SET LOCAL enable_seqscan = off")
+
+    def assertUsesIndex(self, params, index_name):
+        queryset = filter_performances(
+            annotate_tickets_available(Performance.objects.all()),
+            QueryDict(urlencode(params))
+        )
+        self.assertIn(index_name, queryset.explain())
+
+    def test_show_time_range_uses_index(self):
+        self.assertUsesIndex(
+            {"show_time_after": "2024-01-15",
+             "show_time_before": "2024-01-16",
+             "ordering": "show_time"},
+            "theater_per_show_ti_07e009_idx"
+        )
+
+    def test_hall_schedule_uses_index(self):
+        self.assertUsesIndex(
+            {"theatre_hall": self.hall.id, "show_time_after": "2024-01-20"},
+            "performance_hall_time_idx"
+        )
+
+    def test_play_schedule_uses_index(self):
+        self.assertUsesIndex(
+            {"play_id": self.play.id, "show_time_after": "2024-01-20"},
+            "performance_play_time_idx"
+        )
+
+    def test_cursor_page_seeks_index(self):
+        client = APIClient()
+        client.force_authenticate(
+            get_user_model().objects.create_user(
+                email="test@test.test",
+                password="testpassword",
+            )
+        )
+        res = client.get(PERFORMANCE_URL, {"pagination": "cursor"})
+
+        with CaptureQueriesContext(connection) as queries:
+            client.get(res.data["next"])
+
+        with connection.cursor() as cursor:
+            cursor.execute(f"EXPLAIN {queries[-1]['sql']}")
+            plan = "\n".join(row[0] for row in cursor.fetchall())
+        self.assertIn("theater_per_show_ti_07e009_idx", plan)
+        self.assertRegex(plan, r"Index Cond: \(.*show_time >=")
+
+
+class PerformanceSeatChangesTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="test@test.test",
+            password="testpassword",
+        )
+        self.client.force_authenticate(self.user)
+        self.performance = Performance.objects.create(
+            play=Play.objects.create(
+                title="Test Title",
+                description="Test Description"
+            ),
+            theatre_hall=TheatreHall.objects.create(
+                name="Great Arena",
+                rows=20,
+                seats_in_row=20
+            ),
+            show_time="2024-10-15 18:00",
+        )
+        self.url = reverse(
+            "theater:performance-detail", args=(self.performance.id,)
+        )
+        self.reservation = Reservation.objects.create(user=self.user)
+        self.ticket = Ticket.objects.create(
+            row=1, seat=1, performance=self.performance,
+            reservation=self.reservation
+        )
+
+    def test_seat_version_grows_with_every_change(self):
+        res = self.client.get(self.url)
+        self.assertEqual(res.data["seat_version"], 1)
+
+        self.ticket.delete()
+
+        res = self.client.get(self.url)
+        self.assertEqual(res.data["seat_version"], 2)
+        self.assertEqual(res.data["taken_seats"], [])
+
+    def test_changes_since_version(self):
+        Ticket.objects.create(
+            row=2, seat=3, performance=self.performance,
+            reservation=self.reservation
+        )
+        self.ticket.seat = 2
+        self.ticket.save()
+
+        res = self.client.get(self.url, {"since": 1})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            res.data,
+            {
+                "id": self.performance.id,
+                "since": 1,
+                "seat_version": 4,
+                "taken_seats": [
+                    {"row": 1, "seat": 2}, {"row": 2, "seat": 3}
+                ],
+                "released_seats": [{"row": 1, "seat": 1}],
+            }
+        )
+
+    def test_seat_taken_again_is_only_taken(self):
+        self.ticket.delete()
+        Ticket.objects.create(
+            row=1, seat=1, performance=self.performance,
+            reservation=self.reservation
+        )
+
+        res = self.client.get(self.url, {"since": 1})
+
+        self.assertEqual(res.data["taken_seats"], [{"row": 1, "seat": 1}])
+        self.assertEqual(res.data["released_seats"], [])
+
+    def test_compacted_changes_return_whole_performance(self):
+        self.ticket.delete()
+        SeatChange.compact(keep=1)
+
+        res = self.client.get(self.url, {"since": 0})
+
+        self.assertNotIn("since", res.data)
+        self.assertEqual(res.data["seat_version"], 2)
+        self.assertEqual(res.data["taken_seats"], [])
+        self.assertEqual(
+            self.client.get(self.url, {"since": 1}).data["since"], 1
+        )
+
+    def test_future_version_returns_whole_performance(self):
+        res = self.client.get(self.url, {"since": 5})
+
+        self.assertNotIn("since", res.data)
+        self.assertEqual(res.data["taken_seats"], [{"row": 1, "seat": 1}])
+
+    def test_invalid_since(self):
+        res = self.client.get(self.url, {"since": "-1"})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("since", res.data)
+
+    def test_big_performance_ids(self):
+        performance = Performance.objects.create(
+            id=2 ** 31 + 1,
+            play=self.performance.play,
+            theatre_hall=self.performance.theatre_hall,
+            show_time="2024-10-16 18:00",
+        )
+        Ticket.objects.create(
+            row=1, seat=1, performance=performance,
+            reservation=self.reservation
+        )
+
+        performance.refresh_from_db()
+        self.assertEqual(performance.seat_version, 1)
+        self.assertTrue(performance.seat_changes.filter(version=1).exists())
+
+    def test_deleting_performance_with_tickets(self):
+        self.performance.delete()
+
+        self.assertFalse(SeatChange.objects.exists())
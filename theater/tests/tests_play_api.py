@@ -1,6 +1,8 @@
 from django.contrib.auth import get_user_model
+from django.db.models import Prefetch
 from django.test import TestCase
 from rest_framework.test import APIClient
+from rest_framework.renderers import JSONRenderer
 from rest_framework.reverse import reverse
 from rest_framework import status
 
@@ -8,6 +10,7 @@ from theater.models import Play, Actor, Genre
 from theater.serializers import PlayListSerializer, PlayRetrieveSerializer
 
 PLAY_URL = reverse("theater:play-list")
+PLAY_SEARCH_URL = reverse("theater:play-search")
 
 def sample_play(**params) -> Play:
     defaults = {
@@ -58,6 +61,67 @@ class AuthenticatedPlayApiTests(TestCase):
         self.assertEqual(res.status_code, status.HTTP_200_OK)
         self.assertEqual(res.data["results"], serializer.data)
 
+    def test_plays_list_from_values_matches_model_serializer(self):
+        genres = [Genre.objects.create(name=name) for name in ("Drama", "Farce")]
+        actors = [
+            Actor.objects.create(first_name="Kate", last_name="Winslet"),
+            Actor.objects.create(first_name="Leonardo", last_name="DiCaprio"),
+        ]
+        for title in ("Titanic", "Dune", "Cats"):
+            play = sample_play(title=title)
+            # Added one by one, so relations are listed in id order.
+            for genre in genres:
+                play.genres.add(genre)
+            for actor in actors:
+                play.actors.add(actor)
+
+        with self.assertNumQueries(2):
+            res = self.client.get(PLAY_URL)
+
+        serializer = PlayListSerializer(
+            Play.objects.prefetch_related(
+                Prefetch("genres", Genre.objects.order_by("id")),
+                Prefetch("actors", Actor.objects.order_by("id"))
+            ),
+            many=True
+        )
+        self.assertEqual(
+            res.content,
+            JSONRenderer().render(
+                {
+                    "count": 3,
+                    "next": None,
+                    "previous": None,
+                    "results": serializer.data,
+                }
+            )
+        )
+
+    def test_plays_list_fallback_fetches_names_per_page(self):
+        play = sample_play()
+        play.genres.add(Genre.objects.create(name="Drama"))
+        play.actors.add(
+            Actor.objects.create(first_name="Kate", last_name="Winslet")
+        )
+        play.actors.add(
+            Actor.objects.create(first_name="Leonardo", last_name="DiCaprio")
+        )
+
+        with self.assertNumQueries(3):
+            data = PlayListSerializer(
+                Play.objects.values("id", "title", "description"), many=True
+            ).data
+
+        self.assertEqual(
+            data,
+            PlayListSerializer(
+                Play.objects.prefetch_related(
+                    Prefetch("actors", Actor.objects.order_by("id"))
+                ),
+                many=True
+            ).data
+        )
+
     def test_filter_plays_by_actors_and_genres(self):
         play_without_actors_and_genres = sample_play()
         play_with_actors_and_genres_1 = sample_play(
@@ -107,6 +171,47 @@ class AuthenticatedPlayApiTests(TestCase):
         self.assertIn(serializer_with_actors_and_genres_2.data, res.data["results"])
         self.assertNotIn(serializer_without_actors_and_genres.data, res.data["results"])
 
+    def test_filter_plays_by_all_genres(self):
+        drama = Genre.objects.create(name="Drama")
+        comedy = Genre.objects.create(name="Comedy")
+        tragicomedy = sample_play(title="Tragicomedy")
+        tragicomedy.genres.add(drama, comedy)
+        sample_play(title="Tragedy").genres.add(drama)
+
+        any_res = self.client.get(
+            PLAY_URL, {"genres": f"{drama.id},{comedy.id}"}
+        )
+        all_res = self.client.get(
+            PLAY_URL,
+            {"genres": f"{drama.id},{comedy.id}", "genres_mode": "all"}
+        )
+
+        self.assertEqual(len(any_res.data["results"]), 2)
+        self.assertEqual(
+            [play["title"] for play in all_res.data["results"]],
+            ["Tragicomedy"]
+        )
+
+    def test_filter_plays_without_duplicates(self):
+        play = sample_play()
+        first = Actor.objects.create(first_name="Kate", last_name="Winslet")
+        second = Actor.objects.create(first_name="Leo", last_name="DiCaprio")
+        play.actors.add(first, second)
+
+        res = self.client.get(PLAY_URL, {"actors": f"{first.id},{second.id}"})
+
+        self.assertEqual(res.data["count"], 1)
+        self.assertEqual(len(res.data["results"]), 1)
+
+    def test_filter_plays_with_malformed_ids(self):
+        for params in (
+            {"genres": "1,drama"},
+            {"actors": "1,,2"},
+            {"genres": "1", "genres_mode": "most"},
+        ):
+            res = self.client.get(PLAY_URL, params)
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
     def test_retrieve_play_detail(self):
         play = sample_play()
         actor = Actor.objects.create(
@@ -126,6 +231,27 @@ class AuthenticatedPlayApiTests(TestCase):
         self.assertEqual(res.status_code, status.HTTP_200_OK)
         self.assertEqual(res.data, serializer.data)
 
+    def test_retrieve_play_detail_in_one_query(self):
+        play = sample_play()
+        play.genres.add(Genre.objects.create(name="Drama"))
+        play.actors.add(
+            Actor.objects.create(first_name="Kate", last_name="Winslet")
+        )
+        play.actors.add(
+            Actor.objects.create(first_name="Leonardo", last_name="DiCaprio")
+        )
+
+        with self.assertNumQueries(1):
+            res = self.client.get(detail_url(play.id))
+
+        play = Play.objects.prefetch_related(
+            Prefetch("actors", Actor.objects.order_by("id"))
+        ).get(id=play.id)
+        self.assertEqual(
+            res.content,
+            JSONRenderer().render(PlayRetrieveSerializer(play).data)
+        )
+
     def test_create_play_forbidden(self):
         payload = {
             "title": "Test Title",
@@ -137,6 +263,54 @@ class AuthenticatedPlayApiTests(TestCase):
         self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
 
 
+class PlaySearchApiTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="test@test.test",
+            password="testpassword"
+        )
+        self.client.force_authenticate(self.user)
+
+    def search(self, text):
+        res = self.client.get(PLAY_SEARCH_URL, {"q": text})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return [play["title"] for play in res.data["results"]]
+
+    def test_search_by_actor_and_genre(self):
+        hamlet = sample_play(title="Hamlet", description="Danish prince")
+        sample_play(title="Cats", description="Musical")
+        hamlet.actors.add(
+            Actor.objects.create(first_name="Kenneth", last_name="Branagh")
+        )
+        hamlet.genres.add(Genre.objects.create(name="Tragedy"))
+
+        self.assertEqual(self.search("Branagh"), ["Hamlet"])
+        self.assertEqual(self.search("tragedy prince"), ["Hamlet"])
+
+    def test_search_ranks_title_above_description(self):
+        sample_play(title="Cats", description="Not a play about a king")
+        sample_play(title="King Lear", description="An old man")
+
+        self.assertEqual(self.search("king"), ["King Lear", "Cats"])
+
+    def test_search_follows_genre_rename(self):
+        play = sample_play(title="Hamlet")
+        genre = Genre.objects.create(name="Drama")
+        play.genres.add(genre)
+
+        genre.name = "Tragedy"
+        genre.save()
+
+        self.assertEqual(self.search("tragedy"), ["Hamlet"])
+        self.assertEqual(self.search("drama"), [])
+
+    def test_search_requires_query(self):
+        res = self.client.get(PLAY_SEARCH_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+
 class AdminPlayTests(TestCase):
     def setUp(self):
         self.client = APIClient()
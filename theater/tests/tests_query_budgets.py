@@ -0,0 +1,223 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.reverse import reverse
+from rest_framework.test import APIClient
+
+from theater.models import (
+    Actor,
+    Genre,
+    Performance,
+    Play,
+    Reservation,
+    SeatHold,
+    TheatreHall,
+    Ticket
+)
+from theater.tests.query_budget import query_budget
+
+
+# Most SQL queries allowed per request, whatever the number of rows.
+# The cache is cleared before each request, so performance reads also
+# look up the earliest seat hold expiry.
+QUERY_BUDGETS = {
+    "genre-list": 2,
+    "genre-detail": 1,
+    "genre-create": 2,
+    "actor-list": 2,
+    "actor-detail": 1,
+    "play-list": 2,
+    "play-list-cursor": 1,
+    "play-detail": 1,
+    "play-search": 2,
+    "theatre-hall-list": 2,
+    "theatre-hall-detail": 1,
+    "performance-list": 3,
+    "performance-list-cursor": 2,
+    "performance-detail": 6,
+    "performance-detail-bitmap": 6,
+    "performance-detail-since": 3,
+    "performance-export": 1,
+    "performance-export-tickets": 1,
+    "reservation-list": 3,
+    "reservation-list-cursor": 2,
+    "reservation-detail": 2,
+    "reservation-create": 14,
+    "reservation-export": 1,
+    "seat-hold-list": 2,
+    "seat-hold-create": 9,
+}
+
+DATASET_SIZES = (2, 10)
+
+
+class QueryBudgetTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="admin@admin.test",
+            password="testpassword",
+            is_staff=True
+        )
+        self.client.force_authenticate(self.user)
+        self.hall = TheatreHall.objects.create(
+            name="Great Arena",
+            rows=20,
+            seats_in_row=20
+        )
+
+    def create_dataset(self, size: int) -> None:
+        """
+        `size` of every object: plays with two genres and actors,
+        their performances, reservations with a ticket for the
+        first and one for their own performance and seat holds.
+        """
+        genres = [Genre.objects.create(name=f"Genre {i}") for i in range(size)]
+        actors = [
+            Actor.objects.create(first_name="First", last_name=f"Last {i}")
+            for i in range(size)
+        ]
+        self.performances = []
+        for i in range(size):
+            play = Play.objects.create(
+                title=f"Hamlet {i}", description="Danish prince"
+            )
+            play.genres.add(genres[i], genres[i - 1])
+            play.actors.add(actors[i], actors[i - 1])
+            self.performances.append(
+                Performance.objects.create(
+                    play=play,
+                    theatre_hall=self.hall,
+                    show_time=timezone.now() + timedelta(days=i)
+                )
+            )
+
+        first = self.performances[0]
+        for i, performance in enumerate(self.performances):
+            reservation = Reservation.objects.create(user=self.user)
+            Ticket.objects.create(
+                row=1, seat=i + 1, performance=first,
+                reservation=reservation
+            )
+            if performance != first:
+                Ticket.objects.create(
+                    row=2, seat=1, performance=performance,
+                    reservation=reservation
+                )
+            SeatHold.objects.create(
+                row=3, seat=i + 1, performance=first, user=self.user,
+                expires_at=timezone.now() + timedelta(minutes=10)
+            )
+
+        self.play = first.play
+        self.genre = genres[0]
+        self.actor = actors[0]
+        self.reservation = reservation
+
+    def requests(self, size: int) -> dict:
+        def get(name, *args, **params):
+            return lambda: self.client.get(
+                reverse(f"theater:{name}", args=args), params
+            )
+
+        def post(name, data):
+            return lambda: self.client.post(
+                reverse(f"theater:{name}"), data, format="json"
+            )
+
+        def stream(name):
+            return lambda: b"".join(
+                self.client.get(reverse(f"theater:{name}")).streaming_content
+            )
+
+        performance = self.performances[0]
+        return {
+            "genre-list": get("genre-list", limit=size),
+            "genre-detail": get("genre-detail", self.genre.id),
+            "genre-create": post("genre-list", {"name": "New genre"}),
+            "actor-list": get("actor-list", limit=size),
+            "actor-detail": get("actor-detail", self.actor.id),
+            "play-list": get("play-list", limit=size),
+            "play-list-cursor": get(
+                "play-list", pagination="cursor", limit=size
+            ),
+            "play-detail": get("play-detail", self.play.id),
+            "play-search": get("play-search", q="hamlet", limit=size),
+            "theatre-hall-list": get("theatre-hall-list", limit=size),
+            "theatre-hall-detail": get("theatre-hall-detail", self.hall.id),
+            "performance-list": get("performance-list", limit=size),
+            "performance-list-cursor": get(
+                "performance-list", pagination="cursor", limit=size
+            ),
+            "performance-detail": get(
+                "performance-detail", performance.id
+            ),
+            "performance-detail-bitmap": get(
+                "performance-detail", performance.id, seat_format="bitmap"
+            ),
+            "performance-detail-since": get(
+                "performance-detail", performance.id, since=0
+            ),
+            "performance-export": stream("performance-export"),
+            "performance-export-tickets": stream(
+                "performance-export-tickets"
+            ),
+            "reservation-list": get("reservation-list", limit=size),
+            "reservation-list-cursor": get(
+                "reservation-list", pagination="cursor", limit=size
+            ),
+            "reservation-detail": get(
+                "reservation-detail", self.reservation.id
+            ),
+            "reservation-create": post(
+                "reservation-list",
+                {
+                    "tickets": [
+                        {"row": 4, "seat": seat, "performance": p.id}
+                        for seat in range(1, 3)
+                        for p in self.performances
+                    ]
+                }
+            ),
+            "reservation-export": stream("reservation-export"),
+            "seat-hold-list": get("seat-hold-list", limit=size),
+            "seat-hold-create": post(
+                "seat-hold-list",
+                [
+                    {"row": 5, "seat": seat, "performance": p.id}
+                    for seat in range(1, 3)
+                    for p in self.performances
+                ]
+            ),
+        }
+
+    def measure(self, size: int) -> dict:
+        counts = {}
+
+        with transaction.atomic():
+            self.create_dataset(size)
+            for name, request in self.requests(size).items():
+                cache.clear()
+                with self.subTest(endpoint=name, size=size):
+                    with query_budget(QUERY_BUDGETS[name]) as budget:
+                        request()
+                counts[name] = budget.count
+            transaction.set_rollback(True)
+
+        return counts
+
+    def test_every_endpoint_has_a_budget(self):
+        self.create_dataset(1)
+
+        self.assertEqual(set(self.requests(1)), set(QUERY_BUDGETS))
+
+    def test_query_counts_stay_within_budget_and_do_not_grow(self):
+        small, large = (self.measure(size) for size in DATASET_SIZES)
+
+        for name, count in small.items():
+            with self.subTest(endpoint=name):
+                self.assertEqual(large[name], count)
@@ -0,0 +1,126 @@
+import uuid
+from datetime import date, datetime, time, timedelta, timezone
+from decimal import Decimal
+from io import BytesIO
+
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase
+from django.utils.translation import gettext_lazy
+from rest_framework import status
+from rest_framework.exceptions import ParseError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.reverse import reverse
+from rest_framework.test import APIClient
+
+from theater.parsers import ORJSONParser
+from theater.renderers import ORJSONRenderer
+
+
+class ORJSONRendererTests(SimpleTestCase):
+    def assertRendersLikeJSONRenderer(self, data, **kwargs):
+        self.assertEqual(
+            ORJSONRenderer().render(data, **kwargs),
+            JSONRenderer().render(data, **kwargs)
+        )
+
+    def test_renders_like_json_renderer(self):
+        self.assertRendersLikeJSONRenderer(
+            {
+                "id": 1,
+                "title": "Hamlet",
+                "rating": 4.5,
+                "published": True,
+                "director": None,
+                "tags": ["drama", "classic"],
+                "nested": [{"row": 1, "seat": 2}],
+            }
+        )
+
+    def test_renders_special_types_like_json_renderer(self):
+        self.assertRendersLikeJSONRenderer(
+            {
+                "aware": datetime(
+                    2024, 10, 15, 18, 0, 0, 123456, tzinfo=timezone.utc
+                ),
+                "naive": datetime(2024, 10, 15, 18, 0),
+                "offset": datetime(
+                    2024, 10, 15, 18, 0,
+                    tzinfo=timezone(timedelta(hours=2))
+                ),
+                "date": date(2024, 10, 15),
+                "time": time(18, 0, 0, 500000),
+                "duration": timedelta(hours=2),
+                "price": Decimal("12.50"),
+                "uuid": uuid.UUID("12345678-1234-5678-1234-567812345678"),
+                "lazy": gettext_lazy("This field is required."),
+                "bytes": b"raw",
+                1: "non string key",
+            }
+        )
+
+    def test_renders_unicode_and_line_separators_like_json_renderer(self):
+        self.assertRendersLikeJSONRenderer(
+            {"title": "Чайка \u2028 \u2029 \"quoted\" </script>"}
+        )
+
+    def test_indented_output_falls_back_to_json_renderer(self):
+        self.assertRendersLikeJSONRenderer(
+            {"id": 1}, renderer_context={"indent": 4}
+        )
+        self.assertRendersLikeJSONRenderer(
+            {"id": 1}, accepted_media_type="application/json; indent=2"
+        )
+
+    def test_none_renders_empty_body(self):
+        self.assertEqual(ORJSONRenderer().render(None), b"")
+
+
+class ORJSONParserTests(SimpleTestCase):
+    def parse(self, body: bytes, **parser_context):
+        return ORJSONParser().parse(
+            BytesIO(body), parser_context=parser_context
+        )
+
+    def test_parses_json(self):
+        self.assertEqual(
+            self.parse('{"title": "Чайка", "rows": [1, 2]}'.encode()),
+            {"title": "Чайка", "rows": [1, 2]}
+        )
+
+    def test_malformed_json_raises_parse_error(self):
+        with self.assertRaises(ParseError):
+            self.parse(b'{"title": ')
+
+    def test_non_finite_numbers_are_rejected(self):
+        with self.assertRaises(ParseError):
+            self.parse(b'{"rating": NaN}')
+
+    def test_other_encodings_fall_back_to_json_parser(self):
+        self.assertEqual(
+            self.parse(
+                '{"title": "Чайка"}'.encode("utf-16"), encoding="utf-16"
+            ),
+            {"title": "Чайка"}
+        )
+
+
+class ORJSONApiTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="admin@test.test",
+            password="testpassword",
+            is_staff=True
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_api_reads_and_writes_json(self):
+        response = self.client.post(
+            reverse("theater:genre-list"),
+            '{"name": "Трагедия"}',
+            content_type="application/json"
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response["Content-Type"], "application/json")
+        self.assertEqual(response.json()["name"], "Трагедия")
@@ -0,0 +1,170 @@
+from unittest import skipUnless
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.db import connections
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+from rest_framework.reverse import reverse
+from rest_framework.test import APIClient
+
+from theater.cache import bump_versions, get_versions
+from theater.models import Genre, Performance, Play, TheatreHall
+from theater.routers import (
+    ReplicaRouter,
+    current_request,
+    pin_to_primary,
+    read_from_primary,
+)
+
+
+@override_settings(REPLICA_DATABASES=["replica"])
+class ReplicaRouterTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.router = ReplicaRouter()
+        self.user = get_user_model().objects.create_user(
+            email="test@test.test",
+            password="testpassword",
+        )
+
+    def db_for_read(self, model=Genre, method="get", user=None):
+        request = getattr(RequestFactory(), method)("/")
+        request.user = user or AnonymousUser()
+        token = current_request.set(request)
+        try:
+            return self.router.db_for_read(model)
+        finally:
+            current_request.reset(token)
+
+    def test_safe_requests_read_theater_models_from_replica(self):
+        self.assertEqual(self.db_for_read(), "replica")
+        self.assertEqual(self.db_for_read(method="head"), "replica")
+        self.assertEqual(self.db_for_read(user=self.user), "replica")
+
+    def test_other_reads_and_writes_use_primary(self):
+        self.assertEqual(self.db_for_read(method="post"), "default")
+        self.assertEqual(self.db_for_read(get_user_model()), "default")
+        self.assertEqual(self.router.db_for_read(Genre), "default")
+        self.assertEqual(self.router.db_for_write(Genre), "default")
+
+    @override_settings(REPLICA_DATABASES=[])
+    def test_reads_use_primary_without_replicas(self):
+        self.assertEqual(self.db_for_read(), "default")
+
+    def test_pinned_user_reads_from_primary(self):
+        pin_to_primary(self.user)
+
+        self.assertEqual(self.db_for_read(user=self.user), "default")
+        self.assertEqual(self.db_for_read(), "replica")
+
+    def test_read_from_primary_for_rest_of_request(self):
+        request = RequestFactory().get("/")
+        request.user = AnonymousUser()
+        token = current_request.set(request)
+        try:
+            self.assertEqual(self.router.db_for_read(Genre), "replica")
+            read_from_primary()
+            self.assertEqual(self.router.db_for_read(Genre), "default")
+        finally:
+            current_request.reset(token)
+
+    def test_recently_changed_cache_namespaces_read_from_primary(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            bump_versions("genre")
+        request = RequestFactory().get("/")
+        request.user = AnonymousUser()
+        token = current_request.set(request)
+        try:
+            get_versions(["actor"])
+            self.assertEqual(self.router.db_for_read(Genre), "replica")
+            get_versions(["actor", "genre"])
+            self.assertEqual(self.router.db_for_read(Genre), "default")
+        finally:
+            current_request.reset(token)
+
+    def test_only_primary_is_migrated(self):
+        self.assertTrue(self.router.allow_migrate("default", "theater"))
+        self.assertFalse(self.router.allow_migrate("replica", "theater"))
+
+    def test_successful_write_pins_user_to_primary(self):
+        performance = Performance.objects.create(
+            play=Play.objects.create(title="Hamlet", description="Danish"),
+            theatre_hall=TheatreHall.objects.create(
+                name="Great Arena", rows=20, seats_in_row=20
+            ),
+            show_time="2024-10-15T18:00:00Z"
+        )
+        client = APIClient()
+        client.force_authenticate(self.user)
+
+        res = client.post(
+            reverse("theater:seat-hold-list"),
+            [{"row": 1, "seat": 1, "performance": performance.id}],
+            format="json"
+        )
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+        self.assertEqual(self.db_for_read(user=self.user), "default")
+
+
+@skipUnless(
+    "replica" in settings.DATABASES,
+    "Set POSTGRES_REPLICA_HOST to test with a replica.",
+)
+@override_settings(REPLICA_DATABASES=["replica"])
+class ReplicaReadsTests(TestCase):
+    databases = "__all__"
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="test@test.test",
+            password="testpassword",
+        )
+        self.client.force_authenticate(self.user)
+        self.performance = Performance.objects.create(
+            play=Play.objects.create(title="Hamlet", description="Danish"),
+            theatre_hall=TheatreHall.objects.create(
+                name="Great Arena", rows=20, seats_in_row=20
+            ),
+            show_time="2024-10-15T18:00:00Z"
+        )
+
+    def get(self, url):
+        with CaptureQueriesContext(connections["replica"]) as replica:
+            with CaptureQueriesContext(connections["default"]) as primary:
+                res = self.client.get(url)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return len(primary), len(replica)
+
+    def test_performance_list_reads_from_replica(self):
+        primary, replica = self.get(reverse("theater:performance-list"))
+
+        self.assertGreater(replica, 0)
+        self.assertEqual(primary, 0)
+
+    def test_reservations_read_from_primary_after_reservation(self):
+        reservations_url = reverse("theater:reservation-list")
+        self.assertEqual(self.get(reservations_url)[0], 0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            res = self.client.post(
+                reservations_url,
+                {
+                    "tickets": [
+                        {"row": 1, "seat": 1,
+                         "performance": self.performance.id}
+                    ]
+                },
+                format="json"
+            )
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+        primary, replica = self.get(reservations_url)
+        self.assertGreater(primary, 0)
+        self.assertEqual(replica, 0)
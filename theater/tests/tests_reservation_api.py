@@ -1,5 +1,7 @@
 from django.contrib.auth import get_user_model
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from rest_framework.test import APIClient
 from rest_framework import status
 from rest_framework.reverse import reverse
@@ -68,3 +70,107 @@ class AuthenticatedReservationApiTests(TestCase):
         self.assertEqual(res.status_code, status.HTTP_200_OK)
         self.assertIsInstance(res.data["results"], list)
         self.assertEqual(len(res.data["results"][0]["tickets"]), 2)
+
+    def test_create_reservation(self):
+        payload = {
+            "tickets": [
+                {"row": 1, "seat": 1, "performance": self.performance.id},
+                {"row": 1, "seat": 2, "performance": self.performance.id},
+                {"row": 2, "seat": 5, "performance": self.performance.id},
+            ]
+        }
+
+        res = self.client.post(RESERVATION_URL, payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(
+            Ticket.objects.filter(reservation__user=self.user).count(), 3
+        )
+
+    def test_create_reservation_query_count_does_not_grow(self):
+        def payload(rows):
+            return {
+                "tickets": [
+                    {"row": row, "seat": seat,
+                     "performance": self.performance.id}
+                    for row in rows
+                    for seat in range(1, 11)
+                ]
+            }
+
+        with CaptureQueriesContext(connection) as small:
+            self.client.post(RESERVATION_URL, payload([1]), format="json")
+        with CaptureQueriesContext(connection) as large:
+            res = self.client.post(
+                RESERVATION_URL, payload([2, 3, 4]), format="json"
+            )
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(small), len(large))
+
+    def test_create_reservation_reports_all_taken_seats(self):
+        reservation = Reservation.objects.create(user=self.user)
+        for seat in (1, 2):
+            Ticket.objects.create(
+                row=1,
+                seat=seat,
+                performance=self.performance,
+                reservation=reservation
+            )
+        payload = {
+            "tickets": [
+                {"row": 1, "seat": 1, "performance": self.performance.id},
+                {"row": 1, "seat": 2, "performance": self.performance.id},
+                {"row": 1, "seat": 3, "performance": self.performance.id},
+            ]
+        }
+
+        res = self.client.post(RESERVATION_URL, payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(len(res.data["tickets"]), 2)
+        self.assertEqual(Ticket.objects.count(), 2)
+
+    def test_create_reservation_rejects_duplicated_seats(self):
+        payload = {
+            "tickets": [
+                {"row": 3, "seat": 3, "performance": self.performance.id},
+                {"row": 3, "seat": 3, "performance": self.performance.id},
+            ]
+        }
+
+        res = self.client.post(RESERVATION_URL, payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Reservation.objects.count(), 0)
+
+    def test_create_reservation_validates_seat_range(self):
+        payload = {
+            "tickets": [
+                {"row": 21, "seat": 1, "performance": self.performance.id},
+            ]
+        }
+
+        res = self.client.post(RESERVATION_URL, payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_reservation_list_cursor_pagination(self):
+        reservations = [
+            Reservation.objects.create(user=self.user) for _ in range(3)
+        ]
+
+        res = self.client.get(
+            RESERVATION_URL, {"pagination": "cursor", "limit": 2}
+        )
+        next_res = self.client.get(res.data["next"])
+
+        self.assertEqual(
+            [reservation["id"] for reservation in res.data["results"]],
+            [reservations[2].id, reservations[1].id]
+        )
+        self.assertEqual(
+            [reservation["id"] for reservation in next_res.data["results"]],
+            [reservations[0].id]
+        )
+        self.assertIsNone(next_res.data["next"])
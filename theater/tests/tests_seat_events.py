@@ -0,0 +1,190 @@
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.test import (
+    SimpleTestCase,
+    TestCase,
+    TransactionTestCase,
+    override_settings,
+)
+from rest_framework import status
+from rest_framework.reverse import reverse
+from rest_framework.test import APIClient
+
+from theater.models import (
+    Performance,
+    Play,
+    Reservation,
+    TheatreHall,
+    Ticket
+)
+from theater.seat_events import (
+    PostgresBroker,
+    RELEASED,
+    TAKEN,
+    event_stream_response,
+    get_broker,
+)
+
+
+def events_url(performance_id):
+    return reverse("theater:performance-events", args=(performance_id,))
+
+
+def sample_performance():
+    return Performance.objects.create(
+        play=Play.objects.create(title="Hamlet", description="Danish"),
+        theatre_hall=TheatreHall.objects.create(
+            name="Great Arena", rows=20, seats_in_row=20
+        ),
+        show_time="2024-10-15T18:00:00Z"
+    )
+
+
+@override_settings(SEAT_EVENTS_BACKEND="memory")
+class SeatEventsStreamTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="test@test.test",
+            password="testpassword",
+        )
+        self.client.force_authenticate(self.user)
+        self.performance = sample_performance()
+
+    def stream(self):
+        res = self.client.get(
+            events_url(self.performance.id),
+            HTTP_ACCEPT="text/event-stream"
+        )
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res["Content-Type"], "text/event-stream")
+        events = iter(res.streaming_content)
+        self.assertEqual(next(events), b"retry: 3000\n\n")
+        return events
+
+    def test_reservations_send_taken_and_released_seats(self):
+        events = self.stream()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            res = self.client.post(
+                reverse("theater:reservation-list"),
+                {
+                    "tickets": [
+                        {"row": 2, "seat": 5,
+                         "performance": self.performance.id},
+                        {"row": 1, "seat": 3,
+                         "performance": self.performance.id},
+                    ]
+                },
+                format="json"
+            )
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+        self.assertEqual(
+            next(events),
+            b'id: 1\nevent: taken\ndata: {"seats": [{"row": 1, "seat": 3}, '
+            b'{"row": 2, "seat": 5}]}\n\n'
+        )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Reservation.objects.get(pk=res.data["id"]).delete()
+
+        self.assertEqual(
+            next(events).split(b"\n")[:2], [b"id: 2", b"event: released"]
+        )
+
+    @override_settings(SEAT_EVENTS_HEARTBEAT_SECONDS=0)
+    def test_other_performances_are_not_sent(self):
+        events = self.stream()
+        other = Performance.objects.create(
+            play=self.performance.play,
+            theatre_hall=self.performance.theatre_hall,
+            show_time="2024-10-16T18:00:00Z"
+        )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Ticket.objects.create(
+                row=1, seat=1, performance=other,
+                reservation=Reservation.objects.create(user=self.user)
+            )
+
+        self.assertEqual(next(events), b": keep-alive\n\n")
+
+    def test_unknown_performance(self):
+        res = self.client.get(events_url(0), HTTP_ACCEPT="text/event-stream")
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertTrue(res.content.startswith(b"event: error\n"))
+
+    def test_stream_requires_authentication(self):
+        res = APIClient().get(events_url(self.performance.id))
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+@override_settings(SEAT_EVENTS_BACKEND="memory", ASYNC_READ_VIEWS=True)
+class AsyncSeatEventsStreamTests(SimpleTestCase):
+    async def test_async_stream(self):
+        response = await sync_to_async(event_stream_response)(1)
+        events = aiter(response.streaming_content)
+        self.assertEqual(await anext(events), b"retry: 3000\n\n")
+
+        get_broker().publish(
+            {"performance": 1, "event": TAKEN, "version": 7,
+             "seats": [[1, 2]]}
+        )
+
+        self.assertEqual(
+            await anext(events),
+            b'id: 7\nevent: taken\n'
+            b'data: {"seats": [{"row": 1, "seat": 2}]}\n\n'
+        )
+        await events.aclose()
+
+
+@override_settings(SEAT_EVENTS_BACKEND="postgres")
+class PostgresSeatEventsTests(TransactionTestCase):
+    def setUp(self):
+        self.performance = sample_performance()
+        self.reservation = Reservation.objects.create(
+            user=get_user_model().objects.create_user(
+                email="test@test.test",
+                password="testpassword",
+            )
+        )
+        self.broker = PostgresBroker()
+        self.addCleanup(self.broker.close)
+        self.broker.start()
+        self.subscription = self.broker.subscribe(self.performance.id)
+
+    def test_committed_changes_are_notified(self):
+        ticket = Ticket.objects.create(
+            row=1, seat=1, performance=self.performance,
+            reservation=self.reservation
+        )
+        ticket.seat = 2
+        ticket.save()
+
+        self.assertEqual(
+            [self.subscription.get(5) for _ in range(3)],
+            [
+                {"performance": self.performance.id, "event": event,
+                 "version": version, "seats": [seat]}
+                for version, event, seat in (
+                    (1, TAKEN, [1, 1]),
+                    (2, RELEASED, [1, 1]),
+                    (3, TAKEN, [1, 2]),
+                )
+            ]
+        )
+
+    def test_rolled_back_changes_are_not_notified(self):
+        with transaction.atomic():
+            Ticket.objects.create(
+                row=1, seat=1, performance=self.performance,
+                reservation=self.reservation
+            )
+            transaction.set_rollback(True)
+
+        self.assertIsNone(self.subscription.get(0.5))
@@ -0,0 +1,164 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework import status
+from rest_framework.reverse import reverse
+
+from theater.models import (
+    Performance,
+    Play,
+    Reservation,
+    SeatHold,
+    TheatreHall,
+    Ticket
+)
+
+
+SEAT_HOLD_URL = reverse("theater:seat-hold-list")
+RESERVATION_URL = reverse("theater:reservation-list")
+PERFORMANCE_URL = reverse("theater:performance-list")
+
+
+class UnauthenticatedSeatHoldApiTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_auth_required(self):
+        res = self.client.get(SEAT_HOLD_URL)
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class AuthenticatedSeatHoldApiTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="test@test.test",
+            password="testpassword",
+        )
+        self.other_user = get_user_model().objects.create_user(
+            email="other@test.test",
+            password="testpassword",
+        )
+        self.client.force_authenticate(self.user)
+        play = Play.objects.create(
+            title="Test Title",
+            description="Test Description"
+        )
+        theatre_hall = TheatreHall.objects.create(
+            name="Great Arena",
+            rows=20,
+            seats_in_row=20
+        )
+        self.performance = Performance.objects.create(
+            play=play,
+            theatre_hall=theatre_hall,
+            show_time="2024-10-15 18:00"
+        )
+
+    def hold(self, user, row, seat, expires_in=timedelta(minutes=10)):
+        return SeatHold.objects.create(
+            user=user,
+            row=row,
+            seat=seat,
+            performance=self.performance,
+            expires_at=timezone.now() + expires_in
+        )
+
+    def test_hold_seats(self):
+        payload = [
+            {"row": 1, "seat": 1, "performance": self.performance.id},
+            {"row": 1, "seat": 2, "performance": self.performance.id},
+        ]
+
+        res = self.client.post(SEAT_HOLD_URL, payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(res.data), 2)
+        self.assertEqual(SeatHold.objects.filter(user=self.user).count(), 2)
+
+    def test_hold_seats_held_by_another_user(self):
+        self.hold(self.other_user, 1, 1)
+        payload = [
+            {"row": 1, "seat": 1, "performance": self.performance.id},
+            {"row": 1, "seat": 2, "performance": self.performance.id},
+        ]
+
+        res = self.client.post(SEAT_HOLD_URL, payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(SeatHold.objects.filter(user=self.user).count(), 0)
+
+    def test_hold_replaces_expired_hold(self):
+        self.hold(self.other_user, 1, 1, expires_in=-timedelta(minutes=1))
+        payload = [
+            {"row": 1, "seat": 1, "performance": self.performance.id},
+        ]
+
+        res = self.client.post(SEAT_HOLD_URL, payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(SeatHold.objects.get().user, self.user)
+
+    def test_reservation_rejects_seats_held_by_another_user(self):
+        self.hold(self.other_user, 2, 2)
+        payload = {
+            "tickets": [
+                {"row": 2, "seat": 2, "performance": self.performance.id},
+            ]
+        }
+
+        res = self.client.post(RESERVATION_URL, payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Ticket.objects.exists())
+
+    def test_reservation_releases_own_holds(self):
+        self.hold(self.user, 2, 2)
+        payload = {
+            "tickets": [
+                {"row": 2, "seat": 2, "performance": self.performance.id},
+            ]
+        }
+
+        res = self.client.post(RESERVATION_URL, payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertFalse(SeatHold.objects.exists())
+
+    def test_holds_reduce_available_tickets(self):
+        self.hold(self.other_user, 1, 1)
+        self.hold(self.other_user, 1, 2)
+        self.hold(self.other_user, 1, 3, expires_in=-timedelta(minutes=1))
+        reservation = Reservation.objects.create(user=self.user)
+        Ticket.objects.create(
+            row=5,
+            seat=5,
+            performance=self.performance,
+            reservation=reservation
+        )
+
+        res = self.client.get(PERFORMANCE_URL)
+
+        self.assertEqual(res.data["results"][0]["tickets_available"], 397)
+
+    def test_performance_detail_lists_held_seats(self):
+        self.hold(self.other_user, 3, 4)
+        url = reverse(
+            "theater:performance-detail", args=(self.performance.id,)
+        )
+
+        res = self.client.get(url)
+
+        self.assertEqual(res.data["held_seats"], [{"row": 3, "seat": 4}])
+
+    def test_release_expired_holds(self):
+        self.hold(self.other_user, 1, 1, expires_in=-timedelta(minutes=1))
+        self.hold(self.other_user, 1, 2)
+
+        released = SeatHold.release_expired()
+
+        self.assertEqual(released, 1)
+        self.assertEqual(SeatHold.objects.count(), 1)
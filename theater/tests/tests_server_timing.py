@@ -0,0 +1,125 @@
+import re
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+from rest_framework.reverse import reverse
+from rest_framework.test import APIClient
+
+from theater.middleware import (
+    MetricsMiddleware,
+    ServerTimingMiddleware,
+    query_timers,
+)
+from theater.models import Genre
+
+
+GENRE_URL = reverse("theater:genre-list")
+
+
+def server_timing(response) -> dict:
+    """`{name: (duration, description)}` of the Server-Timing header."""
+    return {
+        name: (float(duration), description)
+        for name, duration, description in re.findall(
+            r'(\w+);dur=([\d.]+);desc="([^"]*)"', response["Server-Timing"]
+        )
+    }
+
+
+@override_settings(REQUEST_TIMING_SAMPLE_RATE=1)
+class ServerTimingMiddlewareTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="test@test.test",
+            password="testpassword"
+        )
+        self.client.force_authenticate(self.user)
+        Genre.objects.create(name="Drama")
+
+    def test_server_timing_header(self):
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.get(GENRE_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        timing = server_timing(res)
+        self.assertEqual(
+            list(timing), ["total", "db", "view", "render"]
+        )
+        self.assertEqual(
+            timing["db"][1], f"{len(queries.captured_queries)} SQL queries"
+        )
+        self.assertGreaterEqual(
+            timing["total"][0],
+            timing["db"][0] + timing["view"][0] + timing["render"][0]
+        )
+
+    def test_response_without_rendering_has_no_render_timing(self):
+        res = self.client.get("/missing/")
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(list(server_timing(res)), ["total", "db"])
+
+    def test_request_is_logged(self):
+        with self.assertLogs("theater.middleware", "INFO") as logs:
+            self.client.get(GENRE_URL)
+
+        self.assertEqual(len(logs.records), 1)
+        self.assertTrue(
+            logs.output[0].startswith(
+                f"INFO:theater.middleware:method=GET path={GENRE_URL} "
+                f"status=200 queries="
+            )
+        )
+        self.assertEqual(
+            list(logs.records[0].timing),
+            [
+                "method", "path", "status", "queries",
+                "total_ms", "db_ms", "view_ms", "render_ms",
+            ]
+        )
+
+    @override_settings(REQUEST_TIMING_SAMPLE_RATE=0)
+    def test_requests_out_of_sample_are_not_timed(self):
+        with self.assertNoLogs("theater.middleware"):
+            res = self.client.get(GENRE_URL)
+
+        self.assertFalse(res.has_header("Server-Timing"))
+
+    def test_header_is_internal_only(self):
+        with self.assertLogs("theater.middleware", "INFO"):
+            res = self.client.get(GENRE_URL, REMOTE_ADDR="10.0.0.1")
+
+        self.assertFalse(res.has_header("Server-Timing"))
+
+        self.user.is_staff = True
+        self.user.save()
+        res = self.client.get(GENRE_URL, REMOTE_ADDR="10.0.0.1")
+
+        self.assertTrue(res.has_header("Server-Timing"))
+
+    @override_settings(REQUEST_TIMING_PUBLIC_HEADER=True)
+    def test_public_header(self):
+        res = APIClient().get(GENRE_URL, REMOTE_ADDR="10.0.0.1")
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertTrue(res.has_header("Server-Timing"))
+
+    def test_query_timers_are_removed_after_requests(self):
+        for _ in range(3):
+            self.client.get(GENRE_URL)
+
+        self.assertEqual(query_timers.get(), ())
+
+    def test_query_timers_are_removed_when_view_raises(self):
+        def view(request):
+            raise ValueError
+
+        middleware = ServerTimingMiddleware(MetricsMiddleware(view))
+        with self.assertRaises(ValueError):
+            middleware(RequestFactory().get(GENRE_URL))
+
+        self.assertEqual(query_timers.get(), ())
@@ -8,6 +8,7 @@ from theater.views import (
     TheatreHallViewSet,
     PerformanceViewSet,
     ReservationViewSet,
+    SeatHoldViewSet,
 )
 
 
@@ -30,6 +31,11 @@ router.register(
     ReservationViewSet,
     basename="reservation"
 )
+router.register(
+    "seat-holds",
+    SeatHoldViewSet,
+    basename="seat-hold"
+)
 
 urlpatterns = [
     path("", include(router.urls))
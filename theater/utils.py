@@ -0,0 +1,83 @@
+import base64
+from itertools import islice
+
+from django.db import connections, router
+
+
+def encode_seat_bitmap(rows: int, seats_in_row: int, seats) -> str:
+    """
+    Packs `(row, seat)` pairs into a base64 row-major bitset.
+
+    Seat `(row, seat)` is bit `(row - 1) * seats_in_row + (seat - 1)`,
+    bits are counted from the most significant bit of every byte.
+    Seats outside the hall, left by tickets of a hall made smaller,
+    are skipped.
+    """
+    bitmap = bytearray((rows * seats_in_row + 7) // 8)
+
+    for row, seat in seats:
+        if not (1 <= row <= rows and 1 <= seat <= seats_in_row):
+            continue
+        index = (row - 1) * seats_in_row + (seat - 1)
+        bitmap[index // 8] |= 0x80 >> (index % 8)
+
+    return base64.b64encode(bitmap).decode("ascii")
+
+
+def copy_rows(model, fields, rows, batch_size: int = 5000) -> None:
+    """
+    Inserts tuples of `fields` values into the table of `model`
+    with `COPY ... FROM STDIN` on PostgreSQL and `bulk_create`
+    on other databases. No ids are returned and no signals sent.
+    """
+    connection = connections[router.db_for_write(model)]
+
+    if connection.vendor != "postgresql":
+        objs = (model(**dict(zip(fields, row))) for row in rows)
+        while batch := list(islice(objs, batch_size)):
+            model.objects.bulk_create(batch)
+        return
+
+    quote_name = connection.ops.quote_name
+    columns = ", ".join(
+        quote_name(model._meta.get_field(field).column) for field in fields
+    )
+    with connection.cursor() as cursor:
+        with cursor.copy(
+            f"COPY {quote_name(model._meta.db_table)} ({columns}) FROM STDIN"
+        ) as copy:
+            for row in rows:
+                copy.write_row(row)
+
+
+def bulk_insert(model, fields, rows, batch_size: int = 5000) -> list:
+    """
+    Inserts rows like `copy_rows` and returns their primary keys.
+    On PostgreSQL the keys are taken up front from the sequence
+    of the table, so COPY can be used for new objects as well.
+    """
+    rows = list(rows)
+    connection = connections[router.db_for_write(model)]
+
+    if connection.vendor != "postgresql":
+        objs = model.objects.bulk_create(
+            [model(**dict(zip(fields, row))) for row in rows],
+            batch_size=batch_size
+        )
+        return [obj.pk for obj in objs]
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT nextval(pg_get_serial_sequence(%s, %s)) "
+            "FROM generate_series(1, %s)",
+            [model._meta.db_table, model._meta.pk.column, len(rows)]
+        )
+        ids = [pk for pk, in cursor.fetchall()]
+
+    copy_rows(
+        model,
+        (model._meta.pk.attname, *fields),
+        ((pk, *row) for pk, row in zip(ids, rows)),
+        batch_size
+    )
+    return ids
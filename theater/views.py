@@ -1,10 +1,29 @@
-from django.db.models import F, Count
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db.models import Count, F, Exists, OuterRef, Prefetch
+from django.http import HttpResponse, HttpResponseForbidden
+from django.utils.crypto import constant_time_compare
+from drf_spectacular.types import OpenApiTypes
 from drf_spectacular.utils import extend_schema, OpenApiParameter
-from rest_framework import viewsets, status
+from rest_framework import viewsets, mixins, status
 from rest_framework.decorators import action
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
 from rest_framework.response import Response
 
+from theater.async_views import AsyncReadMixin
+from theater.cache import (
+    CachedResponseMixin,
+    ConditionalGetMixin,
+    seat_holds_changed,
+)
+from theater.exports import export_response
+from theater import metrics
+from theater.filters import (
+    annotate_tickets_available,
+    filter_performances,
+    filter_reservations,
+)
 from theater.models import (
     Genre,
     Actor,
@@ -12,42 +31,175 @@ from theater.models import (
     TheatreHall,
     Performance,
     Reservation,
+    SeatChange,
+    SeatHold,
+    Ticket,
+)
+from theater.pagination import (
+    CountOptionalLimitOffsetPagination,
+    PerformancePagination,
+    PlayPagination,
+    ReservationPagination,
+)
+from theater.renderers import (
+    CSVRenderer,
+    EventStreamRenderer,
+    NDJSONRenderer,
+    ORJSONRenderer,
 )
+from theater.seat_events import event_stream_response
 from theater.serializers import (
     GenreSerializer,
     ActorSerializer,
     PlaySerializer,
     PlayListSerializer,
     PlayRetrieveSerializer,
+    PlaySearchSerializer,
     TheatreHallSerializer,
     PerformanceSerializer,
     PerformanceListSerializer,
     PerformanceRetrieveSerializer,
+    PerformanceRetrieveBitmapSerializer,
+    PerformanceSeatChangesSerializer,
     ReservationSerializer,
     ReservationListSerializer,
     ItemImageSerializer,
+    SeatHoldSerializer,
 )
 
 
-class GenreViewSet(viewsets.ModelViewSet):
+PERFORMANCE_FILTER_PARAMETERS = [
+    OpenApiParameter(
+        "play",
+        type={"type": "string"},
+        description="Filter by play title (ex. ?play=titanic)"
+    ),
+    OpenApiParameter(
+        "play_id",
+        type={"type": "integer"},
+        description="Filter by play id (ex. ?play_id=3)"
+    ),
+    OpenApiParameter(
+        "theatre_hall",
+        type={"type": "integer"},
+        description="Filter by theatre hall id (ex. ?theatre_hall=2)"
+    ),
+    OpenApiParameter(
+        "show_time_after",
+        type={"type": "string", "format": "date-time"},
+        description="Performances starting at or after the date "
+                    "or datetime (ex. ?show_time_after=2024-10-15)"
+    ),
+    OpenApiParameter(
+        "show_time_before",
+        type={"type": "string", "format": "date-time"},
+        description="Performances starting before the date "
+                    "or datetime (ex. ?show_time_before=2024-10-16)"
+    ),
+    OpenApiParameter(
+        "min_available",
+        type={"type": "integer"},
+        description="Performances with at least this many "
+                    "free seats (ex. ?min_available=2)"
+    ),
+    OpenApiParameter(
+        "ordering",
+        type={"type": "string",
+              "enum": ["id", "show_time", "-show_time"]},
+        description="Order of performances (ex. ?ordering=show_time)"
+    ),
+]
+
+EXPORT_FORMAT_PARAMETER = OpenApiParameter(
+    "format",
+    type={"type": "string", "enum": ["ndjson", "csv"]},
+    description="Export format, NDJSON by default (ex. ?format=csv)"
+)
+
+EXPORT_RESPONSES = {
+    (200, NDJSONRenderer.media_type): OpenApiTypes.STR,
+    (200, CSVRenderer.media_type): OpenApiTypes.STR,
+}
+
+
+class GenreViewSet(
+    AsyncReadMixin,
+    ConditionalGetMixin,
+    CachedResponseMixin,
+    viewsets.ModelViewSet
+):
     queryset = Genre.objects.all()
     serializer_class = GenreSerializer
+    cache_namespaces = ("genre",)
 
 
-class ActorViewSet(viewsets.ModelViewSet):
+class ActorViewSet(
+    AsyncReadMixin,
+    ConditionalGetMixin,
+    CachedResponseMixin,
+    viewsets.ModelViewSet
+):
     queryset = Actor.objects.all()
     serializer_class = ActorSerializer
+    cache_namespaces = ("actor",)
 
 
-class PlayViewSet(viewsets.ModelViewSet):
+class PlayViewSet(
+    AsyncReadMixin,
+    ConditionalGetMixin,
+    CachedResponseMixin,
+    viewsets.ModelViewSet
+):
     queryset = Play.objects.all()
+    pagination_class = PlayPagination
+    cache_namespaces = ("play", "genre", "actor")
+    async_actions = ("list", "retrieve", "search")
+
+    match_modes = ("any", "all")
 
     @staticmethod
-    def _params_to_ints(query_string):
+    def _params_to_ints(query_string, name="ids"):
         """
         Converts a string of format '1,2,3' to a list of integers [1, 2, 3].
         """
-        return [int(str_id) for str_id in query_string.split(",")]
+        try:
+            return [int(str_id) for str_id in query_string.split(",")]
+        except ValueError:
+            raise ValidationError(
+                {name: "Must be a comma separated list of ids (ex. 1,2,3)."}
+            )
+
+    def _filter_related(self, queryset, name, through, related_field):
+        """
+        Keeps plays related to any or all (`?<name>_mode=`) of the ids
+        in `?<name>=` using EXISTS subqueries, so no DISTINCT is needed.
+        """
+        query_string = self.request.query_params.get(name)
+        mode = self.request.query_params.get(f"{name}_mode", "any")
+
+        if mode not in self.match_modes:
+            raise ValidationError(
+                {f"{name}_mode": f"Must be one of "
+                                 f"{', '.join(self.match_modes)}."}
+            )
+
+        if not query_string:
+            return queryset
+
+        ids = self._params_to_ints(query_string, name)
+        related = through.objects.filter(play_id=OuterRef("pk"))
+
+        if mode == "any":
+            return queryset.filter(
+                Exists(related.filter(**{f"{related_field}__in": ids}))
+            )
+
+        for related_id in set(ids):
+            queryset = queryset.filter(
+                Exists(related.filter(**{related_field: related_id}))
+            )
+
+        return queryset
 
     def get_serializer_class(self):
         if self.action == "list":
@@ -56,27 +208,25 @@ class PlayViewSet(viewsets.ModelViewSet):
             return PlayRetrieveSerializer
         elif self.action == "upload_image":
             return ItemImageSerializer
+        elif self.action == "search":
+            return PlaySearchSerializer
 
         return PlaySerializer
 
     def get_queryset(self):
-        queryset = self.queryset
-
-        genres = self.request.query_params.get("genres")
-        actors = self.request.query_params.get("actors")
-
-        if genres:
-            genres = self._params_to_ints(genres)
-            queryset = queryset.filter(genres__id__in=genres)
-
-        if actors:
-            actors = self._params_to_ints(actors)
-            queryset = queryset.filter(actors__id__in=actors)
-
-        if self.action in ("list", "retrieve"):
-            queryset = queryset.prefetch_related("genres", "actors")
+        queryset = self._filter_related(
+            self.queryset, "genres", Play.genres.through, "genre_id"
+        )
+        queryset = self._filter_related(
+            queryset, "actors", Play.actors.through, "actor_id"
+        )
+
+        if self.action in ("list", "search"):
+            queryset = PlayListSerializer.values(queryset)
+        elif self.action == "retrieve":
+            queryset = PlayRetrieveSerializer.annotate_relations(queryset)
 
-        return queryset.distinct()
+        return queryset
 
     @action(methods=["POST"], detail=True, url_path="upload-image")
     def upload_image(self, request, pk=None):
@@ -89,6 +239,43 @@ class PlayViewSet(viewsets.ModelViewSet):
 
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                "q",
+                type={"type": "string"},
+                required=True,
+                description="Words to look for in titles, descriptions, "
+                            "genres and actor names (ex. ?q=hamlet)"
+            )
+        ]
+    )
+    @action(
+        methods=["GET"],
+        detail=False,
+        pagination_class=CountOptionalLimitOffsetPagination
+    )
+    def search(self, request):
+        """Full-text search of plays ordered by relevance."""
+        text = request.query_params.get("q", "").strip()
+
+        if not text:
+            raise ValidationError({"q": "This parameter is required."})
+
+        query = SearchQuery(
+            text, search_type="websearch", config=Play.SEARCH_CONFIG
+        )
+        queryset = (
+            self.filter_queryset(self.get_queryset())
+            .filter(search_vector=query)
+            .annotate(rank=SearchRank(F("search_vector"), query))
+            .order_by("-rank", "id")
+        )
+
+        page = self.paginate_queryset(queryset)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
     @extend_schema(
         parameters=[
             OpenApiParameter(
@@ -100,7 +287,19 @@ class PlayViewSet(viewsets.ModelViewSet):
                 "genres",
                 type={"type": "array", "items": {"type": "number"}},
                 description="Filter by genres id (ex. ?genres=1,3)"
-            )
+            ),
+            OpenApiParameter(
+                "actors_mode",
+                type={"type": "string", "enum": ["any", "all"]},
+                description="Match plays with any (default) or all "
+                            "of the actors (ex. ?actors_mode=all)"
+            ),
+            OpenApiParameter(
+                "genres_mode",
+                type={"type": "string", "enum": ["any", "all"]},
+                description="Match plays with any (default) or all "
+                            "of the genres (ex. ?genres_mode=all)"
+            ),
         ]
     )
     def list(self, request, *args, **kwargs):
@@ -108,18 +307,73 @@ class PlayViewSet(viewsets.ModelViewSet):
         return super().list(request, *args, **kwargs)
 
 
-class TheatreHallViewSet(viewsets.ModelViewSet):
+class TheatreHallViewSet(
+    AsyncReadMixin,
+    ConditionalGetMixin,
+    CachedResponseMixin,
+    viewsets.ModelViewSet
+):
     queryset = TheatreHall.objects.all()
     serializer_class = TheatreHallSerializer
+    cache_namespaces = ("theatre_hall",)
 
 
-class PerformanceViewSet(viewsets.ModelViewSet):
+class PerformanceViewSet(
+    AsyncReadMixin,
+    ConditionalGetMixin,
+    viewsets.ModelViewSet
+):
     queryset = Performance.objects.all()
+    pagination_class = PerformancePagination
+    seat_formats = ("list", "bitmap")
+    async_actions = ("list", "retrieve", "events")
+
+    def get_seat_format(self):
+        seat_format = self.request.query_params.get("seat_format", "list")
+
+        if seat_format not in self.seat_formats:
+            raise ValidationError(
+                {
+                    "seat_format": f"Must be one of "
+                                   f"{', '.join(self.seat_formats)}."
+                }
+            )
+
+        return seat_format
+
+    def get_cache_namespaces(self):
+        if self.action == "retrieve":
+            pk = self.kwargs[self.lookup_field]
+            return (
+                "performance",
+                "play",
+                "genre",
+                "actor",
+                "theatre_hall",
+                f"ticket:performance:{pk}",
+                f"seat_hold:performance:{pk}",
+            )
+
+        return (
+            "performance",
+            "play",
+            "theatre_hall",
+            "ticket",
+            "seat_hold",
+        )
+
+    def get_etag(self, request) -> str:
+        # Held seats depend on the clock, expired holds are released
+        # first so their performances get new versions
+        SeatHold.expire()
+        return super().get_etag(request)
 
     def get_serializer_class(self):
         if self.action == "list":
             return PerformanceListSerializer
         elif self.action == "retrieve":
+            if self.get_seat_format() == "bitmap":
+                return PerformanceRetrieveBitmapSerializer
             return PerformanceRetrieveSerializer
 
         return PerformanceSerializer
@@ -131,54 +385,199 @@ class PerformanceViewSet(viewsets.ModelViewSet):
         if play:
             queryset = queryset.filter(play__title__icontains=play)
 
+        if self.action in ("list", "export", "export_tickets"):
+            queryset = filter_performances(
+                annotate_tickets_available(queryset),
+                self.request.query_params
+            )
+
         if self.action == "list":
-            queryset = (
-                queryset.select_related("play", "theatre_hall")
-                .annotate(
-                    tickets_available=F("theatre_hall__rows")
-                    * F("theatre_hall__seats_in_row")
-                    - Count("tickets")
-                )
-            ).order_by("id")
+            queryset = PerformanceListSerializer.values(queryset)
 
         if self.action == "retrieve":
             queryset = queryset.select_related("play", "theatre_hall")
 
-        return queryset.distinct()
+        return queryset
+
+    @extend_schema(parameters=PERFORMANCE_FILTER_PARAMETERS)
+    def list(self, request, *args, **kwargs):
+        """Get list of performances"""
+        return super().list(request, *args, **kwargs)
+
+    def get_since(self):
+        since = self.request.query_params.get("since")
+        if since is None:
+            return None
+
+        if not since.isdigit():
+            raise ValidationError(
+                {"since": "Must be a seat version, a whole number."}
+            )
+        return int(since)
+
+    def seat_changes(self, request, *args, **kwargs):
+        performance = self.get_object()
+        since = self.get_since()
+        changes = SeatChange.changes_since(performance, since)
+
+        if changes is None:
+            return Response(self.get_serializer(performance).data)
+
+        taken, released = (
+            [{"row": row, "seat": seat} for row, seat in sorted(seats)]
+            for seats in changes
+        )
+        serializer = PerformanceSeatChangesSerializer(
+            {
+                "id": performance.id,
+                "since": since,
+                "seat_version": performance.seat_version,
+                "taken_seats": taken,
+                "released_seats": released,
+            }
+        )
+        return Response(serializer.data)
 
     @extend_schema(
         parameters=[
             OpenApiParameter(
-                "play",
-                type={"type": "string"},
-                description="Filter by play title (ex. ?play=titanic)"
-            )
+                "seat_format",
+                type={"type": "string", "enum": ["list", "bitmap"]},
+                description="Representation of taken seats: list of "
+                            "row/seat objects (default) or a base64 "
+                            "row-major bitmap (ex. ?seat_format=bitmap)"
+            ),
+            OpenApiParameter(
+                "since",
+                type={"type": "integer"},
+                description="Seat version of a previous response: only "
+                            "seats taken and released after it are "
+                            "returned, with `since` set. The whole "
+                            "performance is returned when the changes "
+                            "are no longer kept (ex. ?since=42)"
+            ),
         ]
     )
-    def list(self, request, *args, **kwargs):
-        """Get list of performances"""
-        return super().list(request, *args, **kwargs)
+    def retrieve(self, request, *args, **kwargs):
+        """Get performance with its taken seats"""
+        if self.get_since() is not None:
+            return self.conditional_response(
+                self.seat_changes, request, *args, **kwargs
+            )
+        return super().retrieve(request, *args, **kwargs)
 
+    @extend_schema(
+        responses={(200, EventStreamRenderer.media_type): OpenApiTypes.STR}
+    )
+    @action(
+        methods=["GET"],
+        detail=True,
+        renderer_classes=(EventStreamRenderer, ORJSONRenderer)
+    )
+    def events(self, request, pk=None):
+        """
+        Stream seats taken and released as Server-Sent Events
+        (`taken` and `released` with `{"seats": [{"row", "seat"}]}`)
+        """
+        return event_stream_response(self.get_object().id)
+
+    @extend_schema(
+        parameters=[*PERFORMANCE_FILTER_PARAMETERS, EXPORT_FORMAT_PARAMETER],
+        responses=EXPORT_RESPONSES
+    )
+    @action(
+        methods=["GET"],
+        detail=False,
+        permission_classes=(IsAdminUser,),
+        renderer_classes=(NDJSONRenderer, CSVRenderer)
+    )
+    def export(self, request):
+        """Stream filtered performances as NDJSON or CSV (staff only)"""
+        return export_response(
+            request,
+            self.get_queryset().values(
+                "id",
+                "show_time",
+                "play_id",
+                "theatre_hall_id",
+                "tickets_sold",
+                "tickets_available",
+                play_title=F("play__title"),
+                theatre_hall_name=F("theatre_hall__name"),
+            ),
+            "performances"
+        )
+
+    @extend_schema(
+        parameters=[*PERFORMANCE_FILTER_PARAMETERS, EXPORT_FORMAT_PARAMETER],
+        responses=EXPORT_RESPONSES
+    )
+    @action(
+        methods=["GET"],
+        detail=False,
+        url_path="export/tickets",
+        permission_classes=(IsAdminUser,),
+        renderer_classes=(NDJSONRenderer, CSVRenderer)
+    )
+    def export_tickets(self, request):
+        """Stream tickets of filtered performances (staff only)"""
+        tickets = Ticket.objects.filter(
+            performance__in=self.get_queryset().values("id")
+        ).order_by("id")
+        return export_response(
+            request,
+            tickets.values(
+                "id",
+                "row",
+                "seat",
+                "performance_id",
+                "reservation_id",
+                show_time=F("performance__show_time"),
+                play_title=F("performance__play__title"),
+                reserved_at=F("reservation__created_at"),
+                user_id=F("reservation__user_id"),
+            ),
+            "tickets"
+        )
 
-class ReservationViewSet(viewsets.ModelViewSet):
+
+class ReservationViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = Reservation.objects.all()
     serializer_class = ReservationSerializer
+    pagination_class = ReservationPagination
     permission_classes = (IsAuthenticated,)
 
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
 
+    def get_cache_namespaces(self):
+        return (
+            f"reservation:user:{self.request.user.pk}",
+            "performance",
+            "play",
+            "theatre_hall",
+        )
+
     def get_queryset(self):
+        if self.action == "export":
+            return filter_reservations(
+                self.queryset, self.request.query_params
+            )
+
         queryset = self.queryset.filter(user=self.request.user)
 
         if self.action == "list":
             queryset = queryset.prefetch_related(
-                "tickets__performance__play",
-                "tickets__performance__theatre_hall"
+                Prefetch(
+                    "tickets",
+                    Ticket.objects.select_related(
+                        "performance__play", "performance__theatre_hall"
+                    )
+                )
             )
 
         if self.action == "retrieve":
-            queryset = queryset.prefetch_related("tickets__performance")
+            queryset = queryset.prefetch_related("tickets")
 
         return queryset
 
@@ -187,3 +586,89 @@ class ReservationViewSet(viewsets.ModelViewSet):
             return ReservationListSerializer
 
         return ReservationSerializer
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                "user",
+                type={"type": "integer"},
+                description="Filter by user id (ex. ?user=5)"
+            ),
+            OpenApiParameter(
+                "created_after",
+                type={"type": "string", "format": "date-time"},
+                description="Reservations made at or after the date "
+                            "or datetime (ex. ?created_after=2024-10-01)"
+            ),
+            OpenApiParameter(
+                "created_before",
+                type={"type": "string", "format": "date-time"},
+                description="Reservations made before the date "
+                            "or datetime (ex. ?created_before=2024-11-01)"
+            ),
+            EXPORT_FORMAT_PARAMETER,
+        ],
+        responses=EXPORT_RESPONSES
+    )
+    @action(
+        methods=["GET"],
+        detail=False,
+        permission_classes=(IsAdminUser,),
+        renderer_classes=(NDJSONRenderer, CSVRenderer)
+    )
+    def export(self, request):
+        """Stream reservations of all users as NDJSON or CSV (staff only)"""
+        return export_response(
+            request,
+            self.get_queryset().order_by("id").values(
+                "id",
+                "created_at",
+                "user_id",
+                user_email=F("user__email"),
+                tickets_count=Count("tickets"),
+            ),
+            "reservations"
+        )
+
+
+class SeatHoldViewSet(
+    mixins.CreateModelMixin,
+    mixins.ListModelMixin,
+    mixins.DestroyModelMixin,
+    viewsets.GenericViewSet
+):
+    """
+    Seats held by the current user before checkout.
+    A hold is released on reservation or when `SEAT_HOLD_TTL` passes.
+    """
+    queryset = SeatHold.objects.all()
+    serializer_class = SeatHoldSerializer
+    permission_classes = (IsAuthenticated,)
+
+    def get_queryset(self):
+        return SeatHold.active().filter(user=self.request.user)
+
+    def get_serializer(self, *args, **kwargs):
+        if self.action == "create":
+            kwargs["many"] = True
+
+        return super().get_serializer(*args, **kwargs)
+
+    def perform_create(self, serializer):
+        serializer.save(user=self.request.user)
+
+    def perform_destroy(self, instance):
+        super().perform_destroy(instance)
+        seat_holds_changed([instance.performance_id])
+
+
+def metrics_view(request):
+    """Prometheus metrics, behind a bearer token if `METRICS_TOKEN` is set."""
+    if settings.METRICS_TOKEN and not constant_time_compare(
+        request.headers.get("Authorization", ""),
+        f"Bearer {settings.METRICS_TOKEN}"
+    ):
+        return HttpResponseForbidden()
+
+    body, content_type = metrics.export()
+    return HttpResponse(body, content_type=content_type)